@@ -1,25 +1,34 @@
+import os
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
+from flask_migrate import Migrate
 from flask_mail import Mail
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-import redis
 
 
 db = SQLAlchemy()
 jwt = JWTManager()
+migrate = Migrate()
 mail = Mail()
 limiter = Limiter(key_func=get_remote_address)
 redis_client = None  
 
+# Schema changes to existing databases: `flask db upgrade` (see README).
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
 def create_app():
     app = Flask(__name__)
     
     app.config.from_object('app.config.Config')
     
+    from .near_cache import create_redis_client
+
     global redis_client
-    redis_client = redis.Redis(
+    redis_client = create_redis_client(
+        app.config,
         host=app.config.get('REDIS_HOST', 'localhost'),
         port=app.config.get('REDIS_PORT', 6379),
         db=app.config.get('REDIS_DB', 0)
@@ -29,6 +38,7 @@ def create_app():
     
     db.init_app(app)
     jwt.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     mail.init_app(app)
     limiter.init_app(app)
     
@@ -43,4 +53,25 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(auth_ad, url_prefix='/api/admin')
 
+    from .ciphertext_migration import migrate_ciphertexts_command
+    app.cli.add_command(migrate_ciphertexts_command)
+
+    from .envelope import seal_rows_command, rotate_master_key_command
+    app.cli.add_command(seal_rows_command)
+    app.cli.add_command(rotate_master_key_command)
+
+    from .key_rotation import backfill_telephone_hash_command, rotate_keys_command
+    app.cli.add_command(rotate_keys_command)
+    app.cli.add_command(backfill_telephone_hash_command)
+
+    from .directory import rebuild_directory_command
+    app.cli.add_command(rebuild_directory_command)
+
+    from .user_directory import backfill_submitted_at_command, rebuild_user_directory_command
+    app.cli.add_command(rebuild_user_directory_command)
+    app.cli.add_command(backfill_submitted_at_command)
+
+    from .password_hashing import calibrate_password_hash_command
+    app.cli.add_command(calibrate_password_hash_command)
+
     return app
\ No newline at end of file
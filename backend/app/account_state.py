@@ -0,0 +1,115 @@
+# app/account_state.py
+"""Login-time account state: one joined lookup plus a short-TTL Redis cache.
+
+`load_login_account()` fetches the user together with their
+`user_directory` row (plaintext verified flag and status) in one query,
+falling back to the role table for users the projection does not have yet.
+Pending and rejected accounts are cached under `account_state:<email hash>`
+for ACCOUNT_STATE_CACHE_TTL seconds, with the rejection reason kept
+encrypted, so repeated attempts against them never reach SQL. approve and
+reject drop the cached state.
+"""
+from collections import namedtuple
+import json
+
+from flask import current_app
+from sqlalchemy import and_, case
+from sqlalchemy.orm import load_only
+
+from app import db
+from app.models import ROLE_ALIASES, User, UserDirectory, role_model
+from app.security import decrypt_data, email_hash_candidates, encrypt_data, generate_email_hash, redis_client
+from app.user_directory import normalize_status
+
+VERIFIED = 'verified'
+PENDING = 'pending'
+REJECTED = 'rejected'
+
+# state is VERIFIED/PENDING/REJECTED, or None if the user has no role record.
+AccountState = namedtuple('AccountState', ['state', 'reason'])
+
+# User.role holds camelCase names for some roles; user_directory uses snake_case.
+_directory_role = case(ROLE_ALIASES, value=User.role, else_=User.role)
+
+
+def _cache_key(email):
+    return f"account_state:{generate_email_hash(email)}"
+
+
+def _state(entry):
+    status = normalize_status(entry.status)
+    if status == REJECTED:
+        return REJECTED
+    return VERIFIED if entry.verified else PENDING
+
+
+def get_cached_account_state(email):
+    try:
+        cached = redis_client.get(_cache_key(email))
+    except Exception as e:
+        current_app.logger.error(f"Account state cache read failed: {str(e)}")
+        return None
+    if not cached:
+        return None
+    record = json.loads(cached)
+    reason = decrypt_data(record['reason']) if record.get('reason') else None
+    return AccountState(record['state'], reason)
+
+
+def _cache_account_state(email, account_state):
+    record = {
+        'state': account_state.state,
+        'reason': encrypt_data(account_state.reason) if account_state.reason else None
+    }
+    try:
+        redis_client.setex(_cache_key(email), current_app.config.get('ACCOUNT_STATE_CACHE_TTL', 60), json.dumps(record))
+    except Exception as e:
+        current_app.logger.error(f"Account state cache write failed: {str(e)}")
+
+
+def load_login_account(email):
+    """Returns (user, AccountState) for `email`, or (None, None) if there is no such user."""
+    row = (
+        db.session.query(User, UserDirectory)
+        .outerjoin(UserDirectory, and_(UserDirectory.user_id == User.id, UserDirectory.role == _directory_role))
+        .filter(User.email_hash.in_(email_hash_candidates(email)))
+        .first()
+    )
+    if row is None:
+        return None, None
+
+    user, entry = row
+    entity = None
+    if entry is None:
+        # No projection row yet (e.g. before `flask rebuild-user-directory`):
+        # fall back to the role table.
+        model = role_model(user.role)
+        entity = entry = db.session.get(model, user.id) if model else None
+        if entity is None:
+            return user, AccountState(None, None)
+
+    state = _state(entry)
+    reason = None
+    if state == REJECTED:
+        # Only rejections need the encrypted reason from the role row.
+        entity = entity or db.session.get(role_model(user.role), user.id)
+        reason = entity.description if entity else None
+    account_state = AccountState(state, reason)
+    if state != VERIFIED:
+        # A verified account still needs its password hash from the database.
+        _cache_account_state(email, account_state)
+    return user, account_state
+
+
+def invalidate_account_states(user_ids):
+    """Drops the cached state of `user_ids`; call after approve/reject commit."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    try:
+        users = User.query.options(load_only(User.id, User.email_encrypted)).filter(User.id.in_(user_ids))
+        keys = [_cache_key(user.email) for user in users]
+        if keys:
+            redis_client.delete(*keys)
+    except Exception as e:
+        current_app.logger.error(f"Account state invalidation failed: {str(e)}")
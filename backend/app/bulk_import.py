@@ -0,0 +1,317 @@
+# app/bulk_import.py
+"""Bulk onboarding import for hospital staff and pharmacy rosters.
+
+The uploaded CSV or NDJSON file is spooled to disk and processed in a
+background thread in chunks: rows are validated against the role schemas,
+encrypted and hashed on a worker pool, inserted with bulk_insert_mappings
+and the new accounts get an invitation email, one SMTP connection per
+batch. Progress and per-row errors are kept in Redis under the job id.
+
+Imported accounts get a random password; the invitation asks the user to
+set their own through the password reset flow.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from datetime import datetime, timedelta
+from functools import partial
+import json
+import os
+import secrets
+import shutil
+import tempfile
+from threading import Thread
+import uuid
+
+import bleach
+from flask import current_app
+
+from app import db
+from app.change_versions import bump_change_version
+from app.encrypted_types import column_values
+from app.events import publish_event
+from app.models import ROLE_ALIASES, User, UserDirectory, role_model
+from app.password_hashing import get_engine
+from app.role_schemas import EMAIL_PATTERN, PHONE_PATTERN, build_role_entity, validate_role_fields
+from app.security import email_hash_candidates, encrypt_data, generate_email_hash, redis_client
+from app.utils import generate_telephone_hash, send_invitation_emails, telephone_hash_candidates
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+IMPORT_ROLES = {'doctor', 'hospitalAdmin', 'pharmacist', 'pharmacyAdmin'}
+# CSV cells are strings; these are converted to match the role schemas.
+CSV_INT_FIELDS = {'birthyear', 'hospital_id', 'pharmacy_id'}
+JOB_TTL = timedelta(days=1)
+MAX_REPORTED_ERRORS = 1000
+
+
+def _job_key(job_id):
+    return f"import_job:{job_id}"
+
+
+def _errors_key(job_id):
+    return f"import_job:{job_id}:errors"
+
+
+def start_import(upload, import_format, approve, admin_id):
+    """Spools `upload` to disk and starts the import thread; returns the job id."""
+    job_id = uuid.uuid4().hex
+    fd, path = tempfile.mkstemp(suffix=f".{import_format}")
+    with os.fdopen(fd, 'wb') as f:
+        shutil.copyfileobj(upload.stream, f, 64 * 1024)
+
+    redis_client.hset(_job_key(job_id), mapping={
+        'status': 'queued',
+        'format': import_format,
+        'admin': str(admin_id),
+        'processed': 0,
+        'inserted': 0,
+        'failed': 0,
+        'created_at': datetime.utcnow().isoformat()
+    })
+    redis_client.expire(_job_key(job_id), JOB_TTL)
+
+    app = current_app._get_current_object()
+    Thread(target=_run_job, args=(app, job_id, path, import_format, approve), daemon=True).start()
+    return job_id
+
+
+def get_import_job(job_id):
+    job = redis_client.hgetall(_job_key(job_id))
+    if not job:
+        return None
+    for field in ('processed', 'inserted', 'failed'):
+        job[field] = int(job.get(field, 0))
+    job['errors'] = [json.loads(error) for error in redis_client.lrange(_errors_key(job_id), 0, -1)]
+    return job
+
+
+def _coerce_csv_row(row):
+    values = {}
+    for key, value in row.items():
+        if key is None or value is None or value == '':
+            continue
+        value = value.strip()
+        if key in CSV_INT_FIELDS and value.lstrip('-').isdigit():
+            value = int(value)
+        elif value[:1] in '[{':
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        values[key] = value
+    return values
+
+
+def _read_rows(path, import_format):
+    """Yields (line number, row dict or None if unparsable)."""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if import_format == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, _coerce_csv_row(row)
+            return
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+
+
+def _validate_row(row):
+    """Returns (normalized row, error message)."""
+    if row is None:
+        return None, 'Unparsable row'
+    role = str(row.get('role', '')).strip()
+    if role not in IMPORT_ROLES:
+        return None, f"role must be one of: {', '.join(sorted(IMPORT_ROLES))}"
+
+    email = str(row.get('email', '')).strip().lower()
+    if not EMAIL_PATTERN.match(email):
+        return None, 'Invalid email format'
+    name = bleach.clean(str(row.get('name', ''))).strip()
+    if not name:
+        return None, 'name is required'
+    telephone = None
+    if row.get('telephone'):
+        telephone = bleach.clean(str(row['telephone'])).strip()
+        if not PHONE_PATTERN.match(telephone):
+            return None, 'Invalid phone number format'
+
+    error = validate_role_fields(role, row)
+    if error:
+        return None, error
+    return {**row, 'role': role, 'email': email, 'name': name, 'telephone': telephone}, None
+
+
+def _prepare_user(app, row):
+    """Encrypts and hashes one account (runs on the worker pool)."""
+    with app.app_context():
+        telephone = row['telephone']
+        return {
+            'role': row['role'],
+            'email_encrypted': encrypt_data(row['email']),
+            'email_hash': generate_email_hash(row['email']),
+            'password': get_engine().hash(secrets.token_urlsafe(32)),
+            'name_encrypted': encrypt_data(row['name']),
+            'telephone_encrypted': encrypt_data(telephone) if telephone else None,
+            'telephone_hash': generate_telephone_hash(telephone) if telephone else None,
+            'last_password_change': datetime.utcnow(),
+            'account_verified': True
+        }
+
+
+def _prepare_role(app, approve, item):
+    """Builds, seals and encrypts one role row (runs on the worker pool)."""
+    row, user_id, submitted_at = item
+    with app.app_context():
+        entity = build_role_entity(row['role'], user_id, row, submitted_at)
+        # The file never decides the verification state.
+        entity.verified = approve
+        entity.status = 'approved' if approve else 'pending'
+        return column_values(entity)
+
+
+def _conflicts(rows):
+    """Emails/phones of `rows` that already belong to an account."""
+    email_hashes = [h for row in rows for h in email_hash_candidates(row['email'])]
+    phone_hashes = [h for row in rows if row['telephone'] for h in telephone_hash_candidates(row['telephone'])]
+    taken = {h for (h,) in db.session.query(User.email_hash).filter(User.email_hash.in_(email_hashes))}
+    if phone_hashes:
+        taken |= {h for (h,) in db.session.query(User.telephone_hash).filter(User.telephone_hash.in_(phone_hashes))}
+    return taken
+
+
+def _insert(app, executor, approve, rows, user_maps):
+    """Inserts one group of prepared accounts and their role rows; does not commit."""
+    user_maps = [dict(user_map) for user_map in user_maps]
+    db.session.bulk_insert_mappings(User, user_maps, return_defaults=True)
+
+    submitted_at = datetime.utcnow()
+    items = [(row, user_map['id'], submitted_at) for row, user_map in zip(rows, user_maps)]
+    role_maps = list(executor.map(partial(_prepare_role, app, approve), items))
+
+    by_role = {}
+    for row, role_map in zip(rows, role_maps):
+        by_role.setdefault(row['role'], []).append(role_map)
+    for role, mappings in by_role.items():
+        db.session.bulk_insert_mappings(role_model(role), mappings)
+
+    db.session.bulk_insert_mappings(UserDirectory, [
+        {
+            'user_id': user_map['id'],
+            'role': ROLE_ALIASES.get(row['role'], row['role']),
+            'status': 'approved' if approve else 'pending',
+            'verified': approve,
+            'submitted_at': submitted_at
+        }
+        for row, user_map in zip(rows, user_maps)
+    ])
+
+
+def _record(job_id, processed=0, inserted=0, failed=0, errors=()):
+    pipe = redis_client.pipeline()
+    pipe.hincrby(_job_key(job_id), 'processed', processed)
+    pipe.hincrby(_job_key(job_id), 'inserted', inserted)
+    pipe.hincrby(_job_key(job_id), 'failed', failed)
+    for error in errors:
+        pipe.rpush(_errors_key(job_id), json.dumps(error))
+    pipe.ltrim(_errors_key(job_id), 0, MAX_REPORTED_ERRORS - 1)
+    pipe.expire(_errors_key(job_id), JOB_TTL)
+    pipe.execute()
+
+
+def _process_chunk(app, executor, job_id, chunk, approve, seen):
+    errors = []
+    valid = []
+    for line_number, raw in chunk:
+        row, error = _validate_row(raw)
+        if row is not None and row['email'] in seen:
+            error = 'Duplicate email in file'
+        if error:
+            errors.append({'line': line_number, 'error': error})
+            continue
+        seen.add(row['email'])
+        valid.append((line_number, row))
+
+    if valid:
+        taken = _conflicts([row for _, row in valid])
+        remaining = []
+        for line_number, row in valid:
+            hashes = set(email_hash_candidates(row['email']))
+            if row['telephone']:
+                hashes.update(telephone_hash_candidates(row['telephone']))
+            if hashes & taken:
+                errors.append({'line': line_number, 'error': 'Email or phone already registered'})
+            else:
+                remaining.append((line_number, row))
+        valid = remaining
+
+    inserted = []
+    if valid:
+        rows = [row for _, row in valid]
+        user_maps = list(executor.map(partial(_prepare_user, app), rows))
+        try:
+            _insert(app, executor, approve, rows, user_maps)
+            db.session.commit()
+            inserted = rows
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning(f"Import chunk failed, retrying row by row: {str(e)}")
+            # Isolate the offending rows (e.g. a duplicate license number).
+            for (line_number, row), user_map in zip(valid, user_maps):
+                try:
+                    _insert(app, executor, approve, [row], [user_map])
+                    db.session.commit()
+                    inserted.append(row)
+                except Exception as row_error:
+                    db.session.rollback()
+                    errors.append({'line': line_number, 'error': f"Insert failed: {row_error.__class__.__name__}"})
+
+    if inserted:
+        roles = {row['role'] for row in inserted}
+        bump_change_version(*roles)
+        for role in roles:
+            publish_event('submission', role)
+
+    batch_size = current_app.config.get('IMPORT_EMAIL_BATCH_SIZE', 50)
+    for start in range(0, len(inserted), batch_size):
+        batch = inserted[start:start + batch_size]
+        try:
+            failed = send_invitation_emails([(row['email'], row['name']) for row in batch])
+        except Exception as e:
+            current_app.logger.error(f"Invitation batch failed: {str(e)}")
+            failed = [row['email'] for row in batch]
+        for email in failed:
+            errors.append({'email': email, 'error': 'Account created, invitation email not sent'})
+
+    _record(job_id, processed=len(chunk), inserted=len(inserted),
+            failed=len(chunk) - len(inserted), errors=errors)
+
+
+def _run_job(app, job_id, path, import_format, approve):
+    with app.app_context():
+        redis_client.hset(_job_key(job_id), 'status', 'running')
+        chunk_size = current_app.config.get('IMPORT_CHUNK_SIZE', 200)
+        seen = set()
+        try:
+            with ThreadPoolExecutor(max_workers=current_app.config.get('IMPORT_WORKERS', 4)) as executor:
+                chunk = []
+                for item in _read_rows(path, import_format):
+                    chunk.append(item)
+                    if len(chunk) >= chunk_size:
+                        _process_chunk(app, executor, job_id, chunk, approve, seen)
+                        chunk = []
+                if chunk:
+                    _process_chunk(app, executor, job_id, chunk, approve, seen)
+            redis_client.hset(_job_key(job_id), mapping={
+                'status': 'completed',
+                'finished_at': datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Import job {job_id} failed: {str(e)}")
+            redis_client.hset(_job_key(job_id), mapping={'status': 'failed', 'error': str(e)})
+        finally:
+            os.remove(path)
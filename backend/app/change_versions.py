@@ -0,0 +1,89 @@
+# app/change_versions.py
+"""Per-role change versions and conditional GET for the admin read endpoints.
+
+Every write that changes a role's verification data (select_role, approve,
+reject and their batch/import variants) bumps `change_version:<role>` in
+Redis after it commits. Read endpoints derive a weak ETag from the versions
+they depend on, so a matching If-None-Match is answered with 304 before any
+database query or decryption.
+"""
+from functools import wraps
+import hashlib
+import secrets
+
+from flask import current_app, make_response, request
+
+from app.models import ROLE_ALIASES, ROLE_MODELS
+from app.security import redis_client
+
+ALL_ROLES = tuple(ROLE_MODELS)
+
+
+def _version_key(role):
+    return f"change_version:{role}"
+
+
+def bump_change_version(*roles):
+    """Bumps the version of each role; call after the change is committed."""
+    keys = [_version_key(ROLE_ALIASES.get(role, role)) for role in roles]
+    try:
+        pipe = redis_client.pipeline()
+        for key in keys:
+            pipe.incr(key)
+        pipe.execute()
+    except Exception as e:
+        current_app.logger.error(f"Change version bump failed: {str(e)}")
+        try:
+            # A missing version is re-seeded randomly, so old ETags cannot match.
+            redis_client.delete(*keys)
+        except Exception:
+            pass
+
+
+def get_change_versions(roles):
+    keys = [_version_key(role) for role in roles]
+    versions = redis_client.mget(keys)
+    missing = [key for key, version in zip(keys, versions) if version is None]
+    if missing:
+        pipe = redis_client.pipeline()
+        for key in missing:
+            # Random seed instead of 0: a lost key must not recreate an old version.
+            pipe.set(key, secrets.randbelow(2 ** 48), nx=True)
+        pipe.execute()
+        versions = redis_client.mget(keys)
+    return versions
+
+
+def compute_etag(scope, roles, *parts):
+    versions = get_change_versions(roles)
+    digest = hashlib.sha256('|'.join(map(str, (*versions, *parts))).encode()).hexdigest()[:20]
+    return f"{scope}-{digest}"
+
+
+def conditional_get(scope, roles=ALL_ROLES, vary=lambda: ()):
+    """Answers 304 when If-None-Match carries the current weak ETag.
+
+    `vary` returns extra ETag inputs (e.g. the caller's id); the query
+    string is always included. Apply below the auth decorators.
+    """
+    def wrapper(fn):
+        @wraps(fn)
+        def decorator(*args, **kwargs):
+            try:
+                etag = compute_etag(scope, roles, request.query_string.decode(), *vary())
+            except Exception as e:
+                current_app.logger.error(f"ETag computation failed: {str(e)}")
+                etag = None
+
+            if etag and request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            response = make_response(fn(*args, **kwargs))
+            if etag and response.status_code == 200:
+                response.set_etag(etag, weak=True)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorator
+    return wrapper
@@ -0,0 +1,80 @@
+# app/ciphertext_migration.py
+"""Background migration of legacy Fernet (v1) values to ciphertext v2.
+
+Walks every model with `EncryptedBinary` columns in primary-key order,
+rewrites v1 values as v2 and commits once per batch, so it can run next to
+live traffic and be restarted at any time (already converted rows are
+skipped).
+"""
+import time
+
+import click
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import undefer
+
+from app import db
+from app.encrypted_types import EncryptedBinary
+from app.security import decrypt_data, encrypt_data_v2, is_ciphertext_v2
+
+DEFAULT_BATCH_SIZE = 200
+
+
+def _binary_columns(model):
+    return [column.key for column in model.__table__.columns if isinstance(column.type, EncryptedBinary)]
+
+
+def _encrypted_models():
+    return [
+        mapper.class_ for mapper in db.Model.registry.mappers
+        if _binary_columns(mapper.class_)
+    ]
+
+
+def migrate_model(model, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+    columns = _binary_columns(model)
+    pk = inspect(model).primary_key[0]
+    last_pk = None
+    converted = 0
+
+    while True:
+        query = model.query.options(*[undefer(getattr(model, c)) for c in columns]).order_by(pk)
+        if last_pk is not None:
+            query = query.filter(pk > last_pk)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+
+        for row in rows:
+            for column in columns:
+                value = getattr(row, column)
+                if value and not is_ciphertext_v2(value):
+                    setattr(row, column, encrypt_data_v2(decrypt_data(value)))
+                    converted += 1
+        last_pk = getattr(rows[-1], pk.key)
+
+        db.session.commit()
+        db.session.expunge_all()
+        current_app.logger.info(
+            f"Ciphertext migration: {model.__tablename__} up to {pk.key}={last_pk}, {converted} values converted"
+        )
+        if pause:
+            time.sleep(pause)
+
+    return converted
+
+
+def migrate_all(batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+    results = {}
+    for model in _encrypted_models():
+        results[model.__tablename__] = migrate_model(model, batch_size=batch_size, pause=pause)
+    return results
+
+
+@click.command('migrate-ciphertexts')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between batches.')
+def migrate_ciphertexts_command(batch_size, pause):
+    """Rewrite legacy Fernet values in binary columns as ciphertext v2."""
+    for table, converted in migrate_all(batch_size=batch_size, pause=pause).items():
+        click.echo(f"{table}: {converted} values converted")
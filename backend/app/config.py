@@ -26,7 +26,100 @@ class Config:
     REDIS_URL = os.getenv('REDIS_URL', "redis://localhost:6379/0")
     RATELIMIT_STORAGE_URI = REDIS_URL
     RATELIMIT_STRATEGY = os.getenv('RATELIMIT_STRATEGY', "fixed-window")
+    # Fall back to per-process limits while Redis is unreachable
+    RATELIMIT_IN_MEMORY_FALLBACK_ENABLED = os.getenv('RATELIMIT_IN_MEMORY_FALLBACK_ENABLED', 'True').lower() in ['true', '1']
     
     # Security
     SECRET_KEY = os.getenv('SECRET_KEY', os.urandom(24).hex())
-    TELEPHONE_PEPPER = os.getenv('TELEPHONE_PEPPER', os.urandom(16).hex())
\ No newline at end of file
+    TELEPHONE_PEPPER = os.getenv('TELEPHONE_PEPPER', os.urandom(16).hex())
+    # Previous peppers, comma-separated; only used for lookups during rotation.
+    TELEPHONE_PEPPER_PREVIOUS = [p.strip() for p in os.getenv('TELEPHONE_PEPPER_PREVIOUS', '').split(',') if p.strip()]
+
+    # Envelope encryption: local KMS master key file, and entries and
+    # lifetime (s) of each worker's cache of unwrapped data keys
+    KMS_MASTER_KEY_FILE = os.getenv('KMS_MASTER_KEY_FILE', 'kms_master_keys.json')
+    DATA_KEY_CACHE_SIZE = int(os.getenv('DATA_KEY_CACHE_SIZE', 1024))
+    DATA_KEY_CACHE_TTL = int(os.getenv('DATA_KEY_CACHE_TTL', 300))
+
+    # Upper bound on names held by each worker's autocomplete index
+    AUTOCOMPLETE_MAX_ENTRIES = int(os.getenv('AUTOCOMPLETE_MAX_ENTRIES', 50000))
+
+    # Verification inbox: per-role queue queries run on a bounded pool
+    INBOX_MAX_WORKERS = int(os.getenv('INBOX_MAX_WORKERS', 4))
+    INBOX_TIMEOUT = float(os.getenv('INBOX_TIMEOUT', 10))
+
+    # Bulk onboarding import
+    IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', 4))
+    IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', 200))
+    IMPORT_EMAIL_BATCH_SIZE = int(os.getenv('IMPORT_EMAIL_BATCH_SIZE', 50))
+
+    # Streaming exports
+    EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 500))
+    EXPORT_MAX_WORKERS = int(os.getenv('EXPORT_MAX_WORKERS', 4))
+
+    # Admin change notifications (Server-Sent Events); every open stream holds
+    # a request thread, so keep EVENTS_MAX_SUBSCRIBERS below the worker's threads
+    EVENTS_HEARTBEAT = int(os.getenv('EVENTS_HEARTBEAT', 20))
+    EVENTS_BUFFER_SIZE = int(os.getenv('EVENTS_BUFFER_SIZE', 100))
+    EVENTS_MAX_SUBSCRIBERS = int(os.getenv('EVENTS_MAX_SUBSCRIBERS', 50))
+    EVENTS_MAX_CONNECTION_AGE = int(os.getenv('EVENTS_MAX_CONNECTION_AGE', 3600))
+
+    # Login account-state cache for pending/rejected accounts (seconds)
+    ACCOUNT_STATE_CACHE_TTL = int(os.getenv('ACCOUNT_STATE_CACHE_TTL', 60))
+
+    # Password hashing pool: workers, calls allowed to wait, queue-time budget (s)
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 16))
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 5))
+
+    # Password hash engine for new hashes: pbkdf2, scrypt or argon2id.
+    # `flask calibrate-password-hash --target-ms 50` suggests cost values.
+    PASSWORD_HASH_ALGORITHM = os.getenv('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', 600000))
+    PASSWORD_SCRYPT_N = int(os.getenv('PASSWORD_SCRYPT_N', 32768))
+    PASSWORD_SCRYPT_R = int(os.getenv('PASSWORD_SCRYPT_R', 8))
+    PASSWORD_SCRYPT_P = int(os.getenv('PASSWORD_SCRYPT_P', 1))
+    PASSWORD_ARGON2_TIME_COST = int(os.getenv('PASSWORD_ARGON2_TIME_COST', 3))
+    PASSWORD_ARGON2_MEMORY_COST = int(os.getenv('PASSWORD_ARGON2_MEMORY_COST', 65536))
+    PASSWORD_ARGON2_PARALLELISM = int(os.getenv('PASSWORD_ARGON2_PARALLELISM', 4))
+
+    # Failed-login back-off: failures allowed per account/IP before blocks
+    # start, first block (s), counting window and maximum block (s)
+    ACCOUNT_LOCKOUT_THRESHOLD = int(os.getenv('ACCOUNT_LOCKOUT_THRESHOLD', 5))
+    LOGIN_IP_LOCKOUT_THRESHOLD = int(os.getenv('LOGIN_IP_LOCKOUT_THRESHOLD', 20))
+    LOGIN_BACKOFF_BASE = int(os.getenv('LOGIN_BACKOFF_BASE', 1))
+    LOCKOUT_DURATION = int(os.getenv('LOCKOUT_DURATION', 900))
+
+    # Login activity write-behind: flush interval (s, the staleness bound) and
+    # pending users that trigger an early flush
+    USER_ACTIVITY_FLUSH_INTERVAL = int(os.getenv('USER_ACTIVITY_FLUSH_INTERVAL', 10))
+    USER_ACTIVITY_MAX_BUFFER = int(os.getenv('USER_ACTIVITY_MAX_BUFFER', 1000))
+
+    # Encrypted profile cache for /api/admin/profile and login (seconds)
+    PROFILE_CACHE_TTL = int(os.getenv('PROFILE_CACHE_TTL', 300))
+
+    # Opt-in per-process near-cache for hot Redis keys (see app/near_cache.py).
+    # Mode is `tracking` (Redis 6+ client tracking) or `keyspace` notifications.
+    NEAR_CACHE_ENABLED = os.getenv('NEAR_CACHE_ENABLED', 'False').lower() in ['true', '1']
+    NEAR_CACHE_MODE = os.getenv('NEAR_CACHE_MODE', 'tracking')
+    NEAR_CACHE_PREFIXES = [p.strip() for p in os.getenv('NEAR_CACHE_PREFIXES', 'revoked_token:,reg_attempt:,login_block:').split(',') if p.strip()]
+    NEAR_CACHE_MAX_ENTRIES = int(os.getenv('NEAR_CACHE_MAX_ENTRIES', 10000))
+    NEAR_CACHE_MAX_AGE = int(os.getenv('NEAR_CACHE_MAX_AGE', 30))
+
+    # Redis circuit breaker: command timeout (s), consecutive failures that
+    # open it, seconds before a half-open probe
+    REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', 0.5))
+    REDIS_BREAKER_FAILURES = int(os.getenv('REDIS_BREAKER_FAILURES', 5))
+    REDIS_BREAKER_RESET_TIMEOUT = int(os.getenv('REDIS_BREAKER_RESET_TIMEOUT', 10))
+    RATELIMIT_STORAGE_OPTIONS = {'socket_timeout': REDIS_SOCKET_TIMEOUT, 'socket_connect_timeout': REDIS_SOCKET_TIMEOUT}
+
+    # Degraded modes while Redis is unavailable:
+    # revocation: snapshot (local copy of TokenBlacklist), deny or allow
+    # CSRF: deny, or signature (valid signature and age, single use not enforced)
+    # login back-off: local (per-process counters) or open
+    REDIS_DEGRADED_REVOCATION = os.getenv('REDIS_DEGRADED_REVOCATION', 'snapshot')
+    REVOCATION_SNAPSHOT_TTL = int(os.getenv('REVOCATION_SNAPSHOT_TTL', 60))
+    REDIS_DEGRADED_CSRF = os.getenv('REDIS_DEGRADED_CSRF', 'deny')
+    REDIS_DEGRADED_LOGIN_THROTTLE = os.getenv('REDIS_DEGRADED_LOGIN_THROTTLE', 'local')
+    LOGIN_THROTTLE_LOCAL_MAX_KEYS = int(os.getenv('LOGIN_THROTTLE_LOCAL_MAX_KEYS', 10000))
@@ -0,0 +1,167 @@
+# app/directory.py
+"""Materialized directory of approved hospitals and pharmacies.
+
+The public registration lookups (`/verified-hospital`, `/verified-pharmacy`)
+are served from a snapshot of `{id, name, status}` entries kept in Redis, so
+they never decrypt role rows. approve/reject update single entries; the full
+snapshot is only rebuilt from the database when it is missing. Every change
+bumps a version counter that doubles as the response ETag, and each worker
+keeps the parsed snapshot until the version moves.
+"""
+from collections import namedtuple
+import json
+import secrets
+from threading import Lock
+
+import click
+from flask import current_app
+import redis
+
+from app import db
+from app.models import Hospital, Pharmacy, User
+from app.security import redis_client
+
+DIRECTORY_MODELS = {
+    'hospital': Hospital,
+    'pharmacy': Pharmacy
+}
+
+REBUILD_ATTEMPTS = 5
+
+Snapshot = namedtuple('Snapshot', ['version', 'entries'])
+
+_snapshots = {}
+_lock = Lock()
+
+
+def _entries_key(directory_type):
+    return f"directory:{directory_type}:entries"
+
+
+def _version_key(directory_type):
+    return f"directory:{directory_type}:version"
+
+
+def _is_listed(entity):
+    return bool(entity.verified and entity.status and entity.status.lower().strip() == 'approved')
+
+
+def _entry(entity, user):
+    return {'id': user.id, 'status': entity.status, 'name': user.name}
+
+
+def _seed_version(directory_type):
+    # Random seed instead of 0: a lost key must not recreate an old version.
+    redis_client.set(_version_key(directory_type), secrets.randbelow(2 ** 48), nx=True)
+
+
+def _read_entries(model):
+    entries = {}
+    rows = db.session.query(model, User).join(User, User.id == model.user_id).filter(model.verified == True)
+    for entity, user in rows.yield_per(500):
+        if _is_listed(entity):
+            entries[str(user.id)] = json.dumps(_entry(entity, user))
+    return entries
+
+
+def rebuild_directory(directory_type, attempts=REBUILD_ATTEMPTS):
+    """Recomputes the whole snapshot from the role table.
+
+    The version is read before the database and watched until the swap, so
+    an update_directory_entry() landing in between makes the rebuild start
+    over instead of being overwritten.
+    """
+    model = DIRECTORY_MODELS[directory_type]
+    version_key = _version_key(directory_type)
+    building_key = _entries_key(directory_type) + ':building'
+    for _ in range(attempts):
+        _seed_version(directory_type)
+        read_at = redis_client.get(version_key)
+        entries = _read_entries(model)
+
+        with redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(version_key)
+                if pipe.get(version_key) != read_at:
+                    # An entry changed while we read the table: read it again.
+                    continue
+                pipe.multi()
+                pipe.delete(building_key)
+                if entries:
+                    pipe.hset(building_key, mapping=entries)
+                    pipe.rename(building_key, _entries_key(directory_type))
+                else:
+                    pipe.delete(_entries_key(directory_type))
+                pipe.incr(version_key)
+                pipe.execute()
+            except redis.WatchError:
+                continue
+        current_app.logger.info(f"Rebuilt {directory_type} directory with {len(entries)} entries")
+        return len(entries)
+    raise RuntimeError(f"{directory_type} directory kept changing during {attempts} rebuild attempts")
+
+
+def update_directory_entry(directory_type, entity):
+    """Adds, refreshes or drops `entity` after approve/reject."""
+    update_directory_entries(directory_type, [entity])
+
+
+def update_directory_entries(directory_type, entities):
+    """update_directory_entry() for many entities: one user lookup, one pipeline."""
+    if directory_type not in DIRECTORY_MODELS:
+        return
+    try:
+        if redis_client.get(_version_key(directory_type)) is None:
+            # Not built yet; the next read rebuilds it from the database.
+            return
+        listed = [entity for entity in entities if _is_listed(entity)]
+        users = {
+            user.id: user for user in
+            User.query.filter(User.id.in_([entity.user_id for entity in listed]))
+        } if listed else {}
+        pipe = redis_client.pipeline()
+        for entity in entities:
+            user = users.get(entity.user_id)
+            if user is not None:
+                pipe.hset(_entries_key(directory_type), str(user.id), json.dumps(_entry(entity, user)))
+            else:
+                pipe.hdel(_entries_key(directory_type), str(entity.user_id))
+        pipe.incr(_version_key(directory_type))
+        pipe.execute()
+    except Exception as e:
+        current_app.logger.error(f"Directory update failed, forcing rebuild: {str(e)}")
+        try:
+            redis_client.delete(_version_key(directory_type))
+        except Exception:
+            pass
+
+
+def get_snapshot(directory_type):
+    """Current snapshot, entries ordered by id."""
+    version = redis_client.get(_version_key(directory_type))
+    if version is None:
+        rebuild_directory(directory_type)
+        version = redis_client.get(_version_key(directory_type))
+
+    with _lock:
+        snapshot = _snapshots.get(directory_type)
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+
+    raw = redis_client.hgetall(_entries_key(directory_type))
+    entries = sorted((json.loads(value) for value in raw.values()), key=lambda entry: entry['id'])
+    snapshot = Snapshot(version, entries)
+    with _lock:
+        _snapshots[directory_type] = snapshot
+    return snapshot
+
+
+def directory_etag(directory_type, snapshot):
+    return f"{directory_type}-v{snapshot.version}"
+
+
+@click.command('rebuild-directory')
+def rebuild_directory_command():
+    """Rebuild the verified hospital/pharmacy directory snapshots."""
+    for directory_type in DIRECTORY_MODELS:
+        click.echo(f"{directory_type}: {rebuild_directory(directory_type)} entries")
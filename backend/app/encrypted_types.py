@@ -0,0 +1,236 @@
+# app/encrypted_types.py
+"""Encrypted column types and a lazily-decrypting attribute wrapper.
+
+`*_encrypted` columns keep storing ciphertext. Every encrypted column also
+gets a plaintext attribute on the model without the `_encrypted` suffix
+(e.g. `hospital.status`). The value is decrypted on first read and cached on
+the instance; written values are encrypted at flush time, and only for the
+columns that actually changed.
+"""
+from sqlalchemy import LargeBinary, String, Text, event
+from sqlalchemy.orm import Session
+from sqlalchemy.types import TypeDecorator
+
+_CACHE_KEY = '_plaintext_cache'
+_SEALED_CACHE_KEY = '_sealed_cache'
+_SEAL_PENDING_KEY = '_seal_pending'
+
+
+class _PendingPlaintext(str):
+    """Marks a plaintext value waiting to be encrypted at flush."""
+    __slots__ = ()
+
+
+class _EncryptedMixin:
+
+    def encrypt(self, plaintext):
+        from app.security import encrypt_data
+        return encrypt_data(plaintext)
+
+    def process_bind_param(self, value, dialect):
+        # The before_flush listener normally encrypts these already; this is
+        # a safety net for paths that bypass the ORM flush (bulk operations).
+        if isinstance(value, _PendingPlaintext):
+            return self.encrypt(str(value))
+        return value
+
+
+def is_encrypted_column(column):
+    return isinstance(column.type, _EncryptedMixin)
+
+
+class EncryptedText(_EncryptedMixin, TypeDecorator):
+    """Text column holding ciphertext."""
+    impl = Text
+    # Read only from the concrete TypeDecorator, not from mixins.
+    cache_ok = True
+
+
+class EncryptedString(_EncryptedMixin, TypeDecorator):
+    """String(n) column holding ciphertext."""
+    impl = String
+    cache_ok = True
+
+
+class EncryptedBinary(_EncryptedMixin, TypeDecorator):
+    """LargeBinary column holding v2 (AES-GCM) ciphertext.
+
+    Legacy Fernet tokens written as strings are stored as their bytes and
+    still decrypt; the ciphertext migrator rewrites them to v2.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def encrypt(self, plaintext):
+        from app.security import encrypt_data_v2
+        return encrypt_data_v2(plaintext)
+
+    def process_bind_param(self, value, dialect):
+        value = super().process_bind_param(value, dialect)
+        if isinstance(value, str):
+            return value.encode()
+        return value
+
+
+class EncryptedAttribute:
+    """Plaintext view of an encrypted column.
+
+    Reads decrypt on first access and cache the result on the instance.
+    Writes mark the column with the pending plaintext; encryption happens
+    at flush. On envelope-enabled models (see app/envelope.py) the value
+    lives in the row's sealed blob instead of its own column.
+    """
+
+    def __init__(self, column_name):
+        self.column_name = column_name
+        self.name = column_name[:-len('_encrypted')]
+
+    def _is_sealed(self, instance):
+        return self.column_name in getattr(type(instance), '__envelope_fields__', ())
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        cache = instance.__dict__.setdefault(_CACHE_KEY, {})
+        if self.column_name not in cache:
+            sealed = _sealed_values(instance) if self._is_sealed(instance) else {}
+            if self.name in sealed:
+                cache[self.column_name] = sealed[self.name]
+            else:
+                ciphertext = getattr(instance, self.column_name)
+                if isinstance(ciphertext, _PendingPlaintext):
+                    cache[self.column_name] = str(ciphertext)
+                else:
+                    from app.security import decrypt_data
+                    cache[self.column_name] = decrypt_data(ciphertext) if ciphertext else None
+        return cache[self.column_name]
+
+    def __set__(self, instance, value):
+        cache = instance.__dict__.setdefault(_CACHE_KEY, {})
+        if self.column_name in cache and cache[self.column_name] == value:
+            return
+        if self._is_sealed(instance) and instance.sealed_fields is None and not instance.__dict__.get(_SEAL_PENDING_KEY):
+            # First write to an unsealed row: seal all its fields, not just this one.
+            seal_instance(instance)
+        cache[self.column_name] = value
+        if self._is_sealed(instance):
+            _sealed_values(instance)[self.name] = value
+            instance.__dict__[_SEAL_PENDING_KEY] = True
+            # The per-column ciphertext would be stale once the blob is resealed.
+            setattr(instance, self.column_name, None)
+        else:
+            setattr(instance, self.column_name, _PendingPlaintext(value) if value is not None else None)
+
+
+def _sealed_values(instance):
+    if _SEALED_CACHE_KEY not in instance.__dict__:
+        from app.envelope import open_sealed_fields
+        instance.__dict__[_SEALED_CACHE_KEY] = open_sealed_fields(instance)
+    return instance.__dict__[_SEALED_CACHE_KEY]
+
+
+def read_encrypted(instance, column_name):
+    """Plaintext of `column_name`, also for columns without a plain attribute."""
+    return type(instance).__encrypted_attributes__[column_name].__get__(instance, type(instance))
+
+
+def read_fields(instance, include_binary=False):
+    """Plaintext of every encrypted field, keyed by plain name.
+
+    Binary (document/media) columns are skipped unless `include_binary`.
+    """
+    model = type(instance)
+    return {
+        attribute.name: attribute.__get__(instance, model)
+        for column_name, attribute in model.__encrypted_attributes__.items()
+        if include_binary or not isinstance(model.__table__.columns[column_name].type, EncryptedBinary)
+    }
+
+
+def seal_instance(instance):
+    """Moves every per-column ciphertext of an envelope row into its sealed blob."""
+    for column_name in type(instance).__envelope_fields__:
+        attribute = type(instance).__encrypted_attributes__[column_name]
+        value = attribute.__get__(instance, type(instance))
+        _sealed_values(instance)[attribute.name] = value
+        if getattr(instance, column_name) is not None:
+            setattr(instance, column_name, None)
+    instance.__dict__[_SEAL_PENDING_KEY] = True
+    # Mark dirty even if every column was already empty.
+    instance.sealed_fields = instance.sealed_fields
+
+
+def _clear_plaintext_cache(target, attrs):
+    if attrs is None or 'sealed_fields' in attrs:
+        target.__dict__.pop(_SEALED_CACHE_KEY, None)
+        target.__dict__.pop(_SEAL_PENDING_KEY, None)
+        target.__dict__.pop(_CACHE_KEY, None)
+        return
+    cache = target.__dict__.get(_CACHE_KEY)
+    if cache:
+        for attr in attrs:
+            cache.pop(attr, None)
+
+
+def _clear_plaintext_cache_on_refresh(target, context, attrs):
+    _clear_plaintext_cache(target, attrs)
+
+
+def with_encrypted_attributes(cls):
+    """Adds plaintext attributes for the model's encrypted columns.
+
+    Columns whose plain name is already taken (e.g. `HospitalAdmin.hospital_id`)
+    get no attribute but can still be read through `read_encrypted()`.
+    """
+    attributes = {}
+    for column in cls.__table__.columns:
+        if not is_encrypted_column(column):
+            continue
+        attribute = EncryptedAttribute(column.key)
+        attributes[column.key] = attribute
+        if not hasattr(cls, attribute.name):
+            setattr(cls, attribute.name, attribute)
+    cls.__encrypted_attributes__ = attributes
+
+    if getattr(cls, '__envelope__', False):
+        # Binary columns hold large documents and stay out of the sealed blob.
+        cls.__envelope_fields__ = frozenset(
+            key for key, attribute in attributes.items()
+            if not isinstance(cls.__table__.columns[key].type, EncryptedBinary)
+        )
+
+    event.listen(cls, 'expire', _clear_plaintext_cache)
+    event.listen(cls, 'refresh', _clear_plaintext_cache_on_refresh)
+    return cls
+
+
+def encrypt_pending(instance):
+    """Reseals and encrypts the instance's pending plaintext values in place."""
+    table = getattr(type(instance), '__table__', None)
+    if table is None:
+        return
+    if instance.__dict__.pop(_SEAL_PENDING_KEY, False):
+        from app.envelope import seal_fields
+        instance.sealed_fields = seal_fields(instance, _sealed_values(instance))
+    for column in table.columns:
+        if not is_encrypted_column(column):
+            continue
+        value = instance.__dict__.get(column.key)
+        if isinstance(value, _PendingPlaintext):
+            setattr(instance, column.key, column.type.encrypt(str(value)))
+
+
+def column_values(instance):
+    """Column values of a transient instance, encrypted, for bulk inserts."""
+    encrypt_pending(instance)
+    return {
+        column.key: instance.__dict__[column.key]
+        for column in type(instance).__table__.columns
+        if column.key in instance.__dict__
+    }
+
+
+@event.listens_for(Session, 'before_flush')
+def _encrypt_pending_plaintext(session, flush_context, instances):
+    for instance in list(session.new) + list(session.dirty):
+        encrypt_pending(instance)
@@ -0,0 +1,328 @@
+# app/envelope.py
+"""Row-level envelope encryption.
+
+Every envelope-enabled row gets its own data key (DEK). The DEK is wrapped
+by a master key from the KMS and stored next to the row; the row's small
+encrypted fields are packed into one AES-GCM blob (`sealed_fields`) that is
+opened once per row. Unwrapped DEKs are kept in a bounded TTL cache.
+
+Rotating the master key only re-wraps DEKs; row data is never rewritten.
+`LocalKMS` is a file-based stand-in for a real KMS.
+"""
+from collections import OrderedDict
+import base64
+import fcntl
+import json
+import os
+import secrets
+import tempfile
+from threading import Lock
+import time
+
+import click
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from flask import current_app
+from sqlalchemy import inspect, or_
+
+from app import db
+
+SEALED_V3 = 0x03
+NONCE_SIZE = 12
+DEFAULT_BATCH_SIZE = 200
+
+
+class EnvelopeMixin:
+    """Columns required by envelope-encrypted models."""
+    __envelope__ = True
+
+    data_key_id = db.Column(db.String(64))
+    data_key_wrapped = db.Column(db.LargeBinary)
+    sealed_fields = db.Column(db.LargeBinary)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class LocalKMS:
+    """File-based master key provider.
+
+    File format: {"active_key_id": "...", "keys": {"<id>": "<base64 key>"}}.
+    If the file does not exist, the first process to start creates it with
+    a fresh master key; all others then read that file. Processes that meet
+    an unknown key id (e.g. after `flask rotate-master-key` ran elsewhere)
+    reload the file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = Lock()
+        with self._lock:
+            if not os.path.exists(self.path):
+                key_id = self._new_key_id()
+                self._create({'active_key_id': key_id, 'keys': {key_id: self._new_key()}})
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.active_key_id = data['active_key_id']
+        self._raw_keys = data['keys']
+        self._keys = {k: AESGCM(base64.urlsafe_b64decode(v)) for k, v in data['keys'].items()}
+
+    def _write_temp(self, data):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.chmod(tmp_path, 0o600)
+        return tmp_path
+
+    def _create(self, data):
+        """Creates the key file unless another process already has."""
+        tmp_path = self._write_temp(data)
+        try:
+            # link() fails if the path exists, and the file appears complete.
+            os.link(tmp_path, self.path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+
+    def _write(self, data):
+        os.replace(self._write_temp(data), self.path)
+
+    @staticmethod
+    def _new_key_id():
+        return f"mk-{secrets.token_hex(8)}"
+
+    @staticmethod
+    def _new_key():
+        return base64.urlsafe_b64encode(AESGCM.generate_key(bit_length=256)).decode()
+
+    def wrap(self, data_key):
+        nonce = os.urandom(NONCE_SIZE)
+        key_id = self.active_key_id
+        return key_id, nonce + self._keys[key_id].encrypt(nonce, data_key, key_id.encode())
+
+    def unwrap(self, key_id, wrapped):
+        wrapped = bytes(wrapped)
+        key = self._keys.get(key_id)
+        if key is None:
+            with self._lock:
+                self._load()
+                key = self._keys.get(key_id)
+            if key is None:
+                raise KeyError(f"Unknown master key: {key_id}")
+        return key.decrypt(wrapped[:NONCE_SIZE], wrapped[NONCE_SIZE:], key_id.encode())
+
+    def rotate(self):
+        with self._lock, open(f"{self.path}.lock", 'a') as lock_file:
+            # Serializes rotations across processes; the file may have changed.
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._load()
+            key_id = self._new_key_id()
+            if key_id in self._raw_keys:
+                raise RuntimeError(f"Master key id {key_id} already exists.")
+            keys = dict(self._raw_keys)
+            keys[key_id] = self._new_key()
+            self._write({'active_key_id': key_id, 'keys': keys})
+            self._load()
+        return key_id
+
+
+_kms = None
+_data_key_cache = None
+_kms_lock = Lock()
+
+
+def get_kms():
+    global _kms
+    if _kms is None:
+        with _kms_lock:
+            if _kms is None:
+                _kms = LocalKMS(current_app.config.get('KMS_MASTER_KEY_FILE', 'kms_master_keys.json'))
+    return _kms
+
+
+def get_data_key_cache():
+    """The per-process cache of unwrapped DEKs, sized from the app config."""
+    global _data_key_cache
+    if _data_key_cache is None:
+        with _kms_lock:
+            if _data_key_cache is None:
+                _data_key_cache = TTLCache(
+                    maxsize=current_app.config.get('DATA_KEY_CACHE_SIZE', 1024),
+                    ttl=current_app.config.get('DATA_KEY_CACHE_TTL', 300)
+                )
+    return _data_key_cache
+
+
+def _row_aad(instance):
+    mapper = inspect(type(instance))
+    pk = ':'.join(str(getattr(instance, column.key)) for column in mapper.primary_key)
+    return f"{mapper.local_table.name}:{pk}".encode()
+
+
+def _unwrap_data_key(data_key_id, data_key_wrapped):
+    cache_key = (data_key_id, bytes(data_key_wrapped))
+    cache = get_data_key_cache()
+    data_key = cache.get(cache_key)
+    if data_key is None:
+        data_key = get_kms().unwrap(*cache_key)
+        cache.set(cache_key, data_key)
+    return data_key
+
+
+def _data_key(instance):
+    if instance.data_key_wrapped is None:
+        data_key = AESGCM.generate_key(bit_length=256)
+        instance.data_key_id, instance.data_key_wrapped = get_kms().wrap(data_key)
+        get_data_key_cache().set((instance.data_key_id, bytes(instance.data_key_wrapped)), data_key)
+        return data_key
+    return _unwrap_data_key(instance.data_key_id, instance.data_key_wrapped)
+
+
+def sealed_blob(instance):
+    """(aad, data key id, wrapped data key, blob) of a sealed row, or None.
+
+    Plain values only, so open_sealed_blob() can run where the ORM instance
+    must not be touched (e.g. on a worker thread).
+    """
+    if not instance.sealed_fields:
+        return None
+    return (_row_aad(instance), instance.data_key_id,
+            bytes(instance.data_key_wrapped), bytes(instance.sealed_fields))
+
+
+def open_sealed_blob(aad, data_key_id, data_key_wrapped, blob):
+    """Returns the fields packed in `blob` as a dict."""
+    if blob[0] != SEALED_V3:
+        raise RuntimeError("Unknown sealed fields format.")
+    try:
+        nonce = blob[1:1 + NONCE_SIZE]
+        data_key = _unwrap_data_key(data_key_id, data_key_wrapped)
+        return json.loads(AESGCM(data_key).decrypt(nonce, blob[1 + NONCE_SIZE:], aad))
+    except Exception:
+        current_app.logger.error("Sealed fields decryption failed.")
+        raise RuntimeError("Decryption failed.")
+
+
+def open_sealed_fields(instance):
+    """Returns the row's sealed fields as a dict ({} if the row is not sealed)."""
+    sealed = sealed_blob(instance)
+    return open_sealed_blob(*sealed) if sealed else {}
+
+
+def seal_fields(instance, values):
+    nonce = os.urandom(NONCE_SIZE)
+    ciphertext = AESGCM(_data_key(instance)).encrypt(
+        nonce, json.dumps(values).encode(), _row_aad(instance)
+    )
+    return bytes((SEALED_V3,)) + nonce + ciphertext
+
+
+def _envelope_models():
+    return [
+        mapper.class_ for mapper in db.Model.registry.mappers
+        if getattr(mapper.class_, '__envelope__', False)
+    ]
+
+
+def walk_in_batches(model, criteria, batch_size):
+    pk = inspect(model).primary_key[0]
+    last_pk = None
+    while True:
+        query = model.query.filter(criteria).order_by(pk)
+        if last_pk is not None:
+            query = query.filter(pk > last_pk)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_pk = getattr(rows[-1], pk.key)
+
+
+def seal_existing_rows(batch_size=DEFAULT_BATCH_SIZE):
+    """Moves per-column ciphertexts of unsealed or partially sealed rows into their sealed blob."""
+    from app.encrypted_types import seal_instance
+
+    results = {}
+    for model in _envelope_models():
+        sealed = 0
+        # Rows sealed only partially still carry per-column ciphertexts.
+        criteria = or_(model.sealed_fields.is_(None), *[
+            getattr(model, column_name).isnot(None) for column_name in model.__envelope_fields__
+        ])
+        for rows in walk_in_batches(model, criteria, batch_size):
+            for row in rows:
+                seal_instance(row)
+            db.session.commit()
+            sealed += len(rows)
+        results[model.__tablename__] = sealed
+    return results
+
+
+def rewrap_data_keys(batch_size=DEFAULT_BATCH_SIZE):
+    """Re-wraps every DEK that is not under the active master key."""
+    kms = get_kms()
+    results = {}
+    for model in _envelope_models():
+        rewrapped = 0
+        criteria = model.data_key_wrapped.isnot(None) & (model.data_key_id != kms.active_key_id)
+        for rows in walk_in_batches(model, criteria, batch_size):
+            for row in rows:
+                data_key = kms.unwrap(row.data_key_id, row.data_key_wrapped)
+                row.data_key_id, row.data_key_wrapped = kms.wrap(data_key)
+            db.session.commit()
+            rewrapped += len(rows)
+        results[model.__tablename__] = rewrapped
+    get_data_key_cache().clear()
+    return results
+
+
+@click.command('seal-rows')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+def seal_rows_command(batch_size):
+    """Pack per-column ciphertexts into row-level sealed blobs."""
+    for table, count in seal_existing_rows(batch_size=batch_size).items():
+        click.echo(f"{table}: {count} rows sealed")
+
+
+@click.command('rotate-master-key')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+def rotate_master_key_command(batch_size):
+    """Create a new master key and re-wrap all data keys under it."""
+    key_id = get_kms().rotate()
+    click.echo(f"Active master key: {key_id}")
+    for table, count in rewrap_data_keys(batch_size=batch_size).items():
+        click.echo(f"{table}: {count} data keys re-wrapped")
@@ -0,0 +1,148 @@
+# app/events.py
+"""Change notifications for the admin dashboard over Server-Sent Events.
+
+Writers publish compact JSON notifications (`{"type", "role", "id"}`, never
+personal data) on one Redis channel. Each worker process holds a single
+pub/sub subscription and fans messages out to its SSE connections, each
+with a bounded buffer: a connection that falls behind has its buffer
+replaced by one `resync` event, telling the client to refetch everything.
+Idle connections only cost a heartbeat comment every EVENTS_HEARTBEAT
+seconds, but each open stream occupies one request thread (or greenlet) of
+its worker for its whole life; EVENTS_MAX_SUBSCRIBERS caps them per process
+and further connections get 503.
+"""
+import json
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+import time
+
+from flask import current_app
+
+from app.models import ROLE_ALIASES
+from app.security import redis_client
+
+EVENTS_CHANNEL = 'admin:events'
+RESYNC = json.dumps({'type': 'resync'})
+
+_subscribers = set()
+_lock = Lock()
+_listener = None
+
+
+class SubscriberLimitReached(Exception):
+    pass
+
+
+def publish_event(event_type, role=None, entity_id=None, **extra):
+    """Publishes one notification; failures are logged, never raised."""
+    payload = {'type': event_type, 'at': int(time.time()), **extra}
+    if role:
+        payload['role'] = ROLE_ALIASES.get(role, role)
+    if entity_id is not None:
+        payload['id'] = entity_id
+    try:
+        redis_client.publish(EVENTS_CHANNEL, json.dumps(payload))
+    except Exception as e:
+        current_app.logger.error(f"Event publish failed: {str(e)}")
+
+
+def _deliver(message):
+    with _lock:
+        subscribers = list(_subscribers)
+    for buffer in subscribers:
+        try:
+            buffer.put_nowait(message)
+        except Full:
+            # Slow client: drop what it has not read and ask it to resync.
+            with buffer.mutex:
+                buffer.queue.clear()
+            buffer.put_nowait(RESYNC)
+
+
+def _ensure_listener(app):
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        def listen():
+            while True:
+                try:
+                    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(EVENTS_CHANNEL)
+                    for message in pubsub.listen():
+                        _deliver(message['data'])
+                except Exception as e:
+                    app.logger.error(f"Event subscriber error: {str(e)}")
+                    # Notifications may have been missed while disconnected.
+                    _deliver(RESYNC)
+                    time.sleep(5)
+
+        _listener = Thread(target=listen, daemon=True, name='admin-events')
+        _listener.start()
+
+
+def _sse(data, event='message'):
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+def _release(buffer):
+    with _lock:
+        _subscribers.discard(buffer)
+
+
+class _EventStream:
+    """Response body of one SSE connection.
+
+    Holds its subscriber slot from admission until the server closes the
+    response, also when the client left before the first chunk was sent
+    (an unstarted generator never runs its `finally`).
+    """
+
+    def __init__(self, buffer, chunks):
+        self._buffer = buffer
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self._chunks
+
+    def close(self):
+        self._chunks.close()
+        _release(self._buffer)
+
+
+def event_stream():
+    """Registers a connection and returns its SSE response body.
+
+    Raises SubscriberLimitReached when this process already serves
+    EVENTS_MAX_SUBSCRIBERS connections.
+    """
+    app = current_app._get_current_object()
+    heartbeat = app.config.get('EVENTS_HEARTBEAT', 20)
+    max_age = app.config.get('EVENTS_MAX_CONNECTION_AGE', 3600)
+    buffer = Queue(maxsize=app.config.get('EVENTS_BUFFER_SIZE', 100))
+
+    _ensure_listener(app)
+    with _lock:
+        # Checked and registered together, so concurrent connects cannot overshoot.
+        if len(_subscribers) >= app.config.get('EVENTS_MAX_SUBSCRIBERS', 50):
+            raise SubscriberLimitReached()
+        _subscribers.add(buffer)
+
+    def generate():
+        # Bounded lifetime: the client reconnects and is authenticated again.
+        deadline = time.monotonic() + max_age
+        try:
+            # Reconnect delay for the client, in milliseconds.
+            yield f"retry: {heartbeat * 1000}\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    message = buffer.get(timeout=heartbeat)
+                except Empty:
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(message, 'resync' if message == RESYNC else 'change')
+        finally:
+            _release(buffer)
+
+    return _EventStream(buffer, generate())
@@ -0,0 +1,202 @@
+# app/export.py
+"""Streaming NDJSON/CSV exports for compliance requests.
+
+Rows are read through a server-side cursor (`yield_per`) in chunks of
+EXPORT_CHUNK_SIZE. The request thread copies each chunk into plain tuples
+of the columns the requested fields need (still encrypted); a small worker
+pool decrypts and serializes those while the cursor fetches the next
+chunks, so ORM instances never leave the request thread. At most
+EXPORT_MAX_WORKERS chunks are in flight, so memory stays flat however many
+rows are exported. Only the requested fields are decrypted.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import csv
+from datetime import datetime
+from functools import partial
+import io
+from itertools import islice
+import json
+from threading import Lock
+import zlib
+
+from flask import current_app
+
+from app import db
+from app.encrypted_types import EncryptedAttribute, EncryptedBinary
+from app.envelope import open_sealed_blob, sealed_blob
+from app.models import ROLE_ALIASES, User, UserDirectory, role_model
+from app.security import decrypt_data
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXPORT_DATASETS = ('users', 'verification')
+
+USER_EXPORT_FIELDS = ('id', 'name', 'email', 'phone', 'role', 'status', 'verified', 'submitted_at')
+# User columns joined into verification records.
+RECORD_USER_FIELDS = ('id', 'name', 'email', 'phone')
+# UserDirectory columns of user exports.
+DIRECTORY_FIELDS = ('role', 'status', 'verified', 'submitted_at')
+USER_ATTRIBUTES = {'phone': 'telephone'}
+
+# How a field's value is stored (see _source()).
+PLAIN, ENCRYPTED, SEALED = 'plain', 'encrypted', 'sealed'
+
+_executor = None
+_executor_lock = Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config.get('EXPORT_MAX_WORKERS', 4),
+                    thread_name_prefix='export'
+                )
+    return _executor
+
+
+def record_fields(model):
+    """Exportable fields of a role table: plain columns and non-binary encrypted fields."""
+    fields = list(RECORD_USER_FIELDS) + ['verified', 'submitted_at']
+    for column_name, attribute in model.__encrypted_attributes__.items():
+        if not isinstance(model.__table__.columns[column_name].type, EncryptedBinary):
+            fields.append(attribute.name)
+    return tuple(fields)
+
+
+def available_fields(dataset, role=None):
+    if dataset == 'users':
+        return USER_EXPORT_FIELDS
+    return record_fields(role_model(role))
+
+
+def _source(model, attribute):
+    """(kind, column key, attribute) to read `attribute` of `model` from raw columns."""
+    descriptor = getattr(model, attribute)
+    if not isinstance(descriptor, EncryptedAttribute):
+        return PLAIN, attribute, attribute
+    if descriptor.column_name in getattr(model, '__envelope_fields__', ()):
+        return SEALED, descriptor.column_name, descriptor.name
+    return ENCRYPTED, descriptor.column_name, descriptor.name
+
+
+def _user_source(field):
+    return (1,) + _source(User, USER_ATTRIBUTES.get(field, field))
+
+
+def build_plan(dataset, fields, role=None):
+    """Per field: (field, index of the entity in the result row, kind, column key, attribute)."""
+    if dataset == 'users':
+        return tuple(
+            (field, 0) + _source(UserDirectory, field) if field in DIRECTORY_FIELDS
+            else (field,) + _user_source(field)
+            for field in fields
+        )
+    model = role_model(role)
+    return tuple(
+        (field,) + _user_source(field) if field in RECORD_USER_FIELDS
+        else (field, 0) + _source(model, field)
+        for field in fields
+    )
+
+
+def _snapshot(plan, row):
+    """Plain copy of what the plan needs from one result row (request thread)."""
+    sealed = sealed_blob(row[0]) if any(kind == SEALED for _, _, kind, _, _ in plan) else None
+    return sealed, tuple(getattr(row[index], key) for _, index, _, key, _ in plan)
+
+
+def _decode(plan, snapshot):
+    """Field values of one snapshot; decrypts only what the plan asks for."""
+    sealed, raw_values = snapshot
+    # The sealed blob is opened once per row.
+    sealed = open_sealed_blob(*sealed) if sealed else {}
+    values = {}
+    for (field, _, kind, _, attribute), raw in zip(plan, raw_values):
+        if kind == PLAIN:
+            values[field] = raw
+        elif kind == SEALED and attribute in sealed:
+            values[field] = sealed[attribute]
+        else:
+            # Encrypted columns, and fields of rows not sealed yet.
+            values[field] = decrypt_data(raw) if raw else None
+    return values
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _serialize_chunk(app, plan, export_format, snapshots):
+    """Decrypts and encodes one chunk of snapshots (runs on the worker pool)."""
+    with app.app_context():
+        if export_format == 'ndjson':
+            return ''.join(
+                json.dumps({field: _plain(value) for field, value in _decode(plan, snapshot).items()}) + '\n'
+                for snapshot in snapshots
+            )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for snapshot in snapshots:
+            values = _decode(plan, snapshot)
+            writer.writerow(['' if values[field] is None else _plain(values[field]) for field, *_ in plan])
+        return buffer.getvalue()
+
+
+def build_export_query(dataset, role=None, status=None, verified=None):
+    """Returns the query for `dataset`, ordered by primary key."""
+    if dataset == 'users':
+        query = db.session.query(UserDirectory, User).join(User, User.id == UserDirectory.user_id)
+        if status:
+            query = query.filter(UserDirectory.status == status)
+        if role:
+            query = query.filter(UserDirectory.role == ROLE_ALIASES.get(role, role))
+        return query.order_by(UserDirectory.user_id, UserDirectory.role)
+
+    model = role_model(role)
+    query = db.session.query(model, User).join(User, User.id == model.user_id)
+    if verified is not None:
+        query = query.filter(model.verified == verified)
+    return query.order_by(model.user_id)
+
+
+def stream_export(query, plan, export_format, compress=False):
+    """Generator of encoded export chunks; must run inside the request context."""
+    app = current_app._get_current_object()
+    chunk_size = current_app.config.get('EXPORT_CHUNK_SIZE', 500)
+    max_in_flight = current_app.config.get('EXPORT_MAX_WORKERS', 4)
+    executor = _get_executor()
+    serialize = partial(_serialize_chunk, app, plan, export_format)
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def encode(text):
+        data = text.encode('utf-8')
+        return compressor.compress(data) if compressor else data
+
+    if export_format == 'csv':
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow([field for field, *_ in plan])
+        yield encode(buffer.getvalue())
+
+    rows = iter(query.yield_per(chunk_size))
+    pending = deque()
+    exported = 0
+    while True:
+        chunk = [_snapshot(plan, row) for row in islice(rows, chunk_size)]
+        if chunk:
+            pending.append(executor.submit(serialize, chunk))
+            exported += len(chunk)
+        if pending and (len(pending) >= max_in_flight or not chunk):
+            data = encode(pending.popleft().result())
+            if data:
+                yield data
+        elif not chunk:
+            break
+
+    if compressor:
+        yield compressor.flush()
+    current_app.logger.info(f"Export finished: {exported} rows")
@@ -0,0 +1,198 @@
+# app/key_rotation.py
+"""Online, resumable key rotation.
+
+Deploy the new keys first (FERNET_KEYS / HMAC_KEYS / AEAD_ACTIVE_KEY_ID /
+TELEPHONE_PEPPER_PREVIOUS with the new key in front), then run
+`flask rotate-keys`. The job walks every encrypted table in primary-key
+order, rewrites values that are not under the current keys and commits
+once per batch. Progress is checkpointed in Redis per set of target keys,
+so an interrupted run continues where it stopped while a rotation to new
+keys starts from the beginning. Old keys can be removed once it completes.
+"""
+import hashlib
+import json
+import re
+import time
+
+import click
+from flask import current_app
+from sqlalchemy import inspect
+from sqlalchemy.orm import undefer
+
+from app import db
+from app.encrypted_types import EncryptedBinary, is_encrypted_column
+from app.envelope import walk_in_batches
+from app.models import User
+from app.security import (
+    aead_active_key_id,
+    decrypt_data,
+    encrypt_data_v2,
+    fernet_keys,
+    generate_email_hash,
+    hmac_keys,
+    is_current_ciphertext_v2,
+    is_current_fernet_token,
+    redis_client,
+    rotate_fernet_token
+)
+from app.utils import generate_telephone_hash
+
+CHECKPOINT_KEY = 'key_rotation:checkpoints:{}'
+STATS_KEY = 'key_rotation:stats:{}'
+DONE = 'done'
+DEFAULT_BATCH_SIZE = 200
+
+
+def target_fingerprint():
+    """Identifies the keys a run rotates to; checkpoints are kept per target."""
+    material = '|'.join((
+        fernet_keys[0],
+        hmac_keys[0].decode(),
+        str(aead_active_key_id),
+        current_app.config.get('TELEPHONE_PEPPER', '')
+    ))
+    return hashlib.sha256(material.encode()).hexdigest()[:16]
+
+
+def _encrypted_columns(model):
+    return [column for column in model.__table__.columns if is_encrypted_column(column)]
+
+
+def _encrypted_models():
+    return [mapper.class_ for mapper in db.Model.registry.mappers if _encrypted_columns(mapper.class_)]
+
+
+def _rotate_value(column, value):
+    """Returns the re-encrypted value, or None if it is already current."""
+    if not value:
+        return None
+    if isinstance(column.type, EncryptedBinary):
+        if is_current_ciphertext_v2(value):
+            return None
+        return encrypt_data_v2(decrypt_data(value))
+    if is_current_fernet_token(value):
+        return None
+    return rotate_fernet_token(value)
+
+
+def _rehash_user(user):
+    changed = 0
+    email = decrypt_data(user.email_encrypted)
+    email_hash = generate_email_hash(email)
+    if user.email_hash != email_hash:
+        user.email_hash = email_hash
+        changed += 1
+    if user.telephone_encrypted:
+        telephone_hash = generate_telephone_hash(normalize_telephone(decrypt_data(user.telephone_encrypted)))
+        if user.telephone_hash != telephone_hash:
+            user.telephone_hash = telephone_hash
+            changed += 1
+    return changed
+
+
+def normalize_telephone(telephone):
+    """The form registration and /users/search hash phone numbers in."""
+    return re.sub(r'[\s\-().]', '', telephone)
+
+
+def backfill_telephone_hashes(batch_size=DEFAULT_BATCH_SIZE):
+    """Fills users' missing telephone_hash from telephone_encrypted."""
+    filled = 0
+    criteria = User.telephone_hash.is_(None) & User.telephone_encrypted.isnot(None)
+    for rows in walk_in_batches(User, criteria, batch_size):
+        for user in rows:
+            telephone = decrypt_data(user.telephone_encrypted)
+            if telephone:
+                user.telephone_hash = generate_telephone_hash(normalize_telephone(telephone))
+                filled += 1
+        db.session.commit()
+    current_app.logger.info(f"telephone_hash backfill: {filled} users filled")
+    return filled
+
+
+def rotate_table(model, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+    table = model.__tablename__
+    fingerprint = target_fingerprint()
+    checkpoint_key, stats_key = CHECKPOINT_KEY.format(fingerprint), STATS_KEY.format(fingerprint)
+    checkpoint = redis_client.hget(checkpoint_key, table)
+    if checkpoint == DONE:
+        return None
+
+    columns = _encrypted_columns(model)
+    pk = inspect(model).primary_key[0]
+    last_pk = int(checkpoint) if checkpoint is not None else None
+    rows_seen = values_rotated = 0
+    started = time.monotonic()
+
+    while True:
+        query = model.query.options(*[undefer(getattr(model, c.key)) for c in columns]).order_by(pk)
+        if last_pk is not None:
+            query = query.filter(pk > last_pk)
+        rows = query.limit(batch_size).all()
+        if not rows:
+            break
+
+        for row in rows:
+            for column in columns:
+                rotated = _rotate_value(column, getattr(row, column.key))
+                if rotated is not None:
+                    setattr(row, column.key, rotated)
+                    values_rotated += 1
+            if table == 'users':
+                values_rotated += _rehash_user(row)
+
+        last_pk = getattr(rows[-1], pk.key)
+        rows_seen += len(rows)
+        db.session.commit()
+        db.session.expunge_all()
+
+        elapsed = time.monotonic() - started
+        stats = {
+            'rows': rows_seen,
+            'values_rotated': values_rotated,
+            'last_pk': last_pk,
+            'rows_per_sec': round(rows_seen / elapsed, 1) if elapsed else None
+        }
+        redis_client.hset(checkpoint_key, table, last_pk)
+        redis_client.hset(stats_key, table, json.dumps(stats))
+        current_app.logger.info(f"Key rotation {table}: {stats}")
+
+        if pause:
+            time.sleep(pause)
+
+    redis_client.hset(checkpoint_key, table, DONE)
+    return {'rows': rows_seen, 'values_rotated': values_rotated}
+
+
+def rotate_all(batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+    return {
+        model.__tablename__: rotate_table(model, batch_size=batch_size, pause=pause)
+        for model in _encrypted_models()
+    }
+
+
+def reset_checkpoints():
+    fingerprint = target_fingerprint()
+    redis_client.delete(CHECKPOINT_KEY.format(fingerprint), STATS_KEY.format(fingerprint))
+
+
+@click.command('rotate-keys')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+@click.option('--pause', default=0.05, show_default=True, help='Seconds to sleep between batches.')
+@click.option('--reset', is_flag=True, help='Forget previous checkpoints and start over.')
+def rotate_keys_command(batch_size, pause, reset):
+    """Re-encrypt and re-hash all rows under the current keys."""
+    if reset:
+        reset_checkpoints()
+    for table, result in rotate_all(batch_size=batch_size, pause=pause).items():
+        if result is None:
+            click.echo(f"{table}: already rotated (use --reset to run again)")
+        else:
+            click.echo(f"{table}: {result['rows']} rows, {result['values_rotated']} values rotated")
+
+
+@click.command('backfill-telephone-hash')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+def backfill_telephone_hash_command(batch_size):
+    """Compute telephone_hash for users registered before phone search."""
+    click.echo(f"users: {backfill_telephone_hashes(batch_size=batch_size)} telephone hashes filled")
@@ -0,0 +1,82 @@
+# app/login_activity.py
+"""Write-behind buffer for per-login activity fields on `users`.
+
+A successful login used to commit last_login_at and last_login_ip on the
+request thread. `record_login()` now only stores them in a per-process
+buffer keyed by user id, so repeated logins of the same account between
+flushes coalesce into one row update. A background thread writes the
+buffer as one batched UPDATE every USER_ACTIVITY_FLUSH_INTERVAL seconds
+(earlier once USER_ACTIVITY_MAX_BUFFER users are pending), which bounds how
+stale these columns can be. The buffer is also flushed at interpreter exit.
+"""
+import atexit
+from datetime import datetime
+from threading import Event, Lock, Thread
+
+from flask import current_app
+from sqlalchemy import update
+
+from app import db
+from app.models import User
+
+_buffer = {}
+_lock = Lock()
+_wake = Event()
+_flusher = None
+
+
+def record_login(user_id, ip):
+    """Buffers the activity update for a successful login of `user_id`."""
+    app = current_app._get_current_object()
+    with _lock:
+        _buffer[user_id] = {
+            'id': user_id,
+            'last_login_at': datetime.utcnow(),
+            'last_login_ip': ip
+        }
+        pending = len(_buffer)
+    _ensure_flusher(app)
+    if pending >= app.config.get('USER_ACTIVITY_MAX_BUFFER', 1000):
+        _wake.set()
+
+
+def flush(app):
+    """Writes all buffered updates in one executemany UPDATE; returns the row count."""
+    global _buffer
+    with _lock:
+        rows, _buffer = list(_buffer.values()), {}
+    if not rows:
+        return 0
+    with app.app_context():
+        try:
+            db.session.execute(update(User), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Login activity flush failed: {str(e)}")
+            with _lock:
+                # Keep newer updates recorded while this flush was running.
+                for row in rows:
+                    _buffer.setdefault(row['id'], row)
+            return 0
+        finally:
+            db.session.remove()
+    return len(rows)
+
+
+def _ensure_flusher(app):
+    global _flusher
+    with _lock:
+        if _flusher is not None:
+            return
+        interval = app.config.get('USER_ACTIVITY_FLUSH_INTERVAL', 10)
+
+        def run():
+            while True:
+                _wake.wait(interval)
+                _wake.clear()
+                flush(app)
+
+        _flusher = Thread(target=run, daemon=True, name='login-activity')
+        _flusher.start()
+        atexit.register(flush, app)
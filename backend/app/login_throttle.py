@@ -0,0 +1,140 @@
+# app/login_throttle.py
+"""Exponential back-off for failed logins, per account and per IP.
+
+Failures are counted in Redis in a fixed window of LOCKOUT_DURATION seconds
+that starts at the first failure. Once a counter reaches its threshold,
+every further failure blocks that account or IP for
+LOGIN_BACKOFF_BASE * 2 ** (failures - threshold) seconds, capped at
+LOCKOUT_DURATION. `login` checks the blocks before comparing the password
+hash and answers with Retry-After, so no worker thread sleeps.
+
+While Redis is unavailable, REDIS_DEGRADED_LOGIN_THROTTLE picks the
+fallback: `local` keeps the same counters per process (bounded by
+LOGIN_THROTTLE_LOCAL_MAX_KEYS), `open` skips throttling.
+"""
+from threading import Lock
+import time
+
+from flask import current_app
+import redis
+
+from app.security import generate_email_hash, redis_client
+
+_local_counts = {}  # attempts key -> (failures, window end)
+_local_blocks = {}  # block key -> blocked until
+_local_lock = Lock()
+
+
+def _scopes(email, ip):
+    # Accounts are keyed by email hash so unknown emails are throttled alike.
+    scopes = [('account', generate_email_hash(email), current_app.config.get('ACCOUNT_LOCKOUT_THRESHOLD', 5))]
+    if ip:
+        scopes.append(('ip', ip, current_app.config.get('LOGIN_IP_LOCKOUT_THRESHOLD', 20)))
+    return scopes
+
+
+def _attempts_key(scope, identifier):
+    return f"login_attempts:{scope}:{identifier}"
+
+
+def _block_key(scope, identifier):
+    return f"login_block:{scope}:{identifier}"
+
+
+def _degraded_locally(e):
+    """True if the local fallback should take over after Redis error `e`."""
+    if not isinstance(e, (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError)):
+        return False
+    return current_app.config.get('REDIS_DEGRADED_LOGIN_THROTTLE', 'local') == 'local'
+
+
+def _local_retry_after(scopes):
+    now = time.monotonic()
+    with _local_lock:
+        until = max(_local_blocks.get(_block_key(scope, identifier), 0) for scope, identifier, _ in scopes)
+    return max(round(until - now), 0)
+
+
+def _local_record(scopes, window, base):
+    now = time.monotonic()
+    retry_after = 0
+    with _local_lock:
+        if len(_local_counts) + len(_local_blocks) >= current_app.config.get('LOGIN_THROTTLE_LOCAL_MAX_KEYS', 10000):
+            for key in [key for key, (_, end) in _local_counts.items() if end <= now]:
+                del _local_counts[key]
+            for key in [key for key, until in _local_blocks.items() if until <= now]:
+                del _local_blocks[key]
+            if len(_local_counts) + len(_local_blocks) >= current_app.config.get('LOGIN_THROTTLE_LOCAL_MAX_KEYS', 10000):
+                # Still full of live entries: forget partial counts, keep blocks.
+                _local_counts.clear()
+        for scope, identifier, threshold in scopes:
+            key = _attempts_key(scope, identifier)
+            count, end = _local_counts.get(key, (0, now + window))
+            if end <= now:
+                count, end = 0, now + window
+            count += 1
+            _local_counts[key] = (count, end)
+            if count >= threshold:
+                delay = min(base * 2 ** min(count - threshold, 32), window)
+                _local_blocks[_block_key(scope, identifier)] = now + delay
+                retry_after = max(retry_after, delay)
+    return retry_after
+
+
+def _local_clear(identifier):
+    with _local_lock:
+        _local_counts.pop(_attempts_key('account', identifier), None)
+        _local_blocks.pop(_block_key('account', identifier), None)
+
+
+def login_retry_after(email, ip):
+    """Seconds until `email` or `ip` may try again (0 if not blocked)."""
+    scopes = _scopes(email, ip)
+    try:
+        # Plain TTL calls rather than a pipeline: the near-cache can answer them.
+        return max(max(redis_client.ttl(_block_key(scope, identifier)) for scope, identifier, _ in scopes), 0)
+    except Exception as e:
+        if _degraded_locally(e):
+            return _local_retry_after(scopes)
+        current_app.logger.error(f"Login back-off check failed: {str(e)}")
+        return 0
+
+
+def record_failed_login(email, ip):
+    """Counts a failure; returns the back-off now in force (0 if none)."""
+    window = current_app.config.get('LOCKOUT_DURATION', 900)
+    base = current_app.config.get('LOGIN_BACKOFF_BASE', 1)
+    scopes = _scopes(email, ip)
+    try:
+        pipe = redis_client.pipeline()
+        for scope, identifier, _ in scopes:
+            # The window starts at the first failure; INCR keeps the TTL, so
+            # later failures do not extend it.
+            pipe.set(_attempts_key(scope, identifier), 0, nx=True, ex=window)
+            pipe.incr(_attempts_key(scope, identifier))
+        failures = pipe.execute()[1::2]
+
+        retry_after = 0
+        pipe = redis_client.pipeline()
+        for (scope, identifier, threshold), count in zip(scopes, failures):
+            if count >= threshold:
+                delay = min(base * 2 ** min(count - threshold, 32), window)
+                pipe.set(_block_key(scope, identifier), count, ex=delay)
+                retry_after = max(retry_after, delay)
+        pipe.execute()
+        return retry_after
+    except Exception as e:
+        if _degraded_locally(e):
+            return _local_record(scopes, window, base)
+        current_app.logger.error(f"Login back-off update failed: {str(e)}")
+        return 0
+
+
+def clear_failed_logins(email):
+    """Resets the account's counter and block, e.g. after a successful login or password reset."""
+    identifier = generate_email_hash(email)
+    _local_clear(identifier)
+    try:
+        redis_client.delete(_attempts_key('account', identifier), _block_key('account', identifier))
+    except Exception as e:
+        current_app.logger.error(f"Login back-off reset failed: {str(e)}")
@@ -1,24 +1,42 @@
 # auth.py (Tam Sürüm)
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import math
+import re
+from threading import Lock
 import traceback
-from flask import Blueprint, make_response, request, jsonify, current_app
+from flask import Blueprint, Response, make_response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import (
     jwt_required, 
     get_jwt_identity
 )
 from itsdangerous import URLSafeSerializer
 from app import db, limiter
-from app.models import Admin, Doctor, Hospital, HospitalAdmin, Patient, Pharmacist, Pharmacy, PharmacyAdmin, User
+from app.models import Admin, AuditLog, Doctor, Hospital, HospitalAdmin, Patient, Pharmacist, Pharmacy, PharmacyAdmin, User, UserDirectory, ROLE_ALIASES, ROLE_MODELS, role_model
 from app.utils import (
     generate_secure_token,
-    rate_limit_key  # Ensure this is imported if it exists
+    rate_limit_key,  # Ensure this is imported if it exists
+    telephone_hash_candidates
 )
 from flask_wtf import CSRFProtect
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import joinedload
+from app.encrypted_types import read_fields
+from app.account_state import invalidate_account_states
+from app.profile_cache import get_profile
+from app.bulk_import import IMPORT_FORMATS, get_import_job, start_import
+from app.events import SubscriberLimitReached, event_stream, publish_event
+from app.export import EXPORT_DATASETS, EXPORT_FORMATS, available_fields, build_export_query, build_plan, stream_export
+from app.change_versions import bump_change_version, conditional_get
+from app.directory import DIRECTORY_MODELS, directory_etag, get_snapshot, update_directory_entries, update_directory_entry
+from app.name_index import MAX_RESULTS, autocomplete, publish_invalidation
+from app.serializers import QUEUE_PLANS, InvalidFields
+from app.role_schemas import EMAIL_PATTERN, PHONE_PATTERN
+from app.user_directory import sync_user_directory, sync_user_directory_many
 
 from app.security import (
-    encrypt_data,
-    decrypt_data,
+    email_hash_candidates,
     hash_data,
     role_required,
     validate_csrf_token
@@ -29,11 +47,135 @@ csrf = CSRFProtect()
 auth_ad = Blueprint('admin', __name__)
 
 DEFAULT_LIMITS = "20 per minute; 1000 per day"
+# Typeahead sends one request per keystroke
+AUTOCOMPLETE_LIMITS = "120 per minute; 5000 per day"
+
+
+def _directory_response(directory_type):
+    """One page of the verified directory snapshot, with ETag support."""
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = request.args.get('per_page', 10, type=int)
+    if per_page < 1:
+        per_page = 10
+
+    snapshot = get_snapshot(directory_type)
+    etag = directory_etag(directory_type, snapshot)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    else:
+        total = len(snapshot.entries)
+        start = (page - 1) * per_page
+        response = make_response(jsonify({
+            'data': snapshot.entries[start:start + per_page],
+            'pagination': {
+                'total': total,
+                'pages': math.ceil(total / per_page),
+                'current_page': page,
+                'per_page': per_page
+            }
+        }), 200)
+    response.set_etag(etag)
+    return response
+
+
+QUEUE_ORDERS = ('oldest', 'newest')
+QUEUE_FILTER_ERROR = "order must be oldest or newest; submitted_before/submitted_after must be ISO 8601 datetimes"
+
+
+def _parse_queue_datetime(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _queue_filters():
+    """order/submitted_before/submitted_after from the query string, or None if invalid."""
+    order = request.args.get('order', 'oldest')
+    if order not in QUEUE_ORDERS:
+        return None
+    try:
+        return {
+            'order': order,
+            'before': _parse_queue_datetime(request.args.get('submitted_before')),
+            'after': _parse_queue_datetime(request.args.get('submitted_after'))
+        }
+    except ValueError:
+        return None
+
+
+def _queue_users(model, filters=None):
+    """Users with an unverified `model` row, filtered and ordered by submitted_at.
+
+    Without `filters` they are read from the query string; returns None if
+    they are invalid. Rows not yet backfilled sort last.
+    """
+    if filters is None:
+        filters = _queue_filters()
+        if filters is None:
+            return None
+
+    query = User.query.join(model, model.user_id == User.id).filter(model.verified == False)
+    if filters['before']:
+        query = query.filter(model.submitted_at < filters['before'])
+    if filters['after']:
+        query = query.filter(model.submitted_at >= filters['after'])
+    submitted = model.submitted_at.desc() if filters['order'] == 'newest' else model.submitted_at.asc()
+    return query.order_by(model.submitted_at.is_(None), submitted, User.id)
+
+
+_inbox_executor = None
+_inbox_lock = Lock()
+
+
+def _get_inbox_executor():
+    global _inbox_executor
+    with _inbox_lock:
+        if _inbox_executor is None:
+            _inbox_executor = ThreadPoolExecutor(
+                max_workers=current_app.config.get('INBOX_MAX_WORKERS', 4),
+                thread_name_prefix='verification-inbox'
+            )
+    return _inbox_executor
+
+
+def _inbox_queue(app, model, filters, limit):
+    """First `limit` users and the total of one role queue, in its own app context."""
+    with app.app_context():
+        query = _queue_users(model, filters)
+        total = query.order_by(None).count()
+        rows = query.add_columns(model.submitted_at).limit(limit).all()
+        return {
+            'total': total,
+            'items': [
+                {
+                    'id': user.id,
+                    'name': user.name,
+                    'email': user.email,
+                    'submitted_at': submitted_at.isoformat() if submitted_at else None
+                }
+                for user, submitted_at in rows
+            ]
+        }
+
+def _serialize_queue_page(plan, fields, users):
+    """Loads the role rows of one queue page (only the columns `fields` need) and serializes them."""
+    model = plan.model
+    entities = {
+        entity.user_id: entity
+        for entity in model.query.options(plan.entity_options(fields)).filter(
+            model.user_id.in_([user.id for user in users])
+        )
+    }
+    return [plan.serialize(fields, user, entities[user.id]) for user in users if user.id in entities]
 
 @auth_ad.route('/profile', methods=['GET'])
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required() 
+@conditional_get('profile', roles=('admin',), vary=lambda: (get_jwt_identity(),))
 def get_admin_profile():
     try:
         if request.content_type and request.content_type != 'application/json':
@@ -41,18 +183,17 @@ def get_admin_profile():
             return jsonify({"message": "Content-Type must be application/json"}), 415
 
         admin_id = get_jwt_identity()
-        adminUser = User.query.filter_by(id=admin_id).first()
-        adminAdmin = Admin.query.filter_by(user_id=admin_id).first()
+        profile = get_profile(admin_id)
 
-        if adminUser and adminAdmin:
+        if profile and profile['admin']:
             admin_profile = {
-                "id": adminUser.id,
-                "name": decrypt_data(adminUser.name_encrypted),
-                "profile_image": decrypt_data(adminAdmin.profile_image_encrypted),
-                "security_level": decrypt_data(adminAdmin.security_level_encrypted),
-                "audit_access": decrypt_data(adminAdmin.audit_access_encrypted),
-                "email": decrypt_data(adminUser.email_encrypted),
-                "phone": decrypt_data(adminUser.telephone_encrypted),
+                "id": profile['id'],
+                "name": profile['name'],
+                "profile_image": profile['admin']['profile_image'],
+                "security_level": profile['admin']['security_level'],
+                "audit_access": profile['admin']['audit_access'],
+                "email": profile['email'],
+                "phone": profile['phone'],
             }
         else:
             current_app.logger.warning(f"Admin profile not found for ID: {admin_id}")
@@ -82,6 +223,7 @@ def get_admin_profile():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required() 
+@conditional_get('dashboard')
 def dashboard_stats():
     try:
         if request.content_type and request.content_type != 'application/json':
@@ -243,6 +385,7 @@ def dashboard_stats():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('users')
 def get_all_users():
     current_app.logger.info(f"Get all users endpoint called by admin - IP: {request.remote_addr}")
     
@@ -250,73 +393,30 @@ def get_all_users():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        # Define all user models with their role names
-        USER_MODELS = {
-            'hospital_admin': HospitalAdmin,
-            'hospital': Hospital,
-            'admin': Admin,
-            'patient': Patient,
-            'pharmacist': Pharmacist,
-            'pharmacy': Pharmacy,
-            'pharmacy_admin': PharmacyAdmin,
-            'doctor': Doctor
-        }
+        status = request.args.get('status', 'approved').lower().strip()
+        role = request.args.get('role')
+
+        query = UserDirectory.query.options(joinedload(UserDirectory.user)).filter(UserDirectory.status == status)
+        if role:
+            query = query.filter(UserDirectory.role == ROLE_ALIASES.get(role, role))
+        directory_pagination = query.order_by(UserDirectory.user_id, UserDirectory.role).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
 
-        approved_users = []
-        
-        # Get approved users from all tables in a single loop
-        for role, model in USER_MODELS.items():
-            users = model.query.filter(
-                decrypt_data(model.status_encrypted) == "approved"
-            ).all()
-            approved_users.extend([{'id': user.user_id, 'role': role, 'model_instance': user} for user in users])
-        
-        # Get unique user IDs
-        user_ids = list({user['id'] for user in approved_users})
-        
-        # Query base user information
-        user_query = User.query.filter(User.id.in_(user_ids)).distinct()
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
         users_data = []
-        for user in user_pagination.items:
-            # Get all roles for this user
-            user_roles = [u['role'] for u in approved_users if u['id'] == user.id]
-            
-            # Collect additional info for each role
-            additional_info = {}
-            for role in user_roles:
-                # Find the model instance for this user and role
-                model_instance = next(
-                    (u['model_instance'] for u in approved_users 
-                     if u['id'] == user.id and u['role'] == role),
-                    None
-                )
-                
-                if model_instance:
-                    role_info = {}
-                    # Dynamically get all encrypted fields
-                    for field in model_instance.__table__.columns:
-                        if field.name.endswith('_encrypted'):
-                            plain_field = field.name.replace('_encrypted', '')
-                            role_info[plain_field] = decrypt_data(getattr(model_instance, field.name))
-                    
-                    additional_info[role] = role_info
-            
-            user_data = {
+        for entry in directory_pagination.items:
+            user = entry.user
+            users_data.append({
                 'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'logo': decrypt_data(user.profile_image_encrypted) if decrypt_data(user.logo_encrypted) else None,
-                'roles': user_roles,  # Now shows all roles user has
-                'status': decrypt_data(user.status_encrypted),
-                'created_at': user.created_at.isoformat() if user.created_at else None,
-                'additional_info': additional_info  # Includes info from all role tables
-            }
+                'name': user.name,
+                'phone': user.telephone,
+                'email': user.email,
+                'role': entry.role,
+                'status': entry.status,
+                'verified': entry.verified,
+                'submitted_at': entry.submitted_at.isoformat() if entry.submitted_at else None
+            })
 
-            users_data.append(user_data)    
-        
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
         token_data = {'token': csrf_token, 'timestamp': timestamp}
@@ -326,8 +426,8 @@ def get_all_users():
         response_data = {
             'data': users_data,
             'pagination': {
-                'total': user_pagination.total,
-                'pages': user_pagination.pages,
+                'total': directory_pagination.total,
+                'pages': directory_pagination.pages,
                 'current_page': page,
                 'per_page': per_page
             },
@@ -350,6 +450,69 @@ def get_all_users():
         current_app.logger.error(f'Failed to fetch users: {e}')
         return jsonify({'message': 'Failed to retrieve users', 'error': str(e)}), 500
       
+@auth_ad.route('/users/search', methods=['GET'])
+@limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def search_users():
+    current_app.logger.info(f"User search endpoint called by admin - IP: {request.remote_addr}")
+
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({"message": "Search query (q) is required"}), 400
+
+        # Exact-match lookup through the blind indexes; no decryption needed to find the row.
+        if '@' in query:
+            email = query.lower()
+            if not EMAIL_PATTERN.match(email):
+                return jsonify({"message": "Invalid email format"}), 400
+            user = User.query.filter(User.email_hash.in_(email_hash_candidates(email))).first()
+            search_type = 'email'
+        else:
+            telephone = re.sub(r'[\s\-().]', '', query)
+            if not PHONE_PATTERN.match(telephone):
+                return jsonify({"message": "Invalid phone number format"}), 400
+            user = User.query.filter(User.telephone_hash.in_(telephone_hash_candidates(telephone))).first()
+            search_type = 'phone'
+
+        AuditLog.log_async(
+            event='ADMIN_USER_SEARCH',
+            user=get_jwt_identity(),
+            ip=request.remote_addr,
+            user_agent=request.user_agent.string,
+            metadata={'search_type': search_type, 'found': bool(user)}
+        )
+
+        if not user:
+            return jsonify({"message": "User not found"}), 404
+
+        role_info = None
+        model = role_model(user.role)
+        entity = db.session.get(model, user.id) if model else None
+        if entity:
+            role_info = {
+                'verified': entity.verified,
+                **read_fields(entity)
+            }
+
+        return jsonify({
+            'data': {
+                'id': user.id,
+                'name': user.name,
+                'email': user.email,
+                'phone': user.telephone,
+                'role': user.role,
+                'account_verified': user.account_verified,
+                'mfa_enabled': user.mfa_enabled,
+                'role_info': role_info
+            }
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'User search failed: {e}')
+        return jsonify({'message': 'Failed to search users'}), 500
+
 @auth_ad.route('/approve', methods=['POST'])
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
@@ -407,11 +570,17 @@ def approve():
         # Update verification status and other fields
         try:
             entity.verified = True
-            entity.status_encrypted = encrypt_data(status)
+            entity.status = status
             if description:
-                entity.description_encrypted = encrypt_data(description)
+                entity.description = description
+            sync_user_directory(entity_type, entity)
             
             db.session.commit()
+            update_directory_entry(entity_type, entity)
+            publish_invalidation(entity_type)
+            bump_change_version(entity_type)
+            invalidate_account_states([entity.user_id])
+            publish_event('verification', entity_type, entity_id)
 
             current_app.logger.info(
                 f"Admin {admin_id} approved {entity_type} with ID {entity_id}. "
@@ -484,10 +653,16 @@ def reject():
 
         try:
             entity.verified = True
-            entity.status_encrypted = encrypt_data(status)
-            entity.description_encrypted = encrypt_data(description)
+            entity.status = status
+            entity.description = description
+            sync_user_directory(entity_type, entity)
             
             db.session.commit()
+            update_directory_entry(entity_type, entity)
+            publish_invalidation(entity_type)
+            bump_change_version(entity_type)
+            invalidate_account_states([entity.user_id])
+            publish_event('verification', entity_type, entity_id)
             
             current_app.logger.info(f"Successfully rejected {entity_type} with ID: {entity_id}")
             return jsonify({
@@ -506,10 +681,339 @@ def reject():
         current_app.logger.error(f'Rejection failed: {str(e)}')
         return jsonify({'message': 'Failed to process rejection'}), 500
 
+BATCH_MAX_ITEMS = 500
+
+
+def _verification_batch(data, default_status, require_text):
+    """Applies approve/reject to many entities in one transaction.
+
+    `data` is {"items": [{"entity_type", "entity_id", "status"?, "description"?}],
+    "status"?, "description"?}; item values override the top-level ones.
+    Per role table: one SELECT for the rows, one grouped UPDATE for
+    `verified`, and one executemany UPDATE (the ORM flush) for the per-row
+    sealed status/description. Returns (results, error_response).
+    """
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({"message": "items must be a non-empty list"}), 400)
+    if len(items) > BATCH_MAX_ITEMS:
+        return None, (jsonify({"message": f"At most {BATCH_MAX_ITEMS} items per batch"}), 400)
+
+    results = [None] * len(items)
+    groups = {}
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        entity_type = str(item.get('entity_type', ''))
+        entity_type = ROLE_ALIASES.get(entity_type, entity_type)
+        try:
+            entity_id = int(item.get('entity_id'))
+        except (TypeError, ValueError):
+            entity_id = None
+        status = item.get('status', data.get('status', default_status))
+        description = item.get('description', data.get('description', ''))
+        result = {'entity_type': entity_type, 'entity_id': entity_id}
+        results[index] = result
+
+        if entity_type not in ROLE_MODELS or entity_id is None:
+            result.update(success=False, error='Invalid entity_type or entity_id')
+        elif require_text and (not status or not description):
+            result.update(success=False, error='status and description are required')
+        else:
+            groups.setdefault(entity_type, []).append((index, entity_id, status, description))
+
+    changed = {}
+    try:
+        for entity_type, group in groups.items():
+            model = ROLE_MODELS[entity_type]
+            entities = {
+                entity.user_id: entity
+                for entity in model.query.filter(model.user_id.in_([entity_id for _, entity_id, _, _ in group]))
+            }
+
+            found = []
+            for index, entity_id, status, description in group:
+                entity = entities.get(entity_id)
+                if entity is None:
+                    results[index].update(success=False, error='Entity not found')
+                    continue
+                # Status/description are sealed per row (envelope encryption),
+                # so each row gets its own value; the flush sends them as one
+                # executemany UPDATE per table. Data keys are cached, so this
+                # is AES-GCM only.
+                entity.status = status
+                if description or require_text:
+                    entity.description = description
+                results[index].update(success=True, status=status)
+                found.append(entity)
+
+            if found:
+                db.session.execute(
+                    update(model)
+                    .where(model.user_id.in_([entity.user_id for entity in found]))
+                    .values(verified=True)
+                )
+                sync_user_directory_many(entity_type, found)
+                changed[entity_type] = found
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Verification batch failed: {str(e)}")
+        return None, (jsonify({"message": "Failed to apply batch, no changes were made"}), 500)
+
+    bump_change_version(*changed)
+    invalidate_account_states(entity.user_id for entities in changed.values() for entity in entities)
+    for entity_type in changed:
+        publish_event('verification', entity_type)
+    for entity_type, entities in changed.items():
+        if entity_type in DIRECTORY_MODELS:
+            update_directory_entries(entity_type, entities)
+            publish_invalidation(entity_type)
+
+    return results, None
+
+
+def _verification_batch_endpoint(event, default_status, require_text):
+    if request.content_type and request.content_type != 'application/json':
+        return jsonify({"message": "Content-Type must be application/json"}), 415
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"message": "No data provided"}), 400
+
+    admin_id = get_jwt_identity()
+    if not Admin.query.filter_by(user_id=admin_id).first():
+        current_app.logger.warning(f"Admin not found for ID: {admin_id}")
+        return jsonify({"message": "Admin not found"}), 404
+
+    results, error = _verification_batch(data, default_status, require_text)
+    if error:
+        return error
+
+    succeeded = sum(1 for result in results if result['success'])
+    AuditLog.log_async(
+        event=event,
+        user=admin_id,
+        ip=request.remote_addr,
+        user_agent=request.user_agent.string,
+        metadata={'items': len(results), 'succeeded': succeeded}
+    )
+    current_app.logger.info(f"Admin {admin_id} {event}: {succeeded}/{len(results)} items applied")
+
+    return jsonify({
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }), 200
+
+@auth_ad.route('/approve-batch', methods=['POST'])
+@limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def approve_batch():
+    try:
+        return _verification_batch_endpoint('ADMIN_BATCH_APPROVE', 'approved', require_text=False)
+    except Exception as e:
+        current_app.logger.error(f'Batch approval failed: {e}')
+        return jsonify({'message': 'Failed to process batch approval'}), 500
+
+@auth_ad.route('/reject-batch', methods=['POST'])
+@limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def reject_batch():
+    try:
+        return _verification_batch_endpoint('ADMIN_BATCH_REJECT', 'rejected', require_text=True)
+    except Exception as e:
+        current_app.logger.error(f'Batch rejection failed: {e}')
+        return jsonify({'message': 'Failed to process batch rejection'}), 500
+
+@auth_ad.route('/import', methods=['POST'])
+@limiter.limit("5 per minute; 50 per day", key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def bulk_import():
+    try:
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return jsonify({"message": "A CSV or NDJSON file is required"}), 400
+
+        import_format = request.args.get('format') or upload.filename.rsplit('.', 1)[-1].lower()
+        if import_format in ('jsonl', 'json'):
+            import_format = 'ndjson'
+        if import_format not in IMPORT_FORMATS:
+            return jsonify({"message": "format must be csv or ndjson"}), 400
+
+        admin_id = get_jwt_identity()
+        approve = request.args.get('approve', 'false').lower() in ('true', '1')
+        job_id = start_import(upload, import_format, approve, admin_id)
+
+        AuditLog.log_async(
+            event='ADMIN_BULK_IMPORT',
+            user=admin_id,
+            ip=request.remote_addr,
+            user_agent=request.user_agent.string,
+            metadata={'job_id': job_id, 'format': import_format, 'approve': approve}
+        )
+        current_app.logger.info(f"Admin {admin_id} started import job {job_id}")
+
+        return jsonify({"message": "Import started", "job_id": job_id}), 202
+
+    except Exception as e:
+        current_app.logger.error(f'Bulk import failed to start: {e}')
+        return jsonify({'message': 'Failed to start import'}), 500
+
+@auth_ad.route('/import/<job_id>', methods=['GET'])
+@limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def bulk_import_status(job_id):
+    try:
+        job = get_import_job(job_id)
+        if not job:
+            return jsonify({"message": "Import job not found"}), 404
+        return jsonify({"data": job}), 200
+    except Exception as e:
+        current_app.logger.error(f'Failed to fetch import job: {e}')
+        return jsonify({'message': 'Failed to retrieve import job'}), 500
+
+@auth_ad.route('/export', methods=['GET'])
+@limiter.limit("5 per minute; 50 per day", key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def export_users():
+    current_app.logger.info(f"Export endpoint called by admin - IP: {request.remote_addr}")
+
+    try:
+        dataset = request.args.get('dataset', 'users')
+        export_format = request.args.get('format', 'ndjson').lower()
+        role = request.args.get('role')
+        compress = request.args.get('gzip', 'false').lower() in ('true', '1')
+
+        if dataset not in EXPORT_DATASETS:
+            return jsonify({"message": "dataset must be users or verification"}), 400
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"message": "format must be ndjson or csv"}), 400
+        if role and not role_model(role):
+            return jsonify({"message": "Invalid role"}), 400
+        if dataset == 'verification' and not role:
+            return jsonify({"message": "role is required for verification exports"}), 400
+
+        allowed = available_fields(dataset, role)
+        fields = tuple(f.strip() for f in request.args.get('fields', '').split(',') if f.strip()) or allowed
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            return jsonify({"message": f"Unknown fields: {', '.join(unknown)}", "fields": list(allowed)}), 400
+
+        verified = request.args.get('verified')
+        query = build_export_query(
+            dataset,
+            role=role,
+            status=request.args.get('status', 'approved').lower().strip() if dataset == 'users' else None,
+            verified=None if verified is None else verified.lower() in ('true', '1')
+        )
+
+        AuditLog.log_async(
+            event='ADMIN_EXPORT',
+            user=get_jwt_identity(),
+            ip=request.remote_addr,
+            user_agent=request.user_agent.string,
+            metadata={'dataset': dataset, 'role': role, 'format': export_format, 'fields': list(fields)}
+        )
+
+        filename = f"{dataset}-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.{export_format}"
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        if compress:
+            filename += '.gz'
+            mimetype = 'application/gzip'
+
+        response = Response(
+            stream_with_context(stream_export(query, build_plan(dataset, fields, role), export_format, compress)),
+            mimetype=mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    except Exception as e:
+        current_app.logger.error(f'Export failed: {e}')
+        return jsonify({'message': 'Failed to export users'}), 500
+
+@auth_ad.route('/events', methods=['GET'])
+@limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+def admin_events():
+    try:
+        stream = event_stream()
+    except SubscriberLimitReached:
+        current_app.logger.warning("Admin event stream refused: subscriber limit reached")
+        response = make_response(jsonify({"message": "Too many event subscribers, retry later"}), 503)
+        response.headers['Retry-After'] = '30'
+        return response
+
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream.
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@auth_ad.route('/verification-inbox', methods=['GET'])
+@limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
+@role_required('admin')
+@jwt_required()
+@conditional_get('inbox')
+def verification_inbox():
+    current_app.logger.info(f"Verification inbox endpoint called by admin - IP: {request.remote_addr}")
+
+    try:
+        limit = min(max(request.args.get('limit', 5, type=int), 1), 50)
+        filters = _queue_filters()
+        if filters is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
+
+        # One query pair per role table, run side by side on a bounded pool.
+        app = current_app._get_current_object()
+        executor = _get_inbox_executor()
+        futures = {
+            role: executor.submit(_inbox_queue, app, model, filters, limit)
+            for role, model in ROLE_MODELS.items()
+        }
+
+        queues = {}
+        for role, future in futures.items():
+            try:
+                queues[role] = future.result(timeout=current_app.config.get('INBOX_TIMEOUT', 10))
+            except Exception as e:
+                current_app.logger.error(f"Verification inbox query for {role} failed: {e}")
+                queues[role] = {'total': None, 'items': [], 'error': 'unavailable'}
+
+        csrf_token = generate_secure_token()
+        timestamp = int(datetime.now().timestamp())
+        token_data = {'token': csrf_token, 'timestamp': timestamp}
+        s = URLSafeSerializer(current_app.secret_key)
+        signed_token = s.dumps(token_data)
+
+        response = make_response(jsonify({'data': queues, 'token': csrf_token}), 200)
+        response.set_cookie(
+            'XSRF-TOKEN',
+            value=signed_token,
+            secure=True,
+            httponly=False,
+            samesite='Strict',
+            max_age=3600  # 1 hour expiration
+        )
+        return response
+
+    except Exception as e:
+        current_app.logger.error(f'Failed to fetch verification inbox: {e}')
+        return jsonify({'message': 'Failed to retrieve verification inbox'}), 500
+
 @auth_ad.route('/unverified-hospital', methods=['GET'])
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-hospital', roles=('hospital',))
 def unverified_hospital_users():
     current_app.logger.info(f"Unverified users endpoint called by admin - IP: {request.remote_addr}")
     
@@ -517,52 +1021,20 @@ def unverified_hospital_users():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        # First get all unverified hospitals
-        unverified_hospitals = Hospital.query.filter_by(verified=False).all()
-        hospital_user_ids = [hospital.user_id for hospital in unverified_hospitals]
+        plan = QUEUE_PLANS['hospital']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(hospital_user_ids),  # The hospital's user account
-        ).distinct()
+        # One page of the unverified hospital queue
+        user_query = _queue_users(Hospital)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            # Find if the user is directly the hospital account
-            is_hospital_account = user.id in hospital_user_ids
-            hospital = next((h for h in unverified_hospitals if h.user_id == user.id), None)
-            
-            # Find hospital admin associations
-            admin_hospitals = []
-            if user.hospital_admin:
-                admin_hospitals = [h for h in unverified_hospitals if h.user_id in [a.hospital_id for a in user.hospital_admin]]
-            
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'established': decrypt_data(hospital.established_year_encrypted) if hospital.established_year_encrypted else None,
-                'address': decrypt_data(hospital.address_encrypted) if hospital.address_encrypted else None,
-                'type': decrypt_data(hospital.type_encrypted) if hospital.type_encrypted else None,
-                'beds': decrypt_data(hospital.beds_encrypted) if hospital.beds_encrypted else None,
-                'license_number': decrypt_data(hospital.license_number_encrypted) if hospital.license_number_encrypted else None,
-                'submission_date': decrypt_data(hospital.submission_date_encrypted) if hospital.submission_date_encrypted else None,
-                'operating_hours': decrypt_data(hospital.operating_hours_encrypted) if hospital.operating_hours_encrypted else None,
-                'logo': decrypt_data(hospital.logo_encrypted) if hospital.logo_encrypted else None,
-                'medical_staff': decrypt_data(hospital.medical_staff_encrypted) if hospital.medical_staff_encrypted else None,
-                'emergency_services': decrypt_data(hospital.emergency_services_encrypted) if hospital.emergency_services_encrypted else None,
-                'documents': [
-                    {
-                        'license': decrypt_data(hospital.license_document_encrypted) if hospital.license_document_encrypted else None,
-                        'accreditation': decrypt_data(hospital.accreditation_document_encrypted) if hospital.accreditation_document_encrypted else None,
-                    }
-                ],
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         # Generate CSRF token for admin actions
         csrf_token = generate_secure_token()
@@ -613,56 +1085,7 @@ def verified_hospital():
             current_app.logger.warning(f"Invalid CSRF token received: {csrf_token[:8]}...")
             return jsonify({"message": "Invalid CSRF token"}), 403
 
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-
-        # Get all verified hospitals then filter by status
-        all_verified = Hospital.query.filter(Hospital.verified == True).all()
-        verified_hospitals = [
-            h for h in all_verified 
-            if h.status_encrypted and 
-               decrypt_data(h.status_encrypted).lower().strip() == "approved"
-        ]
-        
-        hospital_user_ids = [hospital.user_id for hospital in verified_hospitals]
-
-        if not hospital_user_ids:
-            return jsonify({
-                'data': [],
-                'pagination': {
-                    'total': 0,
-                    'pages': 0,
-                    'current_page': page,
-                    'per_page': per_page
-                }
-            }), 200
-
-        user_query = User.query.filter(User.id.in_(hospital_user_ids))
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        hospitals_data = []
-        for user in user_pagination.items:
-            hospital = next((h for h in verified_hospitals if h.user_id == user.id), None)
-            
-            if hospital:
-                hospital_data = {
-                    'id': user.id,
-                    'status': decrypt_data(hospital.status_encrypted) if hospital.status_encrypted else None,
-                    'name': decrypt_data(user.name_encrypted) if user.name_encrypted else None,
-                }
-                hospitals_data.append(hospital_data)
-        
-        response_data = {
-            'data': hospitals_data,
-            'pagination': {
-                'total': user_pagination.total,
-                'pages': user_pagination.pages,
-                'current_page': page,
-                'per_page': per_page
-            }
-        }
-        
-        return jsonify(response_data), 200  
+        return _directory_response('hospital')
          
     except Exception as e:
         current_app.logger.error(f'Failed to fetch verified hospitals: {e}')
@@ -672,6 +1095,7 @@ def verified_hospital():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-admin', roles=('admin',))
 def unverified_admin():
     current_app.logger.info(f"Unverified admin endpoint called by admin - IP: {request.remote_addr}")
     
@@ -679,34 +1103,19 @@ def unverified_admin():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        unverified_admins = Admin.query.filter_by(verified=False).all()
-        admin_user_ids = [admin.user_id for admin in unverified_admins]
+        plan = QUEUE_PLANS['admin']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(admin_user_ids),  
-        ).distinct()
+        user_query = _queue_users(Admin)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            admin = next((p for p in unverified_admins if p.user_id == user.id), None)
-            
-            if not admin:
-                continue
-                
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'submission_date': decrypt_data(admin.submission_date_encrypted) if admin.submission_date_encrypted else None,
-                'profile_image': decrypt_data(admin.profile_image_encrypted) if admin.profile_image_encrypted else None,
-                'security_level': decrypt_data(admin.security_level_encrypted) if admin.security_level_encrypted else None,
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
@@ -745,6 +1154,7 @@ def unverified_admin():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-hospital-admin', roles=('hospital_admin',))
 def verified_hospital_admin():
     current_app.logger.info(f"Unverified hospital admin endpoint called by admin - IP: {request.remote_addr}")
     
@@ -752,41 +1162,19 @@ def verified_hospital_admin():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        unverified_hospital_admin = HospitalAdmin.query.filter_by(verified=False).all()
-        hospital_admin_user_ids = [hospital_admin.user_id for hospital_admin in unverified_hospital_admin]
+        plan = QUEUE_PLANS['hospital_admin']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(hospital_admin_user_ids),  
-        ).distinct()
+        user_query = _queue_users(HospitalAdmin)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            hospital_admin = next((p for p in unverified_hospital_admin if p.user_id == user.id), None)
-            
-            if not hospital_admin:
-                continue
-                
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'submission_date': decrypt_data(hospital_admin.submission_date_encrypted) if hospital_admin.submission_date_encrypted else None,
-                'profile_image': decrypt_data(hospital_admin.profile_image_encrypted) if hospital_admin.profile_image_encrypted else None,
-                'employment_verification': decrypt_data(hospital_admin.employment_verification_encrypted) if hospital_admin.employment_verification_encrypted else None,
-                'hospital_id': hospital_admin.hospital_id_encrypted,
-                'admin_id': decrypt_data(hospital_admin.admin_id_encrypted) if hospital_admin.admin_id_encrypted else None,
-                'documents': [
-                    {
-                        'license': decrypt_data(hospital_admin.license_document_encrypted) if hospital_admin.license_document_encrypted else None,
-                    }
-                ],
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
@@ -825,6 +1213,7 @@ def verified_hospital_admin():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-pharmacy', roles=('pharmacy',))
 def unverified_pharmacy():
     current_app.logger.info(f"Unverified pharmacy endpoint called by admin - IP: {request.remote_addr}")
     
@@ -832,45 +1221,19 @@ def unverified_pharmacy():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        unverified_pharmacies = Pharmacy.query.filter_by(verified=False).all()
-        pharmacy_user_ids = [pharmacy.user_id for pharmacy in unverified_pharmacies]
+        plan = QUEUE_PLANS['pharmacy']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(pharmacy_user_ids),  # The pharmacy's user account
-        ).distinct()
+        user_query = _queue_users(Pharmacy)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            # Find the pharmacy associated with this user
-            pharmacy = next((p for p in unverified_pharmacies if p.user_id == user.id), None)
-            
-            if not pharmacy:
-                continue
-                
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "type": decrypt_data(pharmacy.type_encrypted) if pharmacy.type_encrypted else None,
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'established': decrypt_data(pharmacy.established_year_encrypted) if pharmacy.established_year_encrypted else None,
-                'address': decrypt_data(pharmacy.address_encrypted) if pharmacy.address_encrypted else None,
-                'license_number': decrypt_data(pharmacy.license_number_encrypted) if pharmacy.license_number_encrypted else None,
-                'submission_date': decrypt_data(pharmacy.submission_date_encrypted) if pharmacy.submission_date_encrypted else None,
-                'operating_hours': decrypt_data(pharmacy.operating_hours_encrypted) if pharmacy.operating_hours_encrypted else None,
-                'logo': decrypt_data(pharmacy.logo_encrypted) if pharmacy.logo_encrypted else None,
-                'documents': [
-                    {
-                        'license': decrypt_data(pharmacy.license_document_encrypted) if pharmacy.license_document_encrypted else None,
-                        'accreditation': decrypt_data(pharmacy.accreditation_document_encrypted) if pharmacy.accreditation_document_encrypted else None,
-                    }
-                ],
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         # Generate CSRF token for admin actions
         csrf_token = generate_secure_token()
@@ -921,65 +1284,35 @@ def verified_pharmacy():
             current_app.logger.warning(f"Invalid CSRF token received: {csrf_token[:8]}...")
             return jsonify({"message": "Invalid CSRF token"}), 403
 
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-
-        # Get all verified pharmacies then filter by status
-        all_verified = Pharmacy.query.filter(Pharmacy.verified == True).all()
-        verified_pharmacies = [
-            h for h in all_verified 
-            if h.status_encrypted and 
-               decrypt_data(h.status_encrypted).lower().strip() == "approved"
-        ]
-        
-        pharmacies_user_ids = [pharmacy.user_id for pharmacy in verified_pharmacies]
-
-        if not pharmacies_user_ids:
-            return jsonify({
-                'data': [],
-                'pagination': {
-                    'total': 0,
-                    'pages': 0,
-                    'current_page': page,
-                    'per_page': per_page
-                }
-            }), 200
-
-        user_query = User.query.filter(User.id.in_(pharmacies_user_ids))
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        pharmacies_data = []
-        for user in user_pagination.items:
-            pharmacy = next((h for h in verified_pharmacies if h.user_id == user.id), None)
-            
-            if pharmacy:
-                pharmacy_data = {
-                    'id': user.id,
-                    'status': decrypt_data(pharmacy.status_encrypted) if pharmacy.status_encrypted else None,
-                    'name': decrypt_data(user.name_encrypted) if user.name_encrypted else None,
-                }
-                pharmacies_data.append(pharmacy_data)
-        
-        response_data = {
-            'data': pharmacies_data,
-            'pagination': {
-                'total': user_pagination.total,
-                'pages': user_pagination.pages,
-                'current_page': page,
-                'per_page': per_page
-            }
-        }
-        
-        return jsonify(response_data), 200  
+        return _directory_response('pharmacy')
          
     except Exception as e:
         current_app.logger.error(f'Failed to fetch verified hospitals: {e}')
         return jsonify({'message': 'Failed to retrieve verified hospitals', 'error': str(e)}), 500
+
+@auth_ad.route('/autocomplete', methods=['GET'])
+@limiter.limit(AUTOCOMPLETE_LIMITS, key_func=rate_limit_key)
+def autocomplete_names():
+    directory_type = request.args.get('type', '')
+    prefix = request.args.get('q', '').strip()
+    limit = min(request.args.get('limit', 10, type=int), MAX_RESULTS)
+
+    if directory_type not in DIRECTORY_MODELS:
+        return jsonify({'message': 'type must be hospital or pharmacy'}), 400
+    if len(prefix) < 2:
+        return jsonify({'data': []}), 200
+
+    try:
+        return jsonify({'data': autocomplete(directory_type, prefix, limit)}), 200
+    except Exception as e:
+        current_app.logger.error(f'Autocomplete failed: {e}')
+        return jsonify({'message': 'Failed to search names'}), 500
   
 @auth_ad.route('/unverified-pharmacy-admins', methods=['GET'])
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-pharmacy-admin', roles=('pharmacy_admin',))
 def unverified_pharmacy_admin():
     current_app.logger.info(f"Unverified pharmacy admins endpoint called by admin - IP: {request.remote_addr}")
     
@@ -987,41 +1320,19 @@ def unverified_pharmacy_admin():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        unverified_pharmacy_admins = PharmacyAdmin.query.filter_by(verified=False).all()
-        pharmacy_admin_user_ids = [pharmacy_admin.user_id for pharmacy_admin in unverified_pharmacy_admins]
+        plan = QUEUE_PLANS['pharmacy_admin']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(pharmacy_admin_user_ids),  
-        ).distinct()
+        user_query = _queue_users(PharmacyAdmin)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            pharmacy_admin = next((p for p in unverified_pharmacy_admins if p.user_id == user.id), None)
-            
-            if not pharmacy_admin:
-                continue
-                
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'access_level': decrypt_data(pharmacy_admin.access_level_encrypted) if pharmacy_admin.access_level_encrypted else None,
-                'submission_date': decrypt_data(pharmacy_admin.submission_date_encrypted) if pharmacy_admin.submission_date_encrypted else None,
-                'profile_image': decrypt_data(pharmacy_admin.profile_image_encrypted) if pharmacy_admin.profile_image_encrypted else None,
-                'pharmacy_id': pharmacy_admin.pharmacy_id,
-                'admin_id': decrypt_data(pharmacy_admin.admin_id_encrypted) if pharmacy_admin.admin_id_encrypted else None,
-                'documents': [
-                    {
-                        'license': decrypt_data(pharmacy_admin.pharmacist_cert_encrypted) if pharmacy_admin.pharmacist_cert_encrypted else None,
-                    }
-                ],
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
@@ -1060,6 +1371,7 @@ def unverified_pharmacy_admin():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-pharmacist', roles=('pharmacist',))
 def unverified_pharmacist():
     current_app.logger.info(f"Unverified pharmacist endpoint called by admin - IP: {request.remote_addr}")
     
@@ -1067,40 +1379,19 @@ def unverified_pharmacist():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        unverified_pharmacist = Pharmacist.query.filter_by(verified=False).all()
-        pharmacist_user_ids = [pharmacist.user_id for pharmacist in unverified_pharmacist]
+        plan = QUEUE_PLANS['pharmacist']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(pharmacist_user_ids),  
-        ).distinct()
+        user_query = _queue_users(Pharmacist)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            pharmacist = next((p for p in unverified_pharmacist if p.user_id == user.id), None)
-            
-            if not pharmacist:
-                continue
-                
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'submission_date': decrypt_data(pharmacist.submission_date_encrypted) if pharmacist.submission_date_encrypted else None,
-                'profile_image': decrypt_data(pharmacist.profile_image_encrypted) if pharmacist.profile_image_encrypted else None,
-                'license_number_encrypted': decrypt_data(pharmacist.license_number_encrypted) if pharmacist.license_number_encrypted else None,
-                'pharmacy_id': pharmacist.pharmacy_id,
-                'documents': [
-                    {
-                        'license': decrypt_data(pharmacist.pharmacist_cert_encrypted) if pharmacist.pharmacist_cert_encrypted else None,
-                    }
-                ],
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
@@ -1139,6 +1430,7 @@ def unverified_pharmacist():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-patient', roles=('patient',))
 def unverified_patient():
     current_app.logger.info(f"Unverified patient endpoint called by admin - IP: {request.remote_addr}")
     
@@ -1146,37 +1438,19 @@ def unverified_patient():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
 
-        unverified_patient = Patient.query.filter_by(verified=False).all()
-        patient_user_ids = [patient.user_id for patient in unverified_patient]
+        plan = QUEUE_PLANS['patient']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        user_query = User.query.filter(
-            User.id.in_(patient_user_ids),  
-        ).distinct()
+        user_query = _queue_users(Patient)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        users_data = []
-        for user in user_pagination.items:
-            patient = next((p for p in unverified_patient if p.user_id == user.id), None)
-            
-            if not patient:
-                continue
-                
-            user_data = {
-                'id': user.id,
-                "name": decrypt_data(user.name_encrypted),
-                "phone": decrypt_data(user.telephone_encrypted),
-                "email": decrypt_data(user.email_encrypted),
-                'role': user.role,
-                'birthyear': decrypt_data(patient.birthyear_encrypted) if patient.birthyear_encrypted else None,
-                'submission_date': decrypt_data(patient.submission_date_encrypted) if patient.submission_date_encrypted else None,
-                'patient_id': decrypt_data(patient.patient_id_encrypted) if patient.patient_id_encrypted else None,
-                'id_proof': decrypt_data(patient.id_proof_encrypted) if patient.id_proof_encrypted else None,
-                'insurance': decrypt_data(patient.insurance_encrypted) if patient.insurance_encrypted else None,
-                'profile_image': decrypt_data(patient.profile_image_encrypted) if patient.profile_image_encrypted else None,
-            }
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
 
-            users_data.append(user_data)    
         
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
@@ -1215,6 +1489,7 @@ def unverified_patient():
 @limiter.limit(DEFAULT_LIMITS, key_func=rate_limit_key)
 @role_required('admin')
 @jwt_required()
+@conditional_get('queue-doctor', roles=('doctor',))
 def unverified_doctor():
     # Log request initiation
     current_app.logger.info(
@@ -1229,70 +1504,24 @@ def unverified_doctor():
         per_page = request.args.get('per_page', 10, type=int)
         current_app.logger.debug(f"Pagination parameters - page: {page}, per_page: {per_page}")
 
-        # Query unverified doctors
-        current_app.logger.debug("Querying unverified doctors from database")
-        unverified_doctor = Doctor.query.filter_by(verified=False).all()
-        current_app.logger.debug(f"Found {len(unverified_doctor)} unverified doctors")
-        
-        doctor_user_ids = [doctor.user_id for doctor in unverified_doctor]
-        current_app.logger.debug(f"Extracted user IDs: {doctor_user_ids}")
+        plan = QUEUE_PLANS['doctor']
+        try:
+            fields = plan.select(request.args.get('fields'))
+        except InvalidFields as e:
+            return jsonify({"message": str(e), "fields": list(e.allowed)}), 400
 
-        # Query users
-        current_app.logger.debug("Querying user data for unverified doctors")
-        user_query = User.query.filter(
-            User.id.in_(doctor_user_ids),  
-        ).distinct()
+        user_query = _queue_users(Doctor)
+        if user_query is None:
+            return jsonify({"message": QUEUE_FILTER_ERROR}), 400
 
-        user_pagination = user_query.paginate(page=page, per_page=per_page, error_out=False)
+        user_pagination = user_query.options(plan.user_options(fields)).paginate(page=page, per_page=per_page, error_out=False)
         current_app.logger.debug(
             f"User pagination results - total: {user_pagination.total}, "
             f"pages: {user_pagination.pages}, "
             f"current page items: {len(user_pagination.items)}"
         )
-        
-        # Process user data
-        users_data = []
-        current_app.logger.debug("Processing user data and doctor details")
-        
-        for user in user_pagination.items:
-            try:
-                doctor = next((p for p in unverified_doctor if p.user_id == user.id), None)
-                
-                if not doctor:
-                    current_app.logger.warning(f"No doctor record found for user ID: {user.id}")
-                    continue
-                    
-                user_data = {
-                    'id': user.id,
-                    "name": decrypt_data(user.name_encrypted),
-                    "phone": decrypt_data(user.telephone_encrypted),
-                    "specialty": decrypt_data(doctor.specialty_encrypted) if doctor.specialty_encrypted else None,
-                    "email": decrypt_data(user.email_encrypted),
-                    'role': user.role,
-                    'hospital_id': doctor.hospital_id,
-                    'license_number': decrypt_data(doctor.license_number_encrypted) if doctor.license_number_encrypted else None,
-                    'submission_date': decrypt_data(doctor.submission_date_encrypted),
-                    'degree': decrypt_data(doctor.degree_encrypted) if doctor.degree_encrypted else None,
-                    'profile_image': decrypt_data(doctor.profile_image_encrypted) if doctor.profile_image_encrypted else None,
-                    'documents': [
-                        {
-                            'license': decrypt_data(doctor.license_document_encrypted) if doctor.license_document_encrypted else None,
-                        }
-                    ],
-                }
-                users_data.append(user_data)
-                
-            except Exception as decryption_error:
-                current_app.logger.error(
-                    f"Error processing user ID {user.id}: {str(decryption_error)}",
-                    exc_info=True,
-                    extra={
-                        'user_id': user.id,
-                        'error_type': type(decryption_error).__name__
-                    }
-                )
-                continue
-        
+        users_data = _serialize_queue_page(plan, fields, user_pagination.items)
+
         current_app.logger.debug("Generating CSRF token")
         csrf_token = generate_secure_token()
         timestamp = int(datetime.now().timestamp())  
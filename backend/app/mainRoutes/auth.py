@@ -1,7 +1,6 @@
 # auth.py (Tam Sürüm)
 import base64
 from datetime import datetime, time, timedelta
-import random
 import re
 from threading import Thread
 import uuid
@@ -21,39 +20,36 @@ from itsdangerous import URLSafeSerializer
 from psycopg2 import IntegrityError
 import redis
 from rich import _console
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, limiter, redis_client
-from app.models import Admin, Doctor, Hospital, HospitalAdmin, Patient, Pharmacist, Pharmacy, PharmacyAdmin, TokenBlacklist, User, AuditLog
+from app.models import TokenBlacklist, User, AuditLog
+from app.account_state import REJECTED, VERIFIED, get_cached_account_state, load_login_account
+from app.change_versions import bump_change_version
+from app.events import publish_event
+from app.login_activity import record_login
+from app.login_throttle import clear_failed_logins, login_retry_after, record_failed_login
+from app.profile_cache import get_profile, invalidate_profile
+from app.password_hashing import HashingBusy, hash_password, needs_rehash, verify_password
+from app.role_schemas import ROLE_SCHEMAS, build_role_entity, validate_role_fields
+from app.user_directory import sync_user_directory
 from app.utils import (
-    check_login_attempts,
     generate_secure_token,
     send_code_email,
     generate_cryptographic_code,
     validate_password_complexity,
     rate_limit_key,
     generate_telephone_hash,
+    telephone_hash_candidates,
     calculate_risk_score  # Ensure this is imported if it exists
 )
 from flask_wtf import CSRFProtect
 from flask_wtf.csrf import generate_csrf
 
-# Define valid medical specialties
-MEDICAL_SPECIALTIES = {'Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'Dermatology'}
-
-MEDICAL_DEGREES = {'MD', 'DO', 'MBBS', 'BDS', 'DVM'}
-
-HOSPITAL_DEPARTMENTS = {'emergency', 'cardiology', 'neurology', 'oncology', 'pediatrics', 'radiology'}
-
-HOSPITAL_TYPES = {'general', 'specialty', 'clinic'}
-
-PHARMACY_DEGREES = {'PharmD', 'BPharm', 'MPharm', 'DPharm'}
-
-ADMIN_SECURITY_LEVELS = {'standard', 'elevated', 'super'}
-
 from app.security import (
     encrypt_data,
     decrypt_data,
     generate_email_hash,
+    email_hash_candidates,
+    revoke_token,
     role_required,
     validate_csrf_token,
     validate_url
@@ -70,6 +66,13 @@ auth_bp = Blueprint('auth', __name__)
 
 DEFAULT_LIMITS = "5 per minute; 100 per day"
 
+
+def _hashing_busy_response(error):
+    current_app.logger.warning(f"Password hashing saturated - IP: {request.remote_addr}")
+    response = jsonify({"message": "Server is busy, please try again shortly"})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 @limiter.limit("3/minute; 20/hour", key_func=rate_limit_key)
 def register():
@@ -120,11 +123,11 @@ def register():
                 current_app.logger.warning(f"Invalid phone format: {telephone}")
                 return jsonify({"message": "Invalid phone number format"}), 400
                 
-            if User.query.filter_by(telephone_hash=generate_telephone_hash(telephone)).first():
+            if User.query.filter(User.telephone_hash.in_(telephone_hash_candidates(telephone))).first():
                 current_app.logger.warning(f"Phone conflict: {telephone}")
                 return jsonify({"message": "This phone number is already registered"}), 409
 
-        if User.query.filter_by(email_hash=generate_email_hash(email)).first():
+        if User.query.filter(User.email_hash.in_(email_hash_candidates(email))).first():
             current_app.logger.warning(f"Email conflict")
             return jsonify({"message": "This email is already registered"}), 409
 
@@ -136,7 +139,7 @@ def register():
         encrypted_data = {
             'email': encrypt_data(email),
             'name': encrypt_data(bleach.clean(data['name'])),
-            'password': generate_password_hash(password, 'pbkdf2:sha256'),
+            'password': hash_password(password),
             'telephone': encrypt_data(telephone) if telephone else None
         }
 
@@ -210,6 +213,8 @@ def register():
         
         return response, 200
 
+    except HashingBusy as e:
+        return _hashing_busy_response(e)
     except Exception as e:
         current_app.logger.critical(
             f"CRITICAL ERROR | IP: {request.remote_addr} | Error: {str(e)}",
@@ -295,7 +300,7 @@ def resend_verification_code():
             if not user:
                 current_app.logger.error(f"User not found: {user_data['user_id']}")
                 return jsonify({"message": "User not found"}), 404
-            email = decrypt_data(user.email_encrypted)
+            email = user.email
 
         try:
             if not redis_client.setex(
@@ -424,7 +429,7 @@ def complete_registration():
             return jsonify({"message": "Invalid verification code"}), 400
 
         email = decrypt_data(user_data['email'])
-        if User.query.filter_by(email_hash=generate_email_hash(email)).first():
+        if User.query.filter(User.email_hash.in_(email_hash_candidates(email))).first():
             current_app.logger.warning(f"Duplicate registration for {email}")
             return jsonify({"message": "Account already exists"}), 409
 
@@ -434,6 +439,7 @@ def complete_registration():
             password=user_data['password'],
             name_encrypted=user_data['name'],
             telephone_encrypted=user_data.get('telephone'),
+            telephone_hash=generate_telephone_hash(decrypt_data(user_data['telephone'])) if user_data.get('telephone') else None,
             last_password_change=datetime.utcnow(),
             account_verified=True,
         )
@@ -549,106 +555,14 @@ def select_role():
             current_app.logger.warning(f"Invalid role selected: {role}")
             return jsonify({"message": "Invalid role selection"}), 400
                 
-        role_required_fields = {
-            'patient': {
-                'required': {'birthyear', 'id_proof', 'insurance'},
-                'optional': {'profile_image', 'medical_history', 'blood_type'},
-                'validation': {
-                    'birthyear': lambda x: isinstance(x, int) and 1900 <= x <= datetime.now().year,
-                    'id_proof': lambda x: isinstance(x, str) and len(x) > 10,  
-                    'insurance': lambda x: isinstance(x, str) and len(x) > 5
-                }
-            },
-            'doctor': {
-                'required': {'license_number', 'specialty', 'hospital_id', 'degree'},
-                'optional': {'profile_image', 'available_hours', 'languages'},
-                'validation': {
-                    'license_number': lambda x: isinstance(x, str) and len(x) in (8, 12),
-                    'specialty': lambda x: x in MEDICAL_SPECIALTIES,  
-                    'degree': lambda x: x in MEDICAL_DEGREES  
-                }
-            },
-            'hospitalAdmin': {
-                'required': {'hospital_id', 'admin_id', 'department', 'qualifications'},
-                'optional': {'profile_image', 'access_level', 'employment_verification'},
-                'validation': {
-                    'hospital_name': lambda x: isinstance(x, str) and 2 <= len(x) <= 100,
-                    'admin_id': lambda x: isinstance(x, str) and len(x) == 8,
-                    'qualifications': lambda x: isinstance(x, list) and all(isinstance(q, str) for q in x)
-                }
-            },
-            'hospital': {
-                'required': {'license_number', 'address', 'established', 'type','logo', 'beds', 'operating_hours', 'emergency_services',
-                    'accreditation', },
-                'optional': {
-                    'medical_staff', 'website'
-                },
-                'validation': {
-                    #'license_number': lambda x: isinstance(x, str) and x.startswith('HOSP-'),
-                    'address': lambda x: isinstance(x, str) and len(x) > 10,
-                    'established': lambda x: isinstance(x, str) and re.match(r'^\d{4}-\d{2}-\d{2}$', x),  # Format: YYYY-MM-DD
-                    'type': lambda x: x in HOSPITAL_TYPES  # e.g., ['general', 'specialty', 'clinic']
-                }
-            },
-            'pharmacy': {
-                'required': {'license_number', 'address', 'established'},
-                'optional': {
-                    'logo', 'operating_hours', 'inventory_size',
-                    'accreditation', 'prescriptions_filled', 'pharmacists_count'
-                },
-                'validation': {
-                    'license_number': lambda x: isinstance(x, str) and x.startswith('PHARM-'),
-                    'address': lambda x: isinstance(x, str) and len(x) > 10,
-                    'established':  lambda x: isinstance(x, str) and re.match(r'^\d{4}-\d{2}-\d{2}$', x),
-                }
-            },
-            'pharmacyAdmin': {
-                'required': {'pharmacy_id', 'admin_id'},
-                'optional': {'profile_image', 'access_level', 'pharmacist_cert'},
-                'validation': {
-                    'pharmacy_name': lambda x: isinstance(x, str) and 2 <= len(x) <= 100,
-                    'admin_id': lambda x: isinstance(x, str) and len(x) == 8,
-                    'pharmacy_branch': lambda x: isinstance(x, str) and len(x) <= 50,
-                    'pharmacy_license': lambda x: isinstance(x, str) and x.startswith('PHARM-')
-                }
-            },
-            'pharmacist': {
-                'required': {'license_number', 'pharmacy_id'},
-                'optional': {'specialization', 'years_experience'},
-                'validation': {
-                    'license_number': lambda x: isinstance(x, str) and len(x) in (10, 12),
-                    'degree': lambda x: x in PHARMACY_DEGREES  
-                }
-            },
-            'admin': {
-                'required': {'security_level'},
-                'optional': {'profile_image', 'audit_access'},
-                'validation': {
-                    'security_level': lambda x: x in ADMIN_SECURITY_LEVELS  
-                }
-            }
-        }
-        
-        if role not in role_required_fields:
+        if role not in ROLE_SCHEMAS:
            current_app.logger.warning(f"Invalid role specified: {role}")
            return jsonify({"message": "Invalid role specified"}), 400
 
-        required_fields = role_required_fields[role]['required']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-           current_app.logger.warning(f"Missing required fields for {role}: {missing_fields}")
-           return jsonify({"message": f"Missing required fields: {', '.join(missing_fields)}"}), 400
-
-        validation_rules = role_required_fields[role].get('validation', {})
-        for field, validator in validation_rules.items():
-           if field in data:  
-              try:
-                 if not validator(data[field]):
-                    current_app.logger.warning(f"Validation failed for {role}.{field}: {data[field]}")
-                    return jsonify({"message": f"Invalid value for {field}"}), 400
-              except Exception as e:
-                 current_app.logger.error(f"Validation error for {role}.{field}: {str(e)}")
-                 return jsonify({"message": f"Validation error for {field}"}), 400
+        validation_error = validate_role_fields(role, data)
+        if validation_error:
+           current_app.logger.warning(f"Role data rejected for {role}: {validation_error}")
+           return jsonify({"message": validation_error}), 400
 
 
         redis_key = data.get('redis_key', '').strip()
@@ -707,119 +621,15 @@ def select_role():
                 existing_user.role = role
                 db.session.add(existing_user)
 
-                submission_date = encrypt_data(str(datetime.utcnow()))
-                
-                role_models = {
-                    'patient': Patient(
-        user_id=user_id,
-        birthyear_encrypted=encrypt_data(str(data.get('birthyear', ''))),
-        profile_image_encrypted=encrypt_data(str(data.get('profile_image', ''))),
-        submission_date_encrypted=submission_date,
-        patient_id_encrypted=encrypt_data(str(data.get('patient_id', ''))),
-        id_proof_encrypted=encrypt_data(str(data.get('id_proof', ''))),
-        insurance_encrypted=encrypt_data(str(data.get('insurance', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-    ),
-                    'doctor': Doctor(
-        user_id=user_id,
-        specialty_encrypted=encrypt_data(str(data.get('specialty', ''))),
-        profile_image_encrypted=encrypt_data(str(data.get('profile_image', ''))),
-        submission_date_encrypted=submission_date,
-        license_number_encrypted=encrypt_data(str(data.get('license_number', ''))),
-        license_document_encrypted=encrypt_data(str(data.get('license_document', ''))),
-        degree_encrypted=encrypt_data(str(data.get('degree', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-        hospital_id=data.get('hospital_id'),
-    ),
-                    'hospitalAdmin': HospitalAdmin(
-        user_id=user_id,
-        profile_image_encrypted=encrypt_data(str(data.get('profile_image', ''))),
-        hospital_id_encrypted=encrypt_data(str(data.get('hospital_id', ''))),
-        admin_id_encrypted=encrypt_data(str(data.get('admin_id', ''))),
-        submission_date_encrypted=submission_date,
-        qualifications_encrypted=encrypt_data(str(data.get('qualifications', ''))),
-        department_encrypted=encrypt_data(str(data.get('department', ''))),
-        access_level_encrypted=encrypt_data(str(data.get('access_level', 'basic'))),
-        last_active_encrypted=submission_date,
-        license_document_encrypted=encrypt_data(str(data.get('license_document', ''))),
-        employment_verification_encrypted=encrypt_data(str(data.get('employment_verification', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-        hospital_id=data.get('hospital_id'),
-    ),
-                    'hospital': Hospital(
-        user_id=user_id,
-        logo_encrypted=encrypt_data(str(data.get('logo', ''))),
-        type_encrypted=encrypt_data(str(data.get('type', ''))),
-        beds_encrypted=encrypt_data(str(data.get('beds', ''))),
-        established_year_encrypted=encrypt_data(str(data.get('established', ''))),
-        address_encrypted=encrypt_data(str(data.get('address', ''))),
-        license_number_encrypted=encrypt_data(str(data.get('license_number', ''))),
-        submission_date_encrypted=submission_date,
-        license_document_encrypted=encrypt_data(str(data.get('license', ''))),
-        accreditation_document_encrypted=encrypt_data(str(data.get('accreditation', ''))),
-        operating_hours_encrypted=encrypt_data(str(data.get('operating_hours', ''))),
-        emergency_services_encrypted=encrypt_data(str(data.get('emergency_services', ''))),
-        medical_staff_encrypted=encrypt_data(str(data.get('medical_staff', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-    ),
-                    'pharmacy': Pharmacy(
-        user_id=user_id,
-        logo_encrypted=encrypt_data(str(data.get('logo', ''))),
-        address_encrypted=encrypt_data(str(data.get('address', ''))),
-        type_encrypted=encrypt_data(str(data.get('type', ''))),
-        submission_date_encrypted=submission_date,
-        license_number_encrypted=encrypt_data(str(data.get('license_number', ''))),
-        established_year_encrypted=encrypt_data(str(data.get('established', ''))),
-        prescriptions_filled_encrypted=encrypt_data(str(data.get('prescriptions_filled', '0'))),
-        operating_hours_encrypted=encrypt_data(str(data.get('operating_hours', ''))),
-        inventory_size_encrypted=encrypt_data(str(data.get('inventory_size', ''))),
-        license_document_encrypted=encrypt_data(str(data.get('license', ''))),
-        accreditation_document_encrypted=encrypt_data(str(data.get('accreditation', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-    ),
-                    'pharmacyAdmin': PharmacyAdmin(
-        user_id=user_id,
-        profile_image_encrypted=encrypt_data(str(data.get('profile_image', ''))),
-        admin_id_encrypted=encrypt_data(str(data.get('admin_id', ''))),
-        submission_date_encrypted=submission_date,
-        access_level_encrypted=encrypt_data(str(data.get('access_level', 'basic'))),
-        last_active_encrypted=submission_date,
-        pharmacist_cert_encrypted=encrypt_data(str(data.get('pharmacist_cert', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-        pharmacy_id=data.get('pharmacy_id'),
-    ),
-                    'pharmacist': Pharmacist(
-        user_id=user_id,
-        license_number_encrypted=encrypt_data(str(data.get('license_number', ''))),
-        submission_date_encrypted=submission_date,
-        profile_image_encrypted=encrypt_data(str(data.get('profile_image', ''))),
-        pharmacist_cert_encrypted=encrypt_data(str(data.get('pharmacist_cert', ''))),
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-        pharmacy_id=data.get('pharmacy_id'),
-    ),
-                    'admin': Admin(
-        user_id=user_id,
-        profile_image_encrypted=encrypt_data(str(data.get('profile_image', ''))),
-        security_level_encrypted=encrypt_data(str(data.get('security_level', 'standard'))),
-        audit_access_encrypted=encrypt_data(str(data.get('audit_access', 'False'))),
-        submission_date_encrypted=submission_date,
-        status_encrypted=encrypt_data(str(data.get('status', ''))),
-        description_encrypted=encrypt_data(str(data.get('description', ''))),
-    )
-                }
-                
-                current_app.logger.warning(f"Role models: {role_models[role]}")
-
-                db.session.add(role_models[role])
+                submitted_at = datetime.utcnow()
+                entity = build_role_entity(role, user_id, data, submitted_at)
+                db.session.add(entity)
+                sync_user_directory(role, entity)
 
             db.session.commit()
+            invalidate_profile(existing_user.id)
+            bump_change_version(role)
+            publish_event('submission', role, user_id)
 
             try:
                 AuditLog.log_async(
@@ -886,41 +696,32 @@ def login():
             current_app.logger.warning("Missing credentials")
             return jsonify({"message": "Email and password required"}), 400
 
-        email_hash = generate_email_hash(email)
-        user = User.query.filter_by(email_hash=email_hash).first()
-
-        model_mapping = {
-            'hospital': Hospital,
-            'pharmacy': Pharmacy,    
-            'doctor': Doctor,
-            'pharmacist': Pharmacist,
-            'hospital_admin': HospitalAdmin,
-            'pharmacy_admin': PharmacyAdmin,
-            'patient': Patient,
-            'admin': Admin
-        }
+        retry_after = login_retry_after(email, request.remote_addr)
+        if retry_after:
+            current_app.logger.warning(f"Login throttled for {retry_after}s - IP: {request.remote_addr}")
+            response = jsonify({"message": "Too many failed attempts, try again later", "retry_after": retry_after})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
 
-        model = model_mapping.get(user.role)
-        if not model:
-            current_app.logger.warning(f"Invalid entity type: {user.role}")
-            return jsonify({"message": "Invalid entity type"}), 400
-        
-        entity = model.query.filter_by(user_id=user.id).first()
-        if not entity:
+        account_state = get_cached_account_state(email)
+        user = None
+        if account_state is None:
+            user, account_state = load_login_account(email)
+
+        if account_state is not None and account_state.state is None:
             current_app.logger.warning(f"Entity not found: {user.role} with ID {user.id}")
             return jsonify({"message": "Entity not found"}), 404
-        
-        if  entity.verified != True:
-            current_app.logger.warning(f"Inactive account: {user.role} with ID {user.id}")
-            if decrypt_data(entity.status_encrypted) != 'approved':
-                return jsonify({"message": "Account rejected description:"+decrypt_data(entity.description_encrypted)}), 403
-            else:
-                return jsonify({"message": "Account pending approval"}), 403
-
-        if not user or not check_password_hash(user.password, password):
+
+        if account_state is not None and account_state.state != VERIFIED:
+            current_app.logger.warning(f"Inactive account login attempt ({account_state.state}): {email}")
+            if account_state.state == REJECTED:
+                return jsonify({"message": "Account rejected description:" + (account_state.reason or '')}), 403
+            return jsonify({"message": "Account pending approval"}), 403
+
+        if not user or not verify_password(user.password, password):
             current_app.logger.warning(f"Failed login attempt for {email}")
-            time.sleep(random.uniform(0.5, 1.5))  
-            
+            retry_after = record_failed_login(email, request.remote_addr)
+
             AuditLog.log_async(
                 event='FAILED_LOGIN',
                 user=email,
@@ -931,7 +732,18 @@ def login():
                     'device_fingerprint': request.headers.get('X-Device-Fingerprint')
                 }
             )
-            return jsonify({"message": "Invalid credentials"}), 401
+            response = jsonify({"message": "Invalid credentials"})
+            if retry_after:
+                response.headers['Retry-After'] = str(retry_after)
+            return response, 401
+
+        if needs_rehash(user.password):
+            # Upgrade to the configured algorithm/cost; a one-off write per account.
+            try:
+                user.password = hash_password(password)
+                db.session.commit()
+            except HashingBusy:
+                current_app.logger.info(f"Password rehash deferred for user {user.id}")
 
         if not user.account_verified:
             current_app.logger.warning(f"Unverified account login attempt: {email}")
@@ -963,7 +775,7 @@ def login():
                     )
                 else:
                     send_mfa_code(
-                        recipient=decrypt_data(user.email_encrypted),
+                        recipient=user.email,
                         code=mfa_code,
                         method=user.mfa_method  # email/sms/authenticator
                     )
@@ -994,20 +806,19 @@ def login():
         )
         refresh_token = create_refresh_token(identity=user.id)
         
-        user.last_login_at = datetime.utcnow()
-        user.last_login_ip = request.remote_addr
-        user.failed_login_attempts = 0  
-        db.session.commit()
+        record_login(user.id, request.remote_addr)
+        clear_failed_logins(email)
+        profile = get_profile(user.id, user=user)
 
         response = jsonify({
             "message": "Login successful",
             'token': access_token,
             "user": {
                 "id": user.id,
-                "name": decrypt_data(user.name_encrypted),
+                "name": profile['name'],
                 "email": email,
                 "role": user.role,
-                "mfa_enabled": user.mfa_enabled
+                "mfa_enabled": profile['mfa_enabled']
             },
             "security": {
                 "cookie_domains": current_app.config.get('JWT_COOKIE_DOMAIN'),
@@ -1040,6 +851,8 @@ def login():
         current_app.logger.info(f"Successful login for user {user.id}")
         return response, 200
 
+    except HashingBusy as e:
+        return _hashing_busy_response(e)
     except Exception as e:
         current_app.logger.critical(
             f"Login Error - IP: {request.remote_addr} - Error: {str(e)}",
@@ -1054,9 +867,10 @@ def logout():
     try:
         response = jsonify({"message": "Logout successful"})
         unset_jwt_cookies(response)
-        jti = get_jwt()['jti']
-        db.session.add(TokenBlacklist(jti=jti))
+        claims = get_jwt()
+        db.session.add(TokenBlacklist(jti=claims['jti']))
         db.session.commit()
+        revoke_token(claims)
         
         AuditLog.log_event(
             event_type='LOGOUT',
@@ -1104,8 +918,7 @@ def request_password_reset():
             return jsonify({"message": "Too many reset attempts. Please wait."}), 429
         redis_client.setex(rate_limit_key, timedelta(minutes=5), "1")
 
-        email_hash = generate_email_hash(email)
-        user = User.query.filter_by(email_hash=email_hash).first()
+        user = User.query.filter(User.email_hash.in_(email_hash_candidates(email))).first()
         
         if not user:
             current_app.logger.info(f"Password reset request for unregistered email: {email}")
@@ -1378,12 +1191,12 @@ def reset_password():
             )
             return jsonify({"message": "Password does not meet security requirements"}), 400
 
-        user.password = generate_password_hash(new_password)
+        user.password = hash_password(new_password)
         user.last_password_change = datetime.utcnow()
         db.session.commit()
 
         redis_client.delete(redis_key)
-        redis_client.delete(f"login_block:{user.id}")  
+        clear_failed_logins(user.email)
 
         AuditLog.log_async(
             event='PASSWORD_RESET_SUCCESS',
@@ -1394,6 +1207,8 @@ def reset_password():
 
         return jsonify({"message": "Password successfully updated"}), 200
 
+    except HashingBusy as e:
+        return _hashing_busy_response(e)
     except Exception as e:
         current_app.logger.critical(f"Critical error in password reset: {str(e)}")
         db.session.rollback()
@@ -1416,6 +1231,7 @@ def enable_mfa():
         user.mfa_secret = encrypted_secret
         user.mfa_enabled = True
         db.session.commit()
+        invalidate_profile(user.id)
 
         # QR kodu oluşturma URL'si
         qr_url = f"otpauth://totp/Medicare:{user.email}?secret={mfa_secret}&issuer=Medicare"
@@ -1444,6 +1260,7 @@ def disable_mfa():
         user.mfa_secret = None
         user.mfa_enabled = False
         db.session.commit()
+        invalidate_profile(user.id)
 
         return jsonify({"message": "MFA devre dışı bırakıldı"}), 200
 
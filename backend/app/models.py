@@ -3,20 +3,32 @@ from datetime import datetime
 from flask import current_app
 from app import db
 from sqlalchemy import event
+from sqlalchemy.orm import deferred
+from app.envelope import EnvelopeMixin
+from app.encrypted_types import EncryptedBinary, EncryptedString, EncryptedText, with_encrypted_attributes
 
+# Deferred column groups: large encrypted blobs are only loaded when a
+# query explicitly asks for them with undefer_group().
+MEDIA_GROUP = 'media'
+DOCUMENT_GROUP = 'documents'
+
+@with_encrypted_attributes
 class User(db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     role = db.Column(db.String(255), nullable=False, default='patient')
-    email_encrypted = db.Column(db.String(255), nullable=False, unique=True)
+    email_encrypted = db.Column(EncryptedString(255), nullable=False, unique=True)
     email_hash = db.Column(db.String(255), nullable=False, unique=True, index=True)
     password = db.Column(db.String(255), nullable=False)
-    name_encrypted = db.Column(db.String(255))
-    telephone_encrypted = db.Column(db.String(255))
+    name_encrypted = db.Column(EncryptedString(255))
+    telephone_encrypted = db.Column(EncryptedString(255))
     telephone_hash = db.Column(db.String(255), unique=True, index=True)
     mfa_enabled = db.Column(db.Boolean, default=False)
     last_password_change = db.Column(db.DateTime, default=datetime.utcnow)
     account_verified = db.Column(db.Boolean, default=False)
+    # Written in batches by app.login_activity; up to USER_ACTIVITY_FLUSH_INTERVAL stale.
+    last_login_at = db.Column(db.DateTime)
+    last_login_ip = db.Column(db.String(45))
 
     patient = db.relationship('Patient', back_populates='user')
     doctor = db.relationship('Doctor', back_populates='user', cascade='all, delete-orphan', uselist=False)
@@ -25,147 +37,192 @@ class User(db.Model):
     pharmacist = db.relationship('Pharmacist', back_populates='user', cascade='all, delete-orphan', uselist=False)
     admin = db.relationship('Admin', back_populates='user', cascade='all, delete-orphan', uselist=False)
 
-class Hospital(db.Model):
+@with_encrypted_attributes
+class Hospital(EnvelopeMixin, db.Model):
     __tablename__ = 'hospitals'
+    __table_args__ = (db.Index('ix_hospitals_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, primary_key=True)
-    logo_encrypted = db.Column(db.Text)
-    type_encrypted = db.Column(db.String(255))
-    beds_encrypted = db.Column(db.String(255))
-    established_year_encrypted = db.Column(db.String(255))
-    address_encrypted = db.Column(db.Text)
-    license_number_encrypted = db.Column(db.String(255), unique=True)
-    submission_date_encrypted = db.Column(db.Text)
-    license_document_encrypted = db.Column(db.Text)
-    accreditation_document_encrypted = db.Column(db.Text)
-    operating_hours_encrypted = db.Column(db.Text)
-    emergency_services_encrypted = db.Column(db.Text)
-    medical_staff_encrypted = db.Column(db.Text)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    logo_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    type_encrypted = db.Column(EncryptedString(255))
+    beds_encrypted = db.Column(EncryptedString(255))
+    established_year_encrypted = db.Column(EncryptedString(255))
+    address_encrypted = db.Column(EncryptedText)
+    license_number_encrypted = db.Column(EncryptedString(255), unique=True)
+    submission_date_encrypted = db.Column(EncryptedText)
+    license_document_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    accreditation_document_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    operating_hours_encrypted = db.Column(EncryptedText)
+    emergency_services_encrypted = db.Column(EncryptedText)
+    medical_staff_encrypted = db.Column(EncryptedText)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     verified = db.Column(db.Boolean, default=False, nullable=False)
+    submitted_at = db.Column(db.DateTime)
 
     doctors = db.relationship('Doctor', back_populates='hospital')
     admins = db.relationship('HospitalAdmin', back_populates='hospital')
 
-class Admin(db.Model):
+@with_encrypted_attributes
+class Admin(EnvelopeMixin, db.Model):
     __tablename__ = 'admins'
+    __table_args__ = (db.Index('ix_admins_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
-    profile_image_encrypted = db.Column(db.Text)
-    security_level_encrypted = db.Column(db.String(255)) 
-    audit_access_encrypted = db.Column(db.Text)
-    submission_date_encrypted = db.Column(db.Text)
+    profile_image_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    security_level_encrypted = db.Column(EncryptedString(255)) 
+    audit_access_encrypted = db.Column(EncryptedText)
+    submission_date_encrypted = db.Column(EncryptedText)
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
         
     user = db.relationship('User', back_populates='admin')
 
-class HospitalAdmin(db.Model):
+@with_encrypted_attributes
+class HospitalAdmin(EnvelopeMixin, db.Model):
     __tablename__ = 'hospital_admins'
+    __table_args__ = (db.Index('ix_hospital_admins_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
-    profile_image_encrypted = db.Column(db.Text)
-    hospital_id_encrypted = db.Column(db.String(255))
-    admin_id_encrypted = db.Column(db.String(255))
-    submission_date_encrypted = db.Column(db.Text)
-    qualifications_encrypted = db.Column(db.Text)
-    department_encrypted = db.Column(db.String(255))
-    access_level_encrypted = db.Column(db.String(255))
-    last_active_encrypted = db.Column(db.Text)
-    license_document_encrypted = db.Column(db.Text)
-    employment_verification_encrypted = db.Column(db.Text)
+    profile_image_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    hospital_id_encrypted = db.Column(EncryptedString(255))
+    admin_id_encrypted = db.Column(EncryptedString(255))
+    submission_date_encrypted = db.Column(EncryptedText)
+    qualifications_encrypted = db.Column(EncryptedText)
+    department_encrypted = db.Column(EncryptedString(255))
+    access_level_encrypted = db.Column(EncryptedString(255))
+    last_active_encrypted = db.Column(EncryptedText)
+    license_document_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    employment_verification_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospitals.user_id'))
     
     user = db.relationship('User', back_populates='hospital_admin')
     hospital = db.relationship('Hospital', back_populates='admins')
 
-class Pharmacy(db.Model):
+@with_encrypted_attributes
+class Pharmacy(EnvelopeMixin, db.Model):
     __tablename__ = 'pharmacies'
+    __table_args__ = (db.Index('ix_pharmacies_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, primary_key=True)
-    logo_encrypted = db.Column(db.Text)
-    address_encrypted = db.Column(db.Text)
-    type_encrypted = db.Column(db.String(255))
-    submission_date_encrypted = db.Column(db.Text)
-    license_number_encrypted = db.Column(db.String(255), unique=True)
-    established_year_encrypted = db.Column(db.String(255))
-    prescriptions_filled_encrypted = db.Column(db.String(255))
-    operating_hours_encrypted = db.Column(db.Text)
-    inventory_size_encrypted = db.Column(db.String(255))
-    license_document_encrypted = db.Column(db.Text)
-    accreditation_document_encrypted = db.Column(db.Text)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    logo_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    address_encrypted = db.Column(EncryptedText)
+    type_encrypted = db.Column(EncryptedString(255))
+    submission_date_encrypted = db.Column(EncryptedText)
+    license_number_encrypted = db.Column(EncryptedString(255), unique=True)
+    established_year_encrypted = db.Column(EncryptedString(255))
+    prescriptions_filled_encrypted = db.Column(EncryptedString(255))
+    operating_hours_encrypted = db.Column(EncryptedText)
+    inventory_size_encrypted = db.Column(EncryptedString(255))
+    license_document_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    accreditation_document_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     verified = db.Column(db.Boolean, default=False, nullable=False)
+    submitted_at = db.Column(db.DateTime)
     
     admins = db.relationship('PharmacyAdmin', back_populates='pharmacy')
     pharmacists = db.relationship('Pharmacist', back_populates='pharmacy')
 
-class PharmacyAdmin(db.Model):
+@with_encrypted_attributes
+class PharmacyAdmin(EnvelopeMixin, db.Model):
     __tablename__ = 'pharmacy_admins'
+    __table_args__ = (db.Index('ix_pharmacy_admins_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
-    profile_image_encrypted = db.Column(db.Text)
-    admin_id_encrypted = db.Column(db.String(255))
-    submission_date_encrypted = db.Column(db.Text)
-    access_level_encrypted = db.Column(db.String(255))
-    last_active_encrypted = db.Column(db.Text)
-    pharmacist_cert_encrypted = db.Column(db.Text)
+    profile_image_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    admin_id_encrypted = db.Column(EncryptedString(255))
+    submission_date_encrypted = db.Column(EncryptedText)
+    access_level_encrypted = db.Column(EncryptedString(255))
+    last_active_encrypted = db.Column(EncryptedText)
+    pharmacist_cert_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     pharmacy_id = db.Column(db.Integer, db.ForeignKey('pharmacies.user_id'))
     
     user = db.relationship('User', back_populates='pharmacy_admin')
     pharmacy = db.relationship('Pharmacy', back_populates='admins')
 
-class Pharmacist(db.Model):
+@with_encrypted_attributes
+class Pharmacist(EnvelopeMixin, db.Model):
     __tablename__ = 'pharmacists'
+    __table_args__ = (db.Index('ix_pharmacists_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
-    license_number_encrypted = db.Column(db.String(255), unique=True)
-    profile_image_encrypted = db.Column(db.Text)
-    submission_date_encrypted = db.Column(db.Text)
-    pharmacist_cert_encrypted = db.Column(db.Text)
+    license_number_encrypted = db.Column(EncryptedString(255), unique=True)
+    profile_image_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    submission_date_encrypted = db.Column(EncryptedText)
+    pharmacist_cert_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     pharmacy_id = db.Column(db.Integer, db.ForeignKey('pharmacies.user_id'))
     
     user = db.relationship('User', back_populates='pharmacist')
     pharmacy = db.relationship('Pharmacy', back_populates='pharmacists')
 
-class Patient(db.Model):
+@with_encrypted_attributes
+class Patient(EnvelopeMixin, db.Model):
     __tablename__ = 'patients'
+    __table_args__ = (db.Index('ix_patients_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
-    birthyear_encrypted = db.Column(db.String(255))
-    profile_image_encrypted = db.Column(db.Text)
-    submission_date_encrypted = db.Column(db.Text)
-    patient_id_encrypted = db.Column(db.String(255), unique=True)
-    id_proof_encrypted = db.Column(db.Text)
-    insurance_encrypted = db.Column(db.Text)
+    birthyear_encrypted = db.Column(EncryptedString(255))
+    profile_image_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    submission_date_encrypted = db.Column(EncryptedText)
+    patient_id_encrypted = db.Column(EncryptedString(255), unique=True)
+    id_proof_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    insurance_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     
     user = db.relationship('User', back_populates='patient')
 
-class Doctor(db.Model):
+@with_encrypted_attributes
+class Doctor(EnvelopeMixin, db.Model):
     __tablename__ = 'doctors'
+    __table_args__ = (db.Index('ix_doctors_verified_submitted_at', 'verified', 'submitted_at'),)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
-    specialty_encrypted = db.Column(db.String(255))
-    profile_image_encrypted = db.Column(db.Text)
-    submission_date_encrypted = db.Column(db.Text)
-    license_number_encrypted = db.Column(db.String(255), unique=True)
-    license_document_encrypted = db.Column(db.Text)
-    degree_encrypted = db.Column(db.String(255))
+    specialty_encrypted = db.Column(EncryptedString(255))
+    profile_image_encrypted = deferred(db.Column(EncryptedBinary), group=MEDIA_GROUP)
+    submission_date_encrypted = db.Column(EncryptedText)
+    license_number_encrypted = db.Column(EncryptedString(255), unique=True)
+    license_document_encrypted = deferred(db.Column(EncryptedBinary), group=DOCUMENT_GROUP)
+    degree_encrypted = db.Column(EncryptedString(255))
     verified = db.Column(db.Boolean, default=False, nullable=False)
-    status_encrypted = db.Column(db.String(255))
-    description_encrypted = db.Column(db.Text)
+    submitted_at = db.Column(db.DateTime)
+    status_encrypted = db.Column(EncryptedString(255))
+    description_encrypted = db.Column(EncryptedText)
     hospital_id = db.Column(db.Integer, db.ForeignKey('hospitals.user_id'))
     
     user = db.relationship('User', back_populates='doctor')
     hospital = db.relationship('Hospital', back_populates='doctors')
 
+class UserDirectory(db.Model):
+    """Plaintext projection of the role tables for admin listings.
+
+    One row per (user, role) with the verification state, so listings can
+    filter and paginate in SQL instead of decrypting every role row.
+    Maintained by select_role/approve/reject via app.user_directory.
+    """
+    __tablename__ = 'user_directory'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    role = db.Column(db.String(32), primary_key=True)
+    status = db.Column(db.String(255), nullable=False, default='pending')
+    verified = db.Column(db.Boolean, default=False, nullable=False)
+    submitted_at = db.Column(db.DateTime)
+
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_user_directory_status_user', 'status', 'user_id'),
+        db.Index('ix_user_directory_role_status', 'role', 'status', 'user_id'),
+    )
+
 class AuditLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     event = db.Column(db.String(100), nullable=False)
@@ -186,6 +243,8 @@ class AuditLog(db.Model):
                     log_entry = cls(**kwargs)
                     db.session.add(log_entry)
                     db.session.commit()
+                    from app.events import publish_event
+                    publish_event('audit', event=log_entry.event)
 
             Thread(target=log_in_app_context).start()
         except Exception as e:
@@ -195,3 +254,25 @@ class TokenBlacklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(36), nullable=False, unique=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+# Role name -> role model. select_role stores camelCase role names on
+# User.role ('hospitalAdmin'), the admin endpoints use snake_case
+# ('hospital_admin'); both resolve to the same model.
+ROLE_MODELS = {
+    'hospital': Hospital,
+    'pharmacy': Pharmacy,
+    'doctor': Doctor,
+    'pharmacist': Pharmacist,
+    'hospital_admin': HospitalAdmin,
+    'pharmacy_admin': PharmacyAdmin,
+    'patient': Patient,
+    'admin': Admin
+}
+
+ROLE_ALIASES = {
+    'hospitalAdmin': 'hospital_admin',
+    'pharmacyAdmin': 'pharmacy_admin'
+}
+
+def role_model(role):
+    return ROLE_MODELS.get(ROLE_ALIASES.get(role, role))
@@ -0,0 +1,161 @@
+# app/name_index.py
+"""In-memory prefix index of approved hospital and pharmacy names.
+
+Each worker lazily builds one trie per directory type from the verified
+directory snapshot (see app/directory.py), capped at
+AUTOCOMPLETE_MAX_ENTRIES names. approve/reject publish on a Redis channel
+and every worker drops the affected trie, which is rebuilt on the next
+lookup.
+"""
+from threading import Lock, Thread
+import time
+
+from flask import current_app
+
+from app.directory import DIRECTORY_MODELS, get_snapshot
+from app.security import redis_client
+
+INVALIDATION_CHANNEL = 'name_index:invalidate'
+# Safety net in case an invalidation message is missed.
+MAX_INDEX_AGE = 600
+# Largest `limit` a lookup may ask for; each trie node keeps this many ids.
+MAX_RESULTS = 50
+# Prefixes are indexed up to this many characters; longer queries filter the
+# names found at that depth.
+MAX_PREFIX_LENGTH = 24
+
+
+def _normalize(text):
+    return ' '.join(text.casefold().split())
+
+
+def _word_starts(normalized):
+    return [normalized[i:] for i in [0] + [i + 1 for i, char in enumerate(normalized) if char == ' ']]
+
+
+class PrefixTrie:
+    """Names must be inserted in the order lookups return them (see build()).
+
+    Each node keeps only the first MAX_RESULTS ids below it, already in
+    order, so a lookup is a walk plus a slice. Nodes at MAX_PREFIX_LENGTH
+    keep every id, since longer queries filter them.
+    """
+
+    def __init__(self):
+        self.root = {}
+        self.names = {}
+        self.normalized = {}
+
+    @classmethod
+    def build(cls, entries):
+        trie = cls()
+        for entity_id, name in sorted(entries, key=lambda entry: (entry[1].casefold(), entry[0])):
+            trie.insert(entity_id, name)
+        return trie
+
+    def insert(self, entity_id, name):
+        self.names[entity_id] = name
+        normalized = self.normalized[entity_id] = _normalize(name)
+        # Index the full name and every word start, so "gen" and "hosp"
+        # both find "General Hospital".
+        for suffix in _word_starts(normalized):
+            node = self.root
+            for depth, char in enumerate(suffix[:MAX_PREFIX_LENGTH], 1):
+                node = node.setdefault(char, {})
+                ids = node.setdefault(None, [])
+                if ids and ids[-1] == entity_id:
+                    continue
+                if depth == MAX_PREFIX_LENGTH or len(ids) < MAX_RESULTS:
+                    ids.append(entity_id)
+
+    def search(self, prefix, limit):
+        prefix = _normalize(prefix)
+        node = self.root
+        for char in prefix[:MAX_PREFIX_LENGTH]:
+            node = node.get(char)
+            if node is None:
+                return []
+        ids = node.get(None, [])
+        if len(prefix) > MAX_PREFIX_LENGTH:
+            ids = [i for i in ids if any(s.startswith(prefix) for s in _word_starts(self.normalized[i]))]
+        return [{'id': i, 'name': self.names[i]} for i in ids[:limit]]
+
+    def __len__(self):
+        return len(self.names)
+
+
+_indexes = {}
+_built_at = {}
+_generations = {}
+_lock = Lock()
+_subscriber = None
+
+
+def _build(directory_type):
+    max_entries = current_app.config.get('AUTOCOMPLETE_MAX_ENTRIES', 50000)
+    entries = [(entry['id'], entry['name']) for entry in get_snapshot(directory_type).entries if entry['name']]
+    if len(entries) > max_entries:
+        current_app.logger.warning(f"{directory_type} name index capped at {max_entries} entries")
+        entries = entries[:max_entries]
+    return PrefixTrie.build(entries)
+
+
+def _ensure_subscriber(app):
+    global _subscriber
+    with _lock:
+        if _subscriber is not None:
+            return
+
+        def listen():
+            while True:
+                try:
+                    pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(INVALIDATION_CHANNEL)
+                    for message in pubsub.listen():
+                        invalidate(message.get('data'))
+                except Exception as e:
+                    app.logger.error(f"Name index subscriber error: {str(e)}")
+                    invalidate()
+                    time.sleep(5)
+
+        _subscriber = Thread(target=listen, daemon=True)
+        _subscriber.start()
+
+
+def invalidate(directory_type=None):
+    """Drops the local trie for `directory_type` (all tries if None)."""
+    with _lock:
+        types = [directory_type] if directory_type in DIRECTORY_MODELS else list(DIRECTORY_MODELS)
+        for name in types:
+            _indexes.pop(name, None)
+            _generations[name] = _generations.get(name, 0) + 1
+
+
+def publish_invalidation(directory_type):
+    """Tells every worker to drop its `directory_type` trie."""
+    if directory_type not in DIRECTORY_MODELS:
+        return
+    invalidate(directory_type)
+    try:
+        redis_client.publish(INVALIDATION_CHANNEL, directory_type)
+    except Exception as e:
+        current_app.logger.error(f"Name index invalidation publish failed: {str(e)}")
+
+
+def autocomplete(directory_type, prefix, limit=10):
+    _ensure_subscriber(current_app._get_current_object())
+    with _lock:
+        trie = _indexes.get(directory_type)
+        if trie is not None and time.monotonic() - _built_at[directory_type] <= MAX_INDEX_AGE:
+            return trie.search(prefix, limit)
+        generation = _generations.get(directory_type, 0)
+
+    # Build without the lock so lookups on the other trie are not blocked.
+    trie = _build(directory_type)
+    with _lock:
+        # An invalidation that arrived during the build wins; this request
+        # still uses what it built.
+        if _generations.get(directory_type, 0) == generation:
+            _indexes[directory_type] = trie
+            _built_at[directory_type] = time.monotonic()
+    return trie.search(prefix, limit)
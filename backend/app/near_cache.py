@@ -0,0 +1,236 @@
+# app/near_cache.py
+"""Opt-in per-process near-cache for hot, read-mostly Redis keys.
+
+With NEAR_CACHE_ENABLED, the Redis clients in app.security and app/__init__
+are `NearCachedRedis` instances. `get()` and `ttl()` on keys under
+NEAR_CACHE_PREFIXES (revoked tokens, registration and login throttles) are
+answered from a bounded LRU copy, including "key does not exist" answers,
+which are the common case for `revoked_token:<jti>`. Every other command
+goes straight to Redis.
+
+Entries are dropped when Redis reports a change. The preferred mode is
+server-assisted client tracking (Redis 6+, `CLIENT TRACKING ... BCAST
+PREFIX`): one connection per process subscribes to `__redis__:invalidate`
+and receives an invalidation for every write, delete or expiry under the
+prefixes. If tracking is unavailable, or NEAR_CACHE_MODE is `keyspace`,
+keyspace notifications are used instead; the server then needs
+notify-keyspace-events to include at least `Kg$x`. Until the invalidation
+connection is up, and whenever it drops, the cache is empty and reads go to
+Redis. NEAR_CACHE_MAX_AGE bounds how long an entry is trusted regardless.
+"""
+from collections import OrderedDict
+import logging
+import os
+from threading import Lock, Thread
+import time
+
+import redis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+
+from app.redis_breaker import BreakerRedis, get_breaker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFIXES = ('revoked_token:', 'reg_attempt:', 'login_block:')
+INVALIDATE_CHANNEL = '__redis__:invalidate'
+
+
+class NearCachedRedis(BreakerRedis):
+
+    def __init__(self, *args, prefixes=DEFAULT_PREFIXES, max_entries=10000, max_age=30,
+                 mode='tracking', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prefixes = tuple(prefixes)
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.mode = mode
+        # key -> (value, expires_at or None, trusted_until)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = Lock()
+        self._ready = False
+        self._listener_pid = None
+
+    def get(self, name):
+        entry = self._cached(name)
+        return entry[0] if entry else super().get(name)
+
+    def ttl(self, name):
+        entry = self._cached(name)
+        if not entry:
+            return super().ttl(name)
+        value, expires_at, _ = entry
+        if value is None:
+            return -2
+        if expires_at is None:
+            return -1
+        return max(round(expires_at - time.monotonic()), 0)
+
+    def _cached(self, name):
+        """The entry for `name`, fetched on a miss; None if `name` is not cacheable."""
+        if not isinstance(name, str) or not name.startswith(self.prefixes):
+            return None
+        self._ensure_listener()
+        if not self._ready:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry[2] > now:
+                self._entries.move_to_end(name)
+                return entry
+        return self._fetch(name)
+
+    def _fetch(self, name):
+        token = object()
+        with self._lock:
+            self._inflight[name] = token
+        try:
+            pipe = super().pipeline(transaction=False)
+            pipe.get(name)
+            pipe.pttl(name)
+            value, pttl = pipe.execute()
+        except Exception:
+            with self._lock:
+                if self._inflight.get(name) is token:
+                    del self._inflight[name]
+            raise
+
+        now = time.monotonic()
+        expires_at = now + pttl / 1000 if pttl >= 0 else None
+        trusted_until = now + self.max_age
+        if expires_at is not None:
+            trusted_until = min(trusted_until, expires_at)
+        entry = (value, expires_at, trusted_until)
+        with self._lock:
+            # An invalidation that arrived while fetching removed the token:
+            # the value may already be stale, so it is returned but not kept.
+            if self._inflight.get(name) is token:
+                del self._inflight[name]
+                if self._ready:
+                    self._entries[name] = entry
+                    self._entries.move_to_end(name)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+        return entry
+
+    def _invalidate(self, keys=None):
+        """Drops `keys`, or everything if `keys` is None (e.g. FLUSHDB)."""
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+                self._inflight.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+                self._inflight.pop(key, None)
+
+    def _set_ready(self, ready):
+        with self._lock:
+            self._ready = ready
+            self._entries.clear()
+            self._inflight.clear()
+
+    def _ensure_listener(self):
+        # Threads do not survive fork(): each worker process starts its own.
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._ready = False
+            self._entries.clear()
+            self._inflight.clear()
+        Thread(target=self._listen, daemon=True, name='redis-near-cache').start()
+
+    def _connect(self):
+        kwargs = dict(self.connection_pool.connection_kwargs, decode_responses=True)
+        kwargs.pop('socket_timeout', None)
+        return self.connection_pool.connection_class(**kwargs)
+
+    def _subscribe_tracking(self, connection):
+        connection.send_command('CLIENT', 'ID')
+        client_id = connection.read_response()
+        prefix_args = [arg for prefix in self.prefixes for arg in ('PREFIX', prefix)]
+        # Invalidations are redirected to this same connection once subscribed.
+        connection.send_command('CLIENT', 'TRACKING', 'ON', 'REDIRECT', client_id, 'BCAST', *prefix_args)
+        connection.read_response()
+        connection.send_command('SUBSCRIBE', INVALIDATE_CHANNEL)
+        connection.read_response()
+
+    def _subscribe_keyspace(self, connection):
+        db = self.connection_pool.connection_kwargs.get('db', 0)
+        patterns = [f"__keyspace@{db}__:{prefix}*" for prefix in self.prefixes]
+        connection.send_command('PSUBSCRIBE', *patterns)
+        for _ in patterns:
+            connection.read_response()
+
+    def _handle(self, message, keyspace_prefix):
+        kind = message[0]
+        if kind == 'message' and message[1] == INVALIDATE_CHANNEL:
+            self._invalidate(message[2])
+        elif kind == 'pmessage' and message[2].startswith(keyspace_prefix):
+            self._invalidate([message[2][len(keyspace_prefix):]])
+
+    def _listen(self):
+        pid = os.getpid()
+        mode = self.mode
+        db = self.connection_pool.connection_kwargs.get('db', 0)
+        keyspace_prefix = f"__keyspace@{db}__:"
+        while self._listener_pid == pid:
+            connection = self._connect()
+            try:
+                connection.connect()
+                if mode == 'tracking':
+                    try:
+                        self._subscribe_tracking(connection)
+                    except redis.exceptions.ResponseError as e:
+                        logger.warning(f"Redis client tracking unavailable, using keyspace notifications: {str(e)}")
+                        mode = 'keyspace'
+                        continue
+                else:
+                    self._subscribe_keyspace(connection)
+                self._set_ready(True)
+
+                idle_since = time.monotonic()
+                while self._listener_pid == pid:
+                    if connection.can_read(timeout=5):
+                        self._handle(connection.read_response(), keyspace_prefix)
+                        idle_since = time.monotonic()
+                    elif time.monotonic() - idle_since > 15:
+                        raise ConnectionError("No reply from Redis on the invalidation connection")
+                    else:
+                        # Liveness check; the pong arrives as an ordinary message.
+                        connection.send_command('PING')
+            except Exception as e:
+                logger.error(f"Redis near-cache invalidation connection lost: {str(e)}")
+                time.sleep(1)
+            finally:
+                # Without invalidations no entry can be trusted.
+                self._set_ready(False)
+                connection.disconnect()
+
+
+def create_redis_client(config, **connection_kwargs):
+    """A BreakerRedis, or a NearCachedRedis when `config['NEAR_CACHE_ENABLED']`.
+
+    Clients for the same server share one circuit breaker (app.redis_breaker).
+    """
+    connection_kwargs.setdefault('socket_timeout', config.get('REDIS_SOCKET_TIMEOUT', 0.5))
+    connection_kwargs.setdefault('socket_connect_timeout', config.get('REDIS_SOCKET_TIMEOUT', 0.5))
+    # redis-py retries with backoff by default, stretching each failure to
+    # seconds; the breaker decides when to try again instead.
+    connection_kwargs.setdefault('retry', Retry(NoBackoff(), 0))
+    breaker = get_breaker(config, connection_kwargs.get('host', 'localhost'), connection_kwargs.get('port', 6379))
+    if not config.get('NEAR_CACHE_ENABLED', False):
+        return BreakerRedis(breaker=breaker, **connection_kwargs)
+    return NearCachedRedis(
+        prefixes=config.get('NEAR_CACHE_PREFIXES', DEFAULT_PREFIXES),
+        max_entries=config.get('NEAR_CACHE_MAX_ENTRIES', 10000),
+        max_age=config.get('NEAR_CACHE_MAX_AGE', 30),
+        mode=config.get('NEAR_CACHE_MODE', 'tracking'),
+        breaker=breaker,
+        **connection_kwargs
+    )
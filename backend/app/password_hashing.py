@@ -0,0 +1,244 @@
+# app/password_hashing.py
+"""Password hashing on a bounded executor with admission control.
+
+Request threads hand hashing work to a pool of PASSWORD_HASH_WORKERS
+threads instead of running it themselves. At most PASSWORD_HASH_MAX_QUEUE
+calls may wait for a worker; beyond that, and for calls that waited longer
+than PASSWORD_HASH_QUEUE_TIMEOUT seconds, `HashingBusy` is raised and the
+endpoint answers 503 with Retry-After. A credential-stuffing burst can so
+only occupy the hashing pool, never every request thread.
+
+New hashes use the engine named by PASSWORD_HASH_ALGORITHM (pbkdf2, scrypt
+or argon2id) with the cost parameters from Config; any supported format can
+be verified. `needs_rehash()` tells login when a stored hash is below the
+current algorithm/cost, and `flask calibrate-password-hash` picks costs
+that hit a target latency on the host.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from threading import Lock
+import time
+
+import click
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_executor = None
+_lock = Lock()
+_pending = 0
+
+
+class Pbkdf2Engine:
+    name = 'pbkdf2'
+
+    def __init__(self, iterations):
+        self.iterations = iterations
+
+    def hash(self, password):
+        return generate_password_hash(password, f'pbkdf2:sha256:{self.iterations}')
+
+    def needs_rehash(self, password_hash):
+        method = password_hash.split('$', 1)[0].split(':')
+        return method[:2] != ['pbkdf2', 'sha256'] or len(method) < 3 or int(method[2]) < self.iterations
+
+
+class ScryptEngine:
+    name = 'scrypt'
+
+    def __init__(self, n, r, p):
+        self.method = f'scrypt:{n}:{r}:{p}'
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+
+class Argon2Engine:
+    name = 'argon2id'
+
+    def __init__(self, time_cost, memory_cost, parallelism):
+        try:
+            from argon2 import PasswordHasher
+        except ImportError:
+            raise RuntimeError("PASSWORD_HASH_ALGORITHM=argon2id requires the argon2-cffi package")
+        self.hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+    def hash(self, password):
+        return self.hasher.hash(password)
+
+    def needs_rehash(self, password_hash):
+        return not password_hash.startswith('$argon2id$') or self.hasher.check_needs_rehash(password_hash)
+
+
+def build_engine(config, algorithm=None):
+    algorithm = algorithm or config.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    if algorithm == 'pbkdf2':
+        return Pbkdf2Engine(config.get('PASSWORD_PBKDF2_ITERATIONS', 600000))
+    if algorithm == 'scrypt':
+        return ScryptEngine(
+            config.get('PASSWORD_SCRYPT_N', 32768),
+            config.get('PASSWORD_SCRYPT_R', 8),
+            config.get('PASSWORD_SCRYPT_P', 1)
+        )
+    if algorithm == 'argon2id':
+        return Argon2Engine(
+            config.get('PASSWORD_ARGON2_TIME_COST', 3),
+            config.get('PASSWORD_ARGON2_MEMORY_COST', 65536),
+            config.get('PASSWORD_ARGON2_PARALLELISM', 4)
+        )
+    raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+
+
+_engines = {}
+
+
+def get_engine():
+    """The configured engine of the current app (built once per app)."""
+    app = current_app._get_current_object()
+    engine = _engines.get(app)
+    if engine is None:
+        engine = _engines[app] = build_engine(app.config)
+    return engine
+
+
+def _verify(password_hash, password):
+    if password_hash.startswith('$argon2'):
+        try:
+            from argon2 import PasswordHasher
+            from argon2.exceptions import InvalidHashError, VerificationError
+        except ImportError:
+            raise RuntimeError("Verifying Argon2 hashes requires the argon2-cffi package")
+        try:
+            return PasswordHasher().verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+
+class HashingBusy(Exception):
+    """The hashing pool is saturated; retry after `retry_after` seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+
+def _get_executor(config):
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config.get('PASSWORD_HASH_WORKERS', 4),
+                thread_name_prefix='password-hash'
+            )
+    return _executor
+
+
+def _run(fn, *args):
+    """Runs `fn(*args)` on the hashing pool, or raises HashingBusy."""
+    global _pending
+    config = current_app.config
+    workers = config.get('PASSWORD_HASH_WORKERS', 4)
+    queue_timeout = config.get('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0)
+    retry_after = config.get('PASSWORD_HASH_RETRY_AFTER', 5)
+
+    with _lock:
+        if _pending >= workers + config.get('PASSWORD_HASH_MAX_QUEUE', 16):
+            raise HashingBusy(retry_after)
+        _pending += 1
+
+    enqueued = time.monotonic()
+
+    def task():
+        # Work that queued past its budget is dropped; the caller has already given up.
+        if time.monotonic() - enqueued > queue_timeout:
+            raise HashingBusy(retry_after)
+        return fn(*args)
+
+    def release(_):
+        global _pending
+        with _lock:
+            _pending -= 1
+
+    future = _get_executor(config).submit(task)
+    future.add_done_callback(release)
+    try:
+        return future.result(timeout=queue_timeout + config.get('PASSWORD_HASH_TIMEOUT', 5.0))
+    except TimeoutError:
+        current_app.logger.warning("Password hashing timed out")
+        raise HashingBusy(retry_after)
+
+
+def hash_password(password):
+    return _run(get_engine().hash, password)
+
+
+def verify_password(password_hash, password):
+    return _run(_verify, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if `password_hash` is not in the configured algorithm/cost (no hashing involved)."""
+    try:
+        return get_engine().needs_rehash(password_hash)
+    except Exception:
+        return True
+
+
+def _measure(engine, rounds=3):
+    """Median seconds per hash of `engine`."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        engine.hash('calibration-password')
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2]
+
+
+def calibrate(algorithm, target_ms, config):
+    """Cheapest cost settings of `algorithm` whose hash takes at least `target_ms`."""
+    target = target_ms / 1000
+    if algorithm == 'pbkdf2':
+        iterations = 10000
+        elapsed = _measure(Pbkdf2Engine(iterations))
+        # PBKDF2 time is linear in the iteration count.
+        iterations = max(int(iterations * target / elapsed), 1000)
+        return {'PASSWORD_PBKDF2_ITERATIONS': iterations}, _measure(Pbkdf2Engine(iterations))
+    if algorithm == 'scrypt':
+        r, p = config.get('PASSWORD_SCRYPT_R', 8), config.get('PASSWORD_SCRYPT_P', 1)
+        n = 1024
+        elapsed = _measure(ScryptEngine(n, r, p))
+        # N must be a power of two; memory use is 128 * N * r bytes.
+        while elapsed < target and n < 2 ** 20:
+            n *= 2
+            elapsed = _measure(ScryptEngine(n, r, p))
+        return {'PASSWORD_SCRYPT_N': n, 'PASSWORD_SCRYPT_R': r, 'PASSWORD_SCRYPT_P': p}, elapsed
+    if algorithm == 'argon2id':
+        memory_cost = config.get('PASSWORD_ARGON2_MEMORY_COST', 65536)
+        parallelism = config.get('PASSWORD_ARGON2_PARALLELISM', 4)
+        time_cost = 1
+        elapsed = _measure(Argon2Engine(time_cost, memory_cost, parallelism))
+        while elapsed < target and time_cost < 50:
+            time_cost += 1
+            elapsed = _measure(Argon2Engine(time_cost, memory_cost, parallelism))
+        return {
+            'PASSWORD_ARGON2_TIME_COST': time_cost,
+            'PASSWORD_ARGON2_MEMORY_COST': memory_cost,
+            'PASSWORD_ARGON2_PARALLELISM': parallelism
+        }, elapsed
+    raise ValueError(f"Unsupported password hash algorithm: {algorithm}")
+
+
+@click.command('calibrate-password-hash')
+@click.option('--algorithm', type=click.Choice(['pbkdf2', 'scrypt', 'argon2id']), default=None,
+              help='Defaults to PASSWORD_HASH_ALGORITHM.')
+@click.option('--target-ms', default=50, show_default=True, help='Target time per hash on this host.')
+def calibrate_password_hash_command(algorithm, target_ms):
+    """Pick password hash cost parameters for a target latency."""
+    algorithm = algorithm or current_app.config.get('PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    settings, elapsed = calibrate(algorithm, target_ms, current_app.config)
+    click.echo(f"{algorithm}: {elapsed * 1000:.1f} ms per hash")
+    click.echo(f"PASSWORD_HASH_ALGORITHM={algorithm}")
+    for key, value in settings.items():
+        click.echo(f"{key}={value}")
@@ -0,0 +1,79 @@
+# app/profile_cache.py
+"""Short-lived cache of decrypted user profiles.
+
+`get_profile()` serves both /api/admin/profile and the login response. The
+profile (name, email, phone, role, MFA flag and, for admins, the admin
+record) is serialized to JSON, encrypted as a whole and kept under
+`profile:<user id>` for PROFILE_CACHE_TTL seconds, so a repeat hit costs
+one Redis read and one decryption instead of two queries and a decryption
+per field. Writers that change any of these fields (select_role,
+enable/disable MFA) call `invalidate_profile()` after commit.
+"""
+import json
+
+from flask import current_app
+from sqlalchemy.orm import undefer_group
+
+from app import db
+from app.models import MEDIA_GROUP, Admin, User
+from app.security import decrypt_data, encrypt_data, redis_client
+
+
+def _cache_key(user_id):
+    return f"profile:{user_id}"
+
+
+def _load_profile(user_id, user=None):
+    user = user or db.session.get(User, user_id)
+    if user is None:
+        return None
+    profile = {
+        'id': user.id,
+        'name': user.name,
+        'email': user.email,
+        'phone': user.telephone,
+        'role': user.role,
+        'mfa_enabled': bool(user.mfa_enabled),
+        'admin': None
+    }
+    if user.role == 'admin':
+        admin = db.session.get(Admin, user.id, options=[undefer_group(MEDIA_GROUP)])
+        if admin:
+            profile['admin'] = {
+                'profile_image': admin.profile_image,
+                'security_level': admin.security_level,
+                'audit_access': admin.audit_access
+            }
+    return profile
+
+
+def get_profile(user_id, user=None):
+    """Returns the profile dict of `user_id`, or None if there is no such user.
+
+    Pass an already loaded `user` to avoid the query on a cache miss.
+    """
+    key = _cache_key(user_id)
+    try:
+        cached = redis_client.get(key)
+        if cached:
+            return json.loads(decrypt_data(cached))
+    except Exception as e:
+        current_app.logger.error(f"Profile cache read failed: {str(e)}")
+
+    profile = _load_profile(user_id, user)
+    if profile is not None:
+        try:
+            redis_client.setex(key, current_app.config.get('PROFILE_CACHE_TTL', 300), encrypt_data(json.dumps(profile)))
+        except Exception as e:
+            current_app.logger.error(f"Profile cache write failed: {str(e)}")
+    return profile
+
+
+def invalidate_profile(*user_ids):
+    """Drops the cached profiles of `user_ids`; call after the change is committed."""
+    if not user_ids:
+        return
+    try:
+        redis_client.delete(*[_cache_key(user_id) for user_id in user_ids])
+    except Exception as e:
+        current_app.logger.error(f"Profile cache invalidation failed: {str(e)}")
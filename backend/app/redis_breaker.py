@@ -0,0 +1,130 @@
+# app/redis_breaker.py
+"""Circuit breaker around the app's Redis clients.
+
+Every command and pipeline sent through a `BreakerRedis` passes through
+one breaker per Redis server. After REDIS_BREAKER_FAILURES consecutive
+connection errors or timeouts the breaker opens: calls raise `CircuitOpen`
+at once instead of waiting for the socket. After REDIS_BREAKER_RESET_TIMEOUT
+seconds it lets a single probe call through (half-open); success closes it
+again, failure reopens it. Commands time out after REDIS_SOCKET_TIMEOUT, so
+a slow Redis trips the breaker just like an unreachable one.
+
+`CircuitOpen` is a redis ConnectionError, so existing error handling keeps
+working. Callers that can do better pick a degraded mode through their
+REDIS_DEGRADED_* setting (token revocation, CSRF, login back-off).
+"""
+from threading import Lock
+import time
+
+import redis
+from redis.client import Pipeline, PubSub
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+_breakers = {}
+_lock = Lock()
+
+
+class CircuitOpen(redis.exceptions.ConnectionError):
+    """Redis is considered unavailable; the call was not attempted."""
+
+
+class CircuitBreaker:
+
+    def __init__(self, failure_threshold=5, reset_timeout=10):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._probing = False
+        self._lock = Lock()
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpen("Redis circuit breaker is open")
+
+    def _record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+    def call(self, fn, *args, **kwargs):
+        self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError):
+            self._record_failure()
+            raise
+        except Exception:
+            # Redis answered (e.g. a ResponseError): it is reachable.
+            self._record_success()
+            raise
+        self._record_success()
+        return result
+
+
+def get_breaker(config, host, port):
+    """The shared breaker for the Redis server at host:port."""
+    with _lock:
+        breaker = _breakers.get((host, port))
+        if breaker is None:
+            breaker = _breakers[(host, port)] = CircuitBreaker(
+                failure_threshold=config.get('REDIS_BREAKER_FAILURES', 5),
+                reset_timeout=config.get('REDIS_BREAKER_RESET_TIMEOUT', 10)
+            )
+    return breaker
+
+
+class BreakerPipeline(Pipeline):
+
+    def __init__(self, breaker, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker
+
+    def execute(self, raise_on_error=True):
+        return self.breaker.call(super().execute, raise_on_error)
+
+
+class BreakerRedis(redis.StrictRedis):
+
+    def __init__(self, *args, breaker=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.breaker = breaker or CircuitBreaker()
+        self._subscriber_pool = None
+
+    def execute_command(self, *args, **options):
+        return self.breaker.call(super().execute_command, *args, **options)
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return BreakerPipeline(self.breaker, self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+    def pubsub(self, **kwargs):
+        # Subscribers block on reads by design: they get a pool without the
+        # command timeout, and their listener threads handle reconnects.
+        if self._subscriber_pool is None:
+            pool = self.connection_pool
+            self._subscriber_pool = pool.__class__(
+                connection_class=pool.connection_class,
+                **dict(pool.connection_kwargs, socket_timeout=None)
+            )
+        return PubSub(self._subscriber_pool, **kwargs)
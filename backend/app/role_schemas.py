@@ -0,0 +1,253 @@
+# app/role_schemas.py
+"""Per-role registration schemas and role record construction.
+
+Shared by select_role and the bulk onboarding import so both accept and
+store exactly the same fields.
+"""
+from datetime import datetime
+import re
+
+from app.models import Admin, Doctor, Hospital, HospitalAdmin, Patient, Pharmacist, Pharmacy, PharmacyAdmin
+from app.security import encrypt_data
+
+# Define valid medical specialties
+MEDICAL_SPECIALTIES = {'Cardiology', 'Neurology', 'Orthopedics', 'Pediatrics', 'Dermatology'}
+
+MEDICAL_DEGREES = {'MD', 'DO', 'MBBS', 'BDS', 'DVM'}
+
+HOSPITAL_DEPARTMENTS = {'emergency', 'cardiology', 'neurology', 'oncology', 'pediatrics', 'radiology'}
+
+HOSPITAL_TYPES = {'general', 'specialty', 'clinic'}
+
+PHARMACY_DEGREES = {'PharmD', 'BPharm', 'MPharm', 'DPharm'}
+
+ADMIN_SECURITY_LEVELS = {'standard', 'elevated', 'super'}
+
+# Same formats register() accepts
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+PHONE_PATTERN = re.compile(r'^\+?[1-9]\d{4,14}$')
+
+ROLE_SCHEMAS = {
+    'patient': {
+        'required': {'birthyear', 'id_proof', 'insurance'},
+        'optional': {'profile_image', 'medical_history', 'blood_type'},
+        'validation': {
+            'birthyear': lambda x: isinstance(x, int) and 1900 <= x <= datetime.now().year,
+            'id_proof': lambda x: isinstance(x, str) and len(x) > 10,  
+            'insurance': lambda x: isinstance(x, str) and len(x) > 5
+        }
+    },
+    'doctor': {
+        'required': {'license_number', 'specialty', 'hospital_id', 'degree'},
+        'optional': {'profile_image', 'available_hours', 'languages'},
+        'validation': {
+            'license_number': lambda x: isinstance(x, str) and len(x) in (8, 12),
+            'specialty': lambda x: x in MEDICAL_SPECIALTIES,  
+            'degree': lambda x: x in MEDICAL_DEGREES  
+        }
+    },
+    'hospitalAdmin': {
+        'required': {'hospital_id', 'admin_id', 'department', 'qualifications'},
+        'optional': {'profile_image', 'access_level', 'employment_verification'},
+        'validation': {
+            'hospital_name': lambda x: isinstance(x, str) and 2 <= len(x) <= 100,
+            'admin_id': lambda x: isinstance(x, str) and len(x) == 8,
+            'qualifications': lambda x: isinstance(x, list) and all(isinstance(q, str) for q in x)
+        }
+    },
+    'hospital': {
+        'required': {'license_number', 'address', 'established', 'type','logo', 'beds', 'operating_hours', 'emergency_services',
+            'accreditation', },
+        'optional': {
+            'medical_staff', 'website'
+        },
+        'validation': {
+            #'license_number': lambda x: isinstance(x, str) and x.startswith('HOSP-'),
+            'address': lambda x: isinstance(x, str) and len(x) > 10,
+            'established': lambda x: isinstance(x, str) and re.match(r'^\d{4}-\d{2}-\d{2}$', x),  # Format: YYYY-MM-DD
+            'type': lambda x: x in HOSPITAL_TYPES  # e.g., ['general', 'specialty', 'clinic']
+        }
+    },
+    'pharmacy': {
+        'required': {'license_number', 'address', 'established'},
+        'optional': {
+            'logo', 'operating_hours', 'inventory_size',
+            'accreditation', 'prescriptions_filled', 'pharmacists_count'
+        },
+        'validation': {
+            'license_number': lambda x: isinstance(x, str) and x.startswith('PHARM-'),
+            'address': lambda x: isinstance(x, str) and len(x) > 10,
+            'established':  lambda x: isinstance(x, str) and re.match(r'^\d{4}-\d{2}-\d{2}$', x),
+        }
+    },
+    'pharmacyAdmin': {
+        'required': {'pharmacy_id', 'admin_id'},
+        'optional': {'profile_image', 'access_level', 'pharmacist_cert'},
+        'validation': {
+            'pharmacy_name': lambda x: isinstance(x, str) and 2 <= len(x) <= 100,
+            'admin_id': lambda x: isinstance(x, str) and len(x) == 8,
+            'pharmacy_branch': lambda x: isinstance(x, str) and len(x) <= 50,
+            'pharmacy_license': lambda x: isinstance(x, str) and x.startswith('PHARM-')
+        }
+    },
+    'pharmacist': {
+        'required': {'license_number', 'pharmacy_id'},
+        'optional': {'specialization', 'years_experience'},
+        'validation': {
+            'license_number': lambda x: isinstance(x, str) and len(x) in (10, 12),
+            'degree': lambda x: x in PHARMACY_DEGREES  
+        }
+    },
+    'admin': {
+        'required': {'security_level'},
+        'optional': {'profile_image', 'audit_access'},
+        'validation': {
+            'security_level': lambda x: x in ADMIN_SECURITY_LEVELS  
+        }
+    }
+}
+
+
+def validate_role_fields(role, data):
+    """Checks `data` against the role's schema; returns an error message or None."""
+    schema = ROLE_SCHEMAS[role]
+    missing_fields = [field for field in schema['required'] if field not in data]
+    if missing_fields:
+        return f"Missing required fields: {', '.join(missing_fields)}"
+
+    for field, validator in schema.get('validation', {}).items():
+        if field in data:
+            try:
+                if not validator(data[field]):
+                    return f"Invalid value for {field}"
+            except Exception:
+                return f"Validation error for {field}"
+    return None
+
+
+def build_role_entity(role, user_id, data, submitted_at):
+    """Unsaved role record for `role` (select_role naming) built from `data`.
+
+    Fields go through the plaintext attributes, so they are sealed or
+    encrypted at flush like any other write.
+    """
+    if role == 'patient':
+        return Patient(
+            user_id=user_id,
+            birthyear=str(data.get('birthyear', '')),
+            profile_image=str(data.get('profile_image', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            patient_id=str(data.get('patient_id', '')),
+            id_proof=str(data.get('id_proof', '')),
+            insurance=str(data.get('insurance', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', ''))
+        )
+    if role == 'doctor':
+        return Doctor(
+            user_id=user_id,
+            specialty=str(data.get('specialty', '')),
+            profile_image=str(data.get('profile_image', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            license_number=str(data.get('license_number', '')),
+            license_document=str(data.get('license_document', '')),
+            degree=str(data.get('degree', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', '')),
+            hospital_id=data.get('hospital_id')
+        )
+    if role == 'hospitalAdmin':
+        return HospitalAdmin(
+            user_id=user_id,
+            profile_image=str(data.get('profile_image', '')),
+            hospital_id_encrypted=encrypt_data(str(data.get('hospital_id', ''))),
+            admin_id=str(data.get('admin_id', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            qualifications=str(data.get('qualifications', '')),
+            department=str(data.get('department', '')),
+            access_level=str(data.get('access_level', 'basic')),
+            last_active=str(submitted_at),
+            license_document=str(data.get('license_document', '')),
+            employment_verification=str(data.get('employment_verification', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', '')),
+            hospital_id=data.get('hospital_id')
+        )
+    if role == 'hospital':
+        return Hospital(
+            user_id=user_id,
+            logo=str(data.get('logo', '')),
+            type=str(data.get('type', '')),
+            beds=str(data.get('beds', '')),
+            established_year=str(data.get('established', '')),
+            address=str(data.get('address', '')),
+            license_number=str(data.get('license_number', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            license_document=str(data.get('license', '')),
+            accreditation_document=str(data.get('accreditation', '')),
+            operating_hours=str(data.get('operating_hours', '')),
+            emergency_services=str(data.get('emergency_services', '')),
+            medical_staff=str(data.get('medical_staff', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', ''))
+        )
+    if role == 'pharmacy':
+        return Pharmacy(
+            user_id=user_id,
+            logo=str(data.get('logo', '')),
+            address=str(data.get('address', '')),
+            type=str(data.get('type', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            license_number=str(data.get('license_number', '')),
+            established_year=str(data.get('established', '')),
+            prescriptions_filled=str(data.get('prescriptions_filled', '0')),
+            operating_hours=str(data.get('operating_hours', '')),
+            inventory_size=str(data.get('inventory_size', '')),
+            license_document=str(data.get('license', '')),
+            accreditation_document=str(data.get('accreditation', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', ''))
+        )
+    if role == 'pharmacyAdmin':
+        return PharmacyAdmin(
+            user_id=user_id,
+            profile_image=str(data.get('profile_image', '')),
+            admin_id=str(data.get('admin_id', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            access_level=str(data.get('access_level', 'basic')),
+            last_active=str(submitted_at),
+            pharmacist_cert=str(data.get('pharmacist_cert', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', '')),
+            pharmacy_id=data.get('pharmacy_id')
+        )
+    if role == 'pharmacist':
+        return Pharmacist(
+            user_id=user_id,
+            license_number=str(data.get('license_number', '')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            profile_image=str(data.get('profile_image', '')),
+            pharmacist_cert=str(data.get('pharmacist_cert', '')),
+            status=str(data.get('status', '')),
+            description=str(data.get('description', '')),
+            pharmacy_id=data.get('pharmacy_id')
+        )
+    if role == 'admin':
+        return Admin(
+            user_id=user_id,
+            profile_image=str(data.get('profile_image', '')),
+            security_level=str(data.get('security_level', 'standard')),
+            audit_access=str(data.get('audit_access', 'False')),
+            submission_date=str(submitted_at),
+            submitted_at=submitted_at,
+            status=str(data.get('status', '')),
+            description=str(data.get('description', ''))
+        )
+    raise ValueError(f"Unknown role: {role}")
@@ -1,35 +1,90 @@
-from datetime import time
+from datetime import datetime, time, timedelta, timezone
 import hmac
 import hashlib
-from cryptography.fernet import Fernet
+import base64
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from flask import current_app, jsonify, request
 import redis
 from itsdangerous import BadSignature, URLSafeSerializer
 from werkzeug.security import check_password_hash
 from functools import wraps
-from flask_jwt_extended import verify_jwt_in_request, get_jwt, JWTManager
+from flask_jwt_extended import verify_jwt_in_request, get_jwt
 from urllib.parse import urlparse
 import os
 import socket
+from threading import Lock
+from time import monotonic
 
+from app import db, jwt
+from app.config import Config
 from app.models import TokenBlacklist
-
-jwt = JWTManager()
+from app.near_cache import create_redis_client
+from app.redis_breaker import CircuitOpen
 
 class SSRFError(Exception):
     """Custom exception for Server-Side Request Forgery (SSRF) errors."""
     pass
 
-fernet_key = os.environ.get('FERNET_KEY')
-hmac_key = os.environ.get('HMAC_KEY')
+# FERNET_KEYS / HMAC_KEYS hold comma-separated key lists for rotation: the
+# first key is used for new values, the rest are only used to read old ones.
+fernet_keys = [k.strip() for k in os.environ.get('FERNET_KEYS', os.environ.get('FERNET_KEY', '')).split(',') if k.strip()]
+hmac_keys = [k.strip().encode() for k in os.environ.get('HMAC_KEYS', os.environ.get('HMAC_KEY', '')).split(',') if k.strip()]
 
-if not fernet_key or not hmac_key:
+if not fernet_keys or not hmac_keys:
     raise RuntimeError("Critical environment variables are missing. Please check the configuration.")
 
-fernet = Fernet(fernet_key)
-hmac_key = hmac_key.encode()
+fernet_key = fernet_keys[0]
+primary_fernet = Fernet(fernet_key)
+fernet = MultiFernet([primary_fernet] + [Fernet(k) for k in fernet_keys[1:]])
+hmac_key = hmac_keys[0]
+
+# Ciphertext format v2: version byte | key id byte | 12-byte nonce | AES-GCM
+# ciphertext and tag. Stored raw in LargeBinary columns. v1 is plain Fernet.
+CIPHERTEXT_V2 = 0x02
+AEAD_NONCE_SIZE = 12
+
+def _load_aead_keys():
+    """AEAD_KEYS format: "1:<base64 32-byte key>,2:<base64 32-byte key>".
+
+    Without AEAD_KEYS, one key is derived from each Fernet key so v2 works on
+    existing deployments; its id is taken from the Fernet key's digest so it
+    stays stable when FERNET_KEYS is rotated. A one-byte digest id is shared
+    by two keys about once in 256 pairs, so each id maps to a list of keys,
+    tried in order (AES-GCM rejects the wrong one). Returns (keys, active key
+    id); the active key is first in its list.
+    """
+    keys = {}
+    for entry in filter(None, os.environ.get('AEAD_KEYS', '').split(',')):
+        key_id, _, encoded = entry.strip().partition(':')
+        keys[int(key_id)] = [AESGCM(base64.urlsafe_b64decode(encoded))]
+    if keys:
+        return keys, int(os.environ.get('AEAD_ACTIVE_KEY_ID', max(keys)))
+
+    active_key_id = None
+    for key in fernet_keys:
+        key_id = hashlib.sha256(key.encode()).digest()[0]
+        derived = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b'medchain-ciphertext-v2'
+        ).derive(base64.urlsafe_b64decode(key))
+        keys.setdefault(key_id, []).append(AESGCM(derived))
+        if active_key_id is None:
+            active_key_id = key_id
+    return keys, active_key_id
 
-redis_client = redis.StrictRedis(
+aead_keys, aead_active_key_id = _load_aead_keys()
+
+if aead_active_key_id not in aead_keys or not 0 <= aead_active_key_id <= 255:
+    raise RuntimeError("AEAD_ACTIVE_KEY_ID does not match a configured AEAD key.")
+
+redis_client = create_redis_client(
+    vars(Config),
     host=os.environ.get('REDIS_HOST', 'localhost'),
     port=int(os.environ.get('REDIS_PORT', 6379)),
     db=int(os.environ.get('REDIS_DB', 0)),
@@ -47,11 +102,54 @@ def encrypt_data(data):
         current_app.logger.error("Encryption failed.")
         raise RuntimeError("Encryption failed.")
 
+def encrypt_data_v2(data):
+    if not isinstance(data, str):
+        raise ValueError("Data to encrypt must be a string.")
+    try:
+        header = bytes((CIPHERTEXT_V2, aead_active_key_id))
+        nonce = os.urandom(AEAD_NONCE_SIZE)
+        ciphertext = aead_keys[aead_active_key_id][0].encrypt(nonce, data.encode(), header)
+        return header + nonce + ciphertext
+    except Exception:
+        current_app.logger.error("Encryption failed.")
+        raise RuntimeError("Encryption failed.")
+
+def is_ciphertext_v2(encrypted_data):
+    return isinstance(encrypted_data, (bytes, bytearray, memoryview)) and \
+        len(encrypted_data) > 2 and encrypted_data[0] == CIPHERTEXT_V2
+
+def _decrypt_v2(encrypted_data, keys=None):
+    encrypted_data = bytes(encrypted_data)
+    header = encrypted_data[:2]
+    nonce = encrypted_data[2:2 + AEAD_NONCE_SIZE]
+    for key in keys or aead_keys[header[1]]:
+        try:
+            return key.decrypt(nonce, encrypted_data[2 + AEAD_NONCE_SIZE:], header)
+        except InvalidTag:
+            continue
+    raise InvalidTag()
+
+def is_current_ciphertext_v2(encrypted_data):
+    """True if `encrypted_data` is v2 under the active AEAD key."""
+    if not is_ciphertext_v2(encrypted_data) or encrypted_data[1] != aead_active_key_id:
+        return False
+    if len(aead_keys[aead_active_key_id]) == 1:
+        return True
+    try:
+        _decrypt_v2(encrypted_data, keys=aead_keys[aead_active_key_id][:1])
+        return True
+    except InvalidTag:
+        return False
+
 def decrypt_data(encrypted_data):
+    """Decrypts both v1 (Fernet) and v2 (AES-GCM) ciphertexts."""
     if not encrypted_data:
         return None
     try:
-        decrypted = fernet.decrypt(encrypted_data).decode()
+        if is_ciphertext_v2(encrypted_data):
+            decrypted = _decrypt_v2(encrypted_data).decode()
+        else:
+            decrypted = fernet.decrypt(bytes(encrypted_data) if isinstance(encrypted_data, memoryview) else encrypted_data).decode()
         current_app.logger.info("Data decrypted successfully.")
         return decrypted
     except Exception as e:
@@ -61,6 +159,25 @@ def decrypt_data(encrypted_data):
 def generate_email_hash(email):
     return hmac.new(hmac_key, email.encode(), hashlib.sha256).hexdigest()
 
+def email_hash_candidates(email):
+    """Hashes of `email` under every configured HMAC key, primary first.
+
+    Lookups must match any of them while a key rotation is in progress.
+    """
+    return [hmac.new(key, email.encode(), hashlib.sha256).hexdigest() for key in hmac_keys]
+
+def is_current_fernet_token(token):
+    """True if `token` is already encrypted with the primary Fernet key."""
+    try:
+        primary_fernet.decrypt(token)
+        return True
+    except InvalidToken:
+        return False
+
+def rotate_fernet_token(token):
+    """Re-encrypts a v1 token with the primary Fernet key."""
+    return fernet.rotate(token.encode() if isinstance(token, str) else bytes(token)).decode()
+
 def hash_data(data):
     return hashlib.pbkdf2_hmac('sha256', data.encode(), current_app.config['SECRET_KEY'].encode(), 100000).hex()
 
@@ -87,7 +204,15 @@ def validate_csrf_token(signed_token, max_age=1800):
             return False, "CSRF token expired"
         
         redis_key = f"csrf:{token_data['token']}"
-        if not redis_client.delete(redis_key):
+        try:
+            deleted = redis_client.delete(redis_key)
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError):
+            # Single use cannot be enforced without Redis.
+            if current_app.config.get('REDIS_DEGRADED_CSRF', 'deny') != 'signature':
+                return False, "CSRF validation unavailable"
+            current_app.logger.warning("CSRF token accepted on signature only: Redis unavailable.")
+            return True, token_data['token']
+        if not deleted:
             return False, "CSRF token already used or invalid"
         
         return True, token_data['token']
@@ -123,11 +248,55 @@ def validate_url(url):
     
     return True
 
+_revocation_snapshot = {'jtis': frozenset(), 'loaded_at': None}
+_revocation_lock = Lock()
+
+def _revoked_in_snapshot(jti):
+    """Checks `jti` against a per-process copy of TokenBlacklist, reloaded
+    every REVOCATION_SNAPSHOT_TTL seconds; used while Redis is unavailable."""
+    with _revocation_lock:
+        loaded_at = _revocation_snapshot['loaded_at']
+        if loaded_at is None or monotonic() - loaded_at > current_app.config.get('REVOCATION_SNAPSHOT_TTL', 60):
+            query = db.session.query(TokenBlacklist.jti)
+            max_lifetime = current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', timedelta(days=30))
+            if isinstance(max_lifetime, timedelta):
+                # Older entries belong to tokens that have expired anyway.
+                query = query.filter(TokenBlacklist.created_at >= datetime.utcnow() - max_lifetime)
+            _revocation_snapshot['jtis'] = frozenset(row.jti for row in query)
+            _revocation_snapshot['loaded_at'] = monotonic()
+        return jti in _revocation_snapshot['jtis']
+
+def revoke_token(jwt_payload):
+    """Marks the token revoked in Redis until it expires. Call after its
+    TokenBlacklist row is committed; that row backs the degraded modes."""
+    jti = jwt_payload["jti"]
+    ttl = None
+    if jwt_payload.get("exp"):
+        ttl = int(jwt_payload["exp"] - datetime.now(timezone.utc).timestamp()) + 1
+        if ttl <= 0:
+            return
+    try:
+        redis_client.set(f"revoked_token:{jti}", 1, ex=ttl)
+    except Exception as e:
+        current_app.logger.error(f"Failed to cache token revocation: {str(e)}")
+
 @jwt.token_in_blocklist_loader
 def check_if_token_revoked(jwt_header, jwt_payload):
     jti = jwt_payload["jti"]
     try:
         return bool(redis_client.get(f"revoked_token:{jti}"))
+    except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError) as e:
+        if not isinstance(e, CircuitOpen):
+            current_app.logger.error("Failed to check token revocation.")
+        policy = current_app.config.get('REDIS_DEGRADED_REVOCATION', 'snapshot')
+        if policy == 'allow':
+            return False
+        if policy == 'snapshot':
+            try:
+                return _revoked_in_snapshot(jti)
+            except Exception:
+                current_app.logger.error("Revocation snapshot unavailable.")
+        return True
     except Exception as e:
         current_app.logger.error("Failed to check token revocation.")
         return True
@@ -0,0 +1,173 @@
+# app/serializers.py
+"""Declarative response plans for the admin verification queues.
+
+A plan mirrors the response shape: strings name an attribute of the role
+row, `user.<attr>` an attribute of the User, and dicts/lists nest. Plans are
+compiled once at import into per-field getters and the columns each field
+needs, so a request with `?fields=id,name,license_number` only loads
+(`load_only`) and decrypts those columns.
+"""
+from sqlalchemy.orm import load_only
+
+from app.models import Admin, Doctor, Hospital, HospitalAdmin, Patient, Pharmacist, Pharmacy, PharmacyAdmin, User
+
+USER_PREFIX = 'user.'
+# Columns needed to open an envelope row's sealed blob.
+ENVELOPE_COLUMNS = ('data_key_id', 'data_key_wrapped', 'sealed_fields')
+
+
+class InvalidFields(ValueError):
+    def __init__(self, unknown, allowed):
+        super().__init__(f"Unknown fields: {', '.join(unknown)}")
+        self.unknown = unknown
+        self.allowed = allowed
+
+
+def _column_keys(model, attr):
+    """Columns that back `attr` on `model` (plaintext attributes map to their ciphertext)."""
+    for column_name, attribute in getattr(model, '__encrypted_attributes__', {}).items():
+        if attribute.name == attr and getattr(model, attr) is attribute:
+            if column_name in getattr(model, '__envelope_fields__', ()):
+                # Unsealed legacy rows still read the column itself.
+                return (column_name,) + ENVELOPE_COLUMNS
+            return (column_name,)
+    if attr not in model.__table__.columns:
+        raise AttributeError(f"{model.__name__} has no column for {attr!r}")
+    return (attr,)
+
+
+class FieldPlan:
+    def __init__(self, model, spec):
+        self.model = model
+        self.fields = tuple(spec)
+        self._getters = {}
+        self._user_columns = {}
+        self._entity_columns = {}
+        for name, source in spec.items():
+            user_columns, entity_columns = set(), set()
+            self._getters[name] = self._compile(source, user_columns, entity_columns)
+            self._user_columns[name] = frozenset(user_columns)
+            self._entity_columns[name] = frozenset(entity_columns)
+
+    def _compile(self, source, user_columns, entity_columns):
+        if isinstance(source, dict):
+            getters = {key: self._compile(value, user_columns, entity_columns) for key, value in source.items()}
+            return lambda user, entity: {key: get(user, entity) for key, get in getters.items()}
+        if isinstance(source, list):
+            getters = [self._compile(value, user_columns, entity_columns) for value in source]
+            return lambda user, entity: [get(user, entity) for get in getters]
+        if source.startswith(USER_PREFIX):
+            attr = source[len(USER_PREFIX):]
+            user_columns.update(_column_keys(User, attr))
+            return lambda user, entity: getattr(user, attr)
+        entity_columns.update(_column_keys(self.model, source))
+        return lambda user, entity: getattr(entity, source)
+
+    def select(self, requested):
+        """Fields named in a `?fields=` value (all fields if empty), in plan order."""
+        if not requested:
+            return self.fields
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = sorted(names.difference(self.fields))
+        if unknown:
+            raise InvalidFields(unknown, self.fields)
+        return tuple(name for name in self.fields if name in names)
+
+    def user_options(self, fields):
+        columns = set().union(*(self._user_columns[name] for name in fields))
+        return load_only(*(getattr(User, key) for key in sorted(columns | {'id'})))
+
+    def entity_options(self, fields):
+        columns = set().union(*(self._entity_columns[name] for name in fields))
+        return load_only(*(getattr(self.model, key) for key in sorted(columns | {'user_id'})))
+
+    def serialize(self, fields, user, entity):
+        return {name: self._getters[name](user, entity) for name in fields}
+
+
+USER_FIELDS = {
+    'id': 'user.id',
+    'name': 'user.name',
+    'phone': 'user.telephone',
+    'email': 'user.email',
+    'role': 'user.role'
+}
+
+QUEUE_PLANS = {
+    'hospital': FieldPlan(Hospital, {
+        **USER_FIELDS,
+        'established': 'established_year',
+        'address': 'address',
+        'type': 'type',
+        'beds': 'beds',
+        'license_number': 'license_number',
+        'submission_date': 'submission_date',
+        'operating_hours': 'operating_hours',
+        'logo': 'logo',
+        'medical_staff': 'medical_staff',
+        'emergency_services': 'emergency_services',
+        'documents': [{'license': 'license_document', 'accreditation': 'accreditation_document'}]
+    }),
+    'admin': FieldPlan(Admin, {
+        **USER_FIELDS,
+        'submission_date': 'submission_date',
+        'profile_image': 'profile_image',
+        'security_level': 'security_level'
+    }),
+    'hospital_admin': FieldPlan(HospitalAdmin, {
+        **USER_FIELDS,
+        'submission_date': 'submission_date',
+        'profile_image': 'profile_image',
+        'employment_verification': 'employment_verification',
+        'hospital_id': 'hospital_id',
+        'admin_id': 'admin_id',
+        'documents': [{'license': 'license_document'}]
+    }),
+    'pharmacy': FieldPlan(Pharmacy, {
+        **USER_FIELDS,
+        'type': 'type',
+        'established': 'established_year',
+        'address': 'address',
+        'license_number': 'license_number',
+        'submission_date': 'submission_date',
+        'operating_hours': 'operating_hours',
+        'logo': 'logo',
+        'documents': [{'license': 'license_document', 'accreditation': 'accreditation_document'}]
+    }),
+    'pharmacy_admin': FieldPlan(PharmacyAdmin, {
+        **USER_FIELDS,
+        'access_level': 'access_level',
+        'submission_date': 'submission_date',
+        'profile_image': 'profile_image',
+        'pharmacy_id': 'pharmacy_id',
+        'admin_id': 'admin_id',
+        'documents': [{'license': 'pharmacist_cert'}]
+    }),
+    'pharmacist': FieldPlan(Pharmacist, {
+        **USER_FIELDS,
+        'submission_date': 'submission_date',
+        'profile_image': 'profile_image',
+        'license_number_encrypted': 'license_number',
+        'pharmacy_id': 'pharmacy_id',
+        'documents': [{'license': 'pharmacist_cert'}]
+    }),
+    'patient': FieldPlan(Patient, {
+        **USER_FIELDS,
+        'birthyear': 'birthyear',
+        'submission_date': 'submission_date',
+        'patient_id': 'patient_id',
+        'id_proof': 'id_proof',
+        'insurance': 'insurance',
+        'profile_image': 'profile_image'
+    }),
+    'doctor': FieldPlan(Doctor, {
+        **USER_FIELDS,
+        'specialty': 'specialty',
+        'hospital_id': 'hospital_id',
+        'license_number': 'license_number',
+        'submission_date': 'submission_date',
+        'degree': 'degree',
+        'profile_image': 'profile_image',
+        'documents': [{'license': 'license_document'}]
+    })
+}
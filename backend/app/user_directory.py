@@ -0,0 +1,109 @@
+# app/user_directory.py
+"""Keeps the `user_directory` projection in sync with the role tables.
+
+`sync_user_directory()` is called in the same transaction that creates or
+changes a role row, so the projection commits (or rolls back) with it.
+`flask rebuild-user-directory` backfills it from existing rows, and
+`flask backfill-submitted-at` fills the role tables' plaintext
+`submitted_at` columns from their encrypted submission dates.
+"""
+from datetime import datetime
+
+import click
+from flask import current_app
+
+from app import db
+from app.envelope import walk_in_batches
+from app.models import ROLE_ALIASES, ROLE_MODELS, UserDirectory
+
+DEFAULT_BATCH_SIZE = 200
+
+
+def normalize_status(status):
+    return (status or '').lower().strip() or 'pending'
+
+
+def parse_submission_date(value):
+    """submission_date is stored as str(datetime); unparsable values give None."""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def sync_user_directory(role, entity):
+    """Upserts the (user, role) projection row for `entity`. Does not commit."""
+    role = ROLE_ALIASES.get(role, role)
+    row = db.session.get(UserDirectory, (entity.user_id, role))
+    if row is None:
+        row = UserDirectory(user_id=entity.user_id, role=role)
+        db.session.add(row)
+    row.status = normalize_status(entity.status)
+    row.verified = bool(entity.verified)
+    row.submitted_at = entity.submitted_at or parse_submission_date(entity.submission_date)
+    return row
+
+
+def sync_user_directory_many(role, entities):
+    """sync_user_directory() for many rows of one role, with one lookup query."""
+    role = ROLE_ALIASES.get(role, role)
+    entities = list(entities)
+    existing = {
+        row.user_id: row for row in UserDirectory.query.filter(
+            UserDirectory.role == role,
+            UserDirectory.user_id.in_([entity.user_id for entity in entities])
+        )
+    }
+    for entity in entities:
+        row = existing.get(entity.user_id)
+        if row is None:
+            row = UserDirectory(user_id=entity.user_id, role=role)
+            db.session.add(row)
+        row.status = normalize_status(entity.status)
+        row.verified = bool(entity.verified)
+        row.submitted_at = entity.submitted_at or parse_submission_date(entity.submission_date)
+
+
+def backfill_submitted_at(batch_size=DEFAULT_BATCH_SIZE):
+    """Fills role rows' plaintext submitted_at from submission_date_encrypted."""
+    results = {}
+    for role, model in ROLE_MODELS.items():
+        filled = 0
+        for rows in walk_in_batches(model, model.submitted_at.is_(None), batch_size):
+            for entity in rows:
+                entity.submitted_at = parse_submission_date(entity.submission_date)
+                filled += entity.submitted_at is not None
+            db.session.commit()
+        current_app.logger.info(f"submitted_at backfill: {filled} {role} rows filled")
+        results[role] = filled
+    return results
+
+
+def rebuild_user_directory(batch_size=DEFAULT_BATCH_SIZE):
+    results = {}
+    for role, model in ROLE_MODELS.items():
+        synced = 0
+        for rows in walk_in_batches(model, model.user_id.isnot(None), batch_size):
+            for entity in rows:
+                sync_user_directory(role, entity)
+            db.session.commit()
+            synced += len(rows)
+        current_app.logger.info(f"User directory: {synced} {role} rows synced")
+        results[role] = synced
+    return results
+
+
+@click.command('backfill-submitted-at')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+def backfill_submitted_at_command(batch_size):
+    """Decrypt submission dates into the plaintext submitted_at columns."""
+    for role, count in backfill_submitted_at(batch_size=batch_size).items():
+        click.echo(f"{role}: {count} rows filled")
+
+
+@click.command('rebuild-user-directory')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+def rebuild_user_directory_command(batch_size):
+    """Backfill the user_directory projection from the role tables."""
+    for role, count in rebuild_user_directory(batch_size=batch_size).items():
+        click.echo(f"{role}: {count} rows synced")
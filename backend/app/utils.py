@@ -11,14 +11,15 @@ from flask_limiter.util import get_remote_address
 from app import create_app, redis_client
 import hmac
 from flask_mail import Message, Mail
+from markupsafe import escape
 
 def generate_cryptographic_code(length=8):
     """Güvenli rastgele kod üretimi"""
     alphabet = string.digits + string.ascii_uppercase
     return ''.join(secrets.choice(alphabet) for _ in range(length))
 
-def generate_telephone_hash(telephone):
-    pepper_hex = current_app.config['TELEPHONE_PEPPER']
+def generate_telephone_hash(telephone, pepper_hex=None):
+    pepper_hex = pepper_hex or current_app.config['TELEPHONE_PEPPER']
     pepper_bytes = bytes.fromhex(pepper_hex)  # Hex string'i bytes'a çevir
     return hmac.new(
         key=pepper_bytes,
@@ -26,6 +27,11 @@ def generate_telephone_hash(telephone):
         digestmod='sha256'
     ).hexdigest()
 
+def telephone_hash_candidates(telephone):
+    """Güncel ve rotasyon sürecindeki eski pepper'lar ile hesaplanan hash'ler"""
+    peppers = [current_app.config['TELEPHONE_PEPPER']] + current_app.config.get('TELEPHONE_PEPPER_PREVIOUS', [])
+    return [generate_telephone_hash(telephone, pepper) for pepper in peppers]
+
 def validate_password_complexity(password):
     """Şifre karmaşıklık kurallarını kontrol et"""
     if len(password) < 12:
@@ -94,6 +100,42 @@ def send_code_email(email, code):
         raise
 
 
+def send_invitation_emails(recipients):
+    """Toplu içe aktarılan hesaplara davet e-postası gönderir.
+
+    `recipients` (email, name) çiftleridir; hepsi tek SMTP bağlantısı
+    üzerinden gönderilir. Gönderilemeyen adresler döndürülür.
+    """
+    app = current_app._get_current_object()
+    mail_ext = app.extensions.get('mail')
+    if not mail_ext:
+        raise RuntimeError("Mail extension yüklenmemiş!")
+
+    failed = []
+    with mail_ext.connect() as conn:
+        for email, name in recipients:
+            html_content = f"""
+            <html>
+                <body style="font-family: Arial; padding: 20px;">
+                    <h2 style="color: #2c3e50;">MEDCHAIN PRO</h2>
+                    <p>Merhaba {escape(name)}, MedChain Pro hesabınız oluşturuldu.</p>
+                    <p>Giriş yapmadan önce "Şifremi unuttum" adımıyla şifrenizi belirleyin.</p>
+                </body>
+            </html>
+            """
+            try:
+                conn.send(Message(
+                    subject="MedChain Pro Hesap Daveti",
+                    recipients=[email],
+                    html=html_content,
+                    sender=app.config['MAIL_DEFAULT_SENDER']
+                ))
+            except Exception as e:
+                app.logger.error(f"Davet e-postası gönderilemedi: {str(e)}")
+                failed.append(email)
+    return failed
+
+
 def generate_secure_token():
     random_bytes = os.urandom(32)
     return hashlib.sha256(random_bytes).hexdigest()
@@ -136,14 +178,3 @@ def calculate_risk_score(request):
 
     # Example: Add more risk factors as needed
     return risk_score
-
-class AccountLockedException(Exception):
-    """Custom exception for account lockout."""
-    pass
-
-def check_login_attempts(email):
-    key = f"login_attempts:{email}"
-    attempts = redis_client.get(key) or 0
-    if int(attempts) >= 5:
-        raise AccountLockedException("Hesap geçici olarak kilitlendi")
-    return True
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Store document and media columns as binary (ciphertext v2)
+
+Converts the Text document/media columns of the role tables to
+LargeBinary. Legacy Fernet tokens keep their bytes and still decrypt; run
+`flask migrate-ciphertexts` afterwards to rewrite them as v2.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 18:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BINARY_COLUMNS = {
+    'hospitals': ['logo_encrypted', 'license_document_encrypted', 'accreditation_document_encrypted'],
+    'admins': ['profile_image_encrypted'],
+    'hospital_admins': ['profile_image_encrypted', 'license_document_encrypted', 'employment_verification_encrypted'],
+    'pharmacies': ['logo_encrypted', 'license_document_encrypted', 'accreditation_document_encrypted'],
+    'pharmacy_admins': ['profile_image_encrypted', 'pharmacist_cert_encrypted'],
+    'pharmacists': ['profile_image_encrypted', 'pharmacist_cert_encrypted'],
+    'patients': ['profile_image_encrypted', 'id_proof_encrypted', 'insurance_encrypted'],
+    'doctors': ['profile_image_encrypted', 'license_document_encrypted'],
+}
+
+
+def _column_types(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return {}
+    return {column['name']: column['type'] for column in inspector.get_columns(table)}
+
+
+def _convert(to_binary):
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # SQLite stores bytes as BLOBs whatever the declared type.
+        return
+    for table, columns in BINARY_COLUMNS.items():
+        types = _column_types(table)
+        for column in columns:
+            if column not in types or isinstance(types[column], sa.LargeBinary) == to_binary:
+                continue
+            using = None
+            if dialect == 'postgresql':
+                using = f"convert_to({column}, 'UTF8')" if to_binary else f"convert_from({column}, 'UTF8')"
+            op.alter_column(
+                table, column,
+                type_=sa.LargeBinary() if to_binary else sa.Text(),
+                existing_nullable=True,
+                postgresql_using=using
+            )
+
+
+def upgrade():
+    _convert(to_binary=True)
+
+
+def downgrade():
+    # Only valid before `flask migrate-ciphertexts`: v2 values are not UTF-8.
+    _convert(to_binary=False)
@@ -0,0 +1,58 @@
+"""Add envelope encryption columns to the role tables
+
+Adds data_key_id, data_key_wrapped and sealed_fields to every role table.
+Existing rows stay readable from their per-column ciphertexts; run
+`flask seal-rows` afterwards to pack them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 18:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+ROLE_TABLES = [
+    'hospitals', 'admins', 'hospital_admins', 'pharmacies',
+    'pharmacy_admins', 'pharmacists', 'patients', 'doctors'
+]
+
+
+def _columns():
+    return [
+        sa.Column('data_key_id', sa.String(64)),
+        sa.Column('data_key_wrapped', sa.LargeBinary()),
+        sa.Column('sealed_fields', sa.LargeBinary()),
+    ]
+
+
+def _existing_columns(table):
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return None
+    return {column['name'] for column in inspector.get_columns(table)}
+
+
+def upgrade():
+    for table in ROLE_TABLES:
+        existing = _existing_columns(table)
+        if existing is None:
+            continue
+        for column in _columns():
+            if column.name not in existing:
+                op.add_column(table, column)
+
+
+def downgrade():
+    for table in ROLE_TABLES:
+        existing = _existing_columns(table) or set()
+        for column in _columns():
+            if column.name in existing:
+                op.drop_column(table, column.name)
@@ -0,0 +1,51 @@
+"""Add plaintext submitted_at and its queue index to the role tables
+
+Adds submitted_at and an index on (verified, submitted_at) to every role
+table. Run `flask backfill-submitted-at` afterwards to fill it from the
+encrypted submission dates.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 18:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+ROLE_TABLES = [
+    'hospitals', 'admins', 'hospital_admins', 'pharmacies',
+    'pharmacy_admins', 'pharmacists', 'patients', 'doctors'
+]
+
+
+def _index_name(table):
+    return f"ix_{table}_verified_submitted_at"
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in ROLE_TABLES:
+        if not inspector.has_table(table):
+            continue
+        if 'submitted_at' not in {column['name'] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column('submitted_at', sa.DateTime()))
+        if _index_name(table) not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(_index_name(table), table, ['verified', 'submitted_at'])
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    for table in ROLE_TABLES:
+        if not inspector.has_table(table):
+            continue
+        if _index_name(table) in {index['name'] for index in inspector.get_indexes(table)}:
+            op.drop_index(_index_name(table), table_name=table)
+        if 'submitted_at' in {column['name'] for column in inspector.get_columns(table)}:
+            op.drop_column(table, 'submitted_at')
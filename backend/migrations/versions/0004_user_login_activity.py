@@ -0,0 +1,49 @@
+"""Add the login activity columns to users
+
+Adds last_login_at and last_login_ip, written in batches by
+app.login_activity. Existing accounts start with both empty.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 18:30:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return [
+        sa.Column('last_login_at', sa.DateTime()),
+        sa.Column('last_login_ip', sa.String(45)),
+    ]
+
+
+def _existing_columns():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table('users'):
+        return None
+    return {column['name'] for column in inspector.get_columns('users')}
+
+
+def upgrade():
+    existing = _existing_columns()
+    if existing is None:
+        return
+    for column in _columns():
+        if column.name not in existing:
+            op.add_column('users', column)
+
+
+def downgrade():
+    existing = _existing_columns() or set()
+    for column in _columns():
+        if column.name in existing:
+            op.drop_column('users', column.name)
@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import time
+
+from cryptography.fernet import Fernet
+from itsdangerous import URLSafeSerializer
+
+# app.security and app.config read these at import time.
+_tmp = tempfile.mkdtemp(prefix='medchain-tests-')
+os.environ.setdefault('FERNET_KEYS', Fernet.generate_key().decode())
+os.environ.setdefault('HMAC_KEYS', 'test-hmac-key')
+os.environ['KMS_MASTER_KEY_FILE'] = os.path.join(_tmp, 'kms.json')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ['REDIS_URL'] = 'memory://'
+os.environ['JWT_SECRET_KEY'] = 'test-jwt-secret-' + 'x' * 32
+
+import fakeredis
+from flask_jwt_extended import create_access_token
+import pytest
+
+from app import create_app, db, limiter, login_activity
+from app.models import AuditLog
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    # requirements.txt pins PyJWT 2.8, which accepts the integer `sub` that
+    # login issues; newer PyJWT only does with this off.
+    app.config.update(TESTING=True, JWT_VERIFY_SUB=False)
+    # init_app() has read RATELIMIT_ENABLED already.
+    limiter.enabled = False
+    return app
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    """An in-memory Redis swapped into every app module holding a client."""
+    client = fakeredis.FakeStrictRedis(decode_responses=True)
+    for name, module in list(sys.modules.items()):
+        if (name == 'app' or name.startswith('app.')) and getattr(module, 'redis_client', None) is not None:
+            monkeypatch.setattr(module, 'redis_client', client)
+    return client
+
+
+@pytest.fixture
+def app_ctx(app, redis_client):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app_ctx, monkeypatch):
+    # Audit entries are written from background threads; keep them out of tests.
+    monkeypatch.setattr(AuditLog, 'log_async', classmethod(lambda cls, **kwargs: None))
+    return app_ctx.test_client()
+
+
+@pytest.fixture
+def admin_headers(app_ctx):
+    token = create_access_token(identity='1', additional_claims={'role': 'admin'})
+    return {'Authorization': f"Bearer {token}"}
+
+
+@pytest.fixture
+def login(client, redis_client, monkeypatch):
+    """Posts to /api/auth/login with a fresh single-use CSRF token."""
+    # Login activity stays buffered; no flusher thread outliving the test database.
+    monkeypatch.setattr(login_activity, '_ensure_flusher', lambda app: None)
+    monkeypatch.setattr(login_activity, '_buffer', {})
+
+    def post(email, password):
+        token = f"test-{time.monotonic_ns()}"
+        redis_client.set(f"csrf:{token}", 1)
+        signed = URLSafeSerializer(client.application.secret_key).dumps({'token': token, 'timestamp': int(time.time())})
+        return client.post('/api/auth/login', json={'email': email, 'password': password},
+                           headers={'X-CSRF-TOKEN': signed})
+    return post
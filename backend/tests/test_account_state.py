@@ -0,0 +1,58 @@
+from app import db
+from app.account_state import (
+    PENDING, REJECTED, VERIFIED, _cache_key, get_cached_account_state, invalidate_account_states, load_login_account
+)
+from app.models import Hospital, User
+from app.security import generate_email_hash
+from app.user_directory import sync_user_directory
+
+EMAIL = 'hospital@example.com'
+
+
+def _hospital_user(with_directory=True, **fields):
+    db.session.add(User(id=1, email=EMAIL, email_hash=generate_email_hash(EMAIL), password='x', role='hospital'))
+    hospital = Hospital(user_id=1, **fields)
+    db.session.add(hospital)
+    if with_directory:
+        sync_user_directory('hospital', hospital)
+    db.session.commit()
+
+
+def test_pending_account_is_served_from_cache(app_ctx):
+    _hospital_user(status='pending', verified=False)
+
+    user, account_state = load_login_account(EMAIL)
+    assert user.id == 1 and account_state.state == PENDING
+
+    db.session.query(Hospital).delete()
+    db.session.commit()
+    assert get_cached_account_state(EMAIL).state == PENDING
+
+
+def test_rejection_reason_is_cached_encrypted(app_ctx, redis_client):
+    _hospital_user(status='rejected', verified=False, description='Expired licence')
+
+    assert load_login_account(EMAIL)[1] == (REJECTED, 'Expired licence')
+    assert 'Expired licence' not in redis_client.get(_cache_key(EMAIL))
+    assert get_cached_account_state(EMAIL) == (REJECTED, 'Expired licence')
+
+
+def test_verified_account_is_not_cached(app_ctx):
+    _hospital_user(status='approved', verified=True)
+
+    assert load_login_account(EMAIL)[1].state == VERIFIED
+    assert get_cached_account_state(EMAIL) is None
+
+
+def test_user_without_directory_row_falls_back_to_role_table(app_ctx):
+    _hospital_user(with_directory=False, status='rejected', verified=False, description='Duplicate')
+
+    assert load_login_account(EMAIL)[1] == (REJECTED, 'Duplicate')
+
+
+def test_invalidate_drops_cached_state(app_ctx, redis_client):
+    _hospital_user(status='pending', verified=False)
+    load_login_account(EMAIL)
+
+    invalidate_account_states([1])
+    assert get_cached_account_state(EMAIL) is None
@@ -0,0 +1,106 @@
+import io
+import json
+
+import pytest
+
+from app import bulk_import, db
+from app.models import Doctor, User, UserDirectory
+from app.security import generate_email_hash
+
+
+class _InlineThread:
+    """Runs the import job in the calling thread so tests can assert on it."""
+
+    def __init__(self, target, args, daemon=None):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@pytest.fixture
+def importer(client, admin_headers, monkeypatch):
+    invited = []
+    monkeypatch.setattr(bulk_import, 'Thread', _InlineThread)
+    monkeypatch.setattr(bulk_import, 'send_invitation_emails', lambda batch: invited.extend(batch) or [])
+
+    def run(rows, filename='roster.ndjson', **params):
+        payload = '\n'.join(json.dumps(row) if isinstance(row, dict) else row for row in rows)
+        response = client.post('/api/admin/import', query_string=params, headers=admin_headers,
+                               data={'file': (io.BytesIO(payload.encode()), filename)},
+                               content_type='multipart/form-data')
+        assert response.status_code == 202
+        status = client.get(f"/api/admin/import/{response.get_json()['job_id']}", headers=admin_headers)
+        return status.get_json()['data']
+
+    run.invited = invited
+    return run
+
+
+def _doctor_row(email, license_number, **extra):
+    return {'role': 'doctor', 'email': email, 'name': 'Dr Test', 'license_number': license_number,
+            'specialty': 'Cardiology', 'hospital_id': 1, 'degree': 'MD', **extra}
+
+
+def test_import_reports_partial_failures(importer):
+    job = importer([
+        _doctor_row('a@example.com', 'LIC00001'),
+        _doctor_row('b@example.com', 'LIC00002', role='surgeon'),
+        '{not json',
+        _doctor_row('not-an-email', 'LIC00003'),
+        _doctor_row('c@example.com', 'LIC00004'),
+    ])
+
+    assert job['status'] == 'completed'
+    assert (job['processed'], job['inserted'], job['failed']) == (5, 2, 3)
+    assert sorted(error['line'] for error in job['errors']) == [2, 3, 4]
+    assert {email for email, _ in importer.invited} == {'a@example.com', 'c@example.com'}
+
+    doctors = Doctor.query.all()
+    assert len(doctors) == 2
+    assert all(not doctor.verified and doctor.status == 'pending' for doctor in doctors)
+    assert UserDirectory.query.filter_by(role='doctor', status='pending').count() == 2
+
+
+def test_import_rejects_duplicate_emails(importer):
+    email = 'taken@example.com'
+    db.session.add(User(email=email, email_hash=generate_email_hash(email), password='x', role='patient'))
+    db.session.commit()
+
+    job = importer([
+        _doctor_row(email, 'LIC00001'),
+        _doctor_row('new@example.com', 'LIC00002'),
+        _doctor_row('NEW@example.com', 'LIC00003'),
+    ])
+
+    assert (job['inserted'], job['failed']) == (1, 2)
+    errors = {error['line']: error['error'] for error in job['errors']}
+    assert errors == {1: 'Email or phone already registered', 3: 'Duplicate email in file'}
+
+
+def test_import_isolates_rows_that_fail_on_insert(importer, app):
+    app.config['IMPORT_CHUNK_SIZE'] = 2
+    try:
+        job = importer([
+            _doctor_row('a@example.com', 'LIC00001', telephone='+15550100'),
+            _doctor_row('b@example.com', 'LIC00002', telephone='+15550100'),
+            _doctor_row('c@example.com', 'LIC00003'),
+        ], approve='true')
+    finally:
+        app.config.pop('IMPORT_CHUNK_SIZE')
+
+    assert (job['inserted'], job['failed']) == (2, 1)
+    assert job['errors'] == [{'line': 2, 'error': 'Insert failed: IntegrityError'}]
+    assert all(doctor.verified and doctor.status == 'approved' for doctor in Doctor.query.all())
+
+
+def test_import_reads_csv(importer):
+    csv_rows = [
+        'role,email,name,license_number,specialty,hospital_id,degree',
+        'doctor,csv@example.com,Dr Csv,LIC00009,Neurology,1,MD',
+    ]
+
+    job = importer(csv_rows, filename='roster.csv')
+
+    assert (job['inserted'], job['failed']) == (1, 0)
+    assert User.query.filter_by(email_hash=generate_email_hash('csv@example.com')).count() == 1
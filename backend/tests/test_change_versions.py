@@ -0,0 +1,71 @@
+from sqlalchemy import event
+
+from app import db
+from app.change_versions import bump_change_version
+from app.models import Admin, Doctor, User
+from app.security import generate_email_hash
+
+
+def _queue(client, admin_headers, etag=None, **params):
+    headers = dict(admin_headers)
+    if etag:
+        headers['If-None-Match'] = etag
+    return client.get('/api/admin/unverified-doctor', query_string=params, headers=headers)
+
+
+def test_matching_etag_is_answered_without_queries(client, admin_headers):
+    first = _queue(client, admin_headers)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('W/')
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        second = _queue(client, admin_headers, etag=etag)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert second.status_code == 304
+    assert second.headers['ETag'] == etag
+    assert statements == []
+
+
+def test_etag_changes_with_the_role_version_and_query(client, admin_headers):
+    etag = _queue(client, admin_headers).headers['ETag']
+
+    bump_change_version('hospital')
+    assert _queue(client, admin_headers, etag=etag).status_code == 304
+    assert _queue(client, admin_headers, etag=etag, page=2).status_code == 200
+
+    bump_change_version('doctor')
+    assert _queue(client, admin_headers, etag=etag).status_code == 200
+
+
+def test_lost_version_does_not_revive_old_etags(client, admin_headers, redis_client):
+    etag = _queue(client, admin_headers).headers['ETag']
+
+    redis_client.delete('change_version:doctor')
+
+    assert _queue(client, admin_headers, etag=etag).status_code == 200
+
+
+def test_approve_invalidates_the_queue_etag(client, admin_headers):
+    for user_id, role in ((1, 'admin'), (2, 'doctor')):
+        email = f"{role}{user_id}@example.com"
+        db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x', role=role))
+    db.session.add(Admin(user_id=1, verified=True, status='approved'))
+    db.session.add(Doctor(user_id=2, verified=False, status='pending'))
+    db.session.commit()
+    etag = _queue(client, admin_headers).headers['ETag']
+
+    response = client.post('/api/admin/approve-batch', json={'items': [{'entity_type': 'doctor', 'entity_id': 2}]},
+                           headers=admin_headers)
+    assert response.status_code == 200
+
+    refreshed = _queue(client, admin_headers, etag=etag)
+    assert refreshed.status_code == 200
+    assert refreshed.get_json()['data'] == []
@@ -0,0 +1,54 @@
+import hashlib
+
+from cryptography.fernet import Fernet
+import pytest
+
+from app import security
+from app.security import decrypt_data, encrypt_data_v2, is_ciphertext_v2, is_current_ciphertext_v2
+
+
+def _colliding_fernet_keys():
+    seen = {}
+    while True:
+        key = Fernet.generate_key().decode()
+        key_id = hashlib.sha256(key.encode()).digest()[0]
+        if key_id in seen:
+            return key, seen[key_id]
+        seen[key_id] = key
+
+
+def test_v2_round_trip(app_ctx):
+    encrypted = encrypt_data_v2('licence.pdf')
+
+    assert is_ciphertext_v2(encrypted) and is_current_ciphertext_v2(encrypted)
+    assert decrypt_data(encrypted) == 'licence.pdf'
+
+
+def test_colliding_derived_key_ids_still_decrypt(app_ctx, monkeypatch):
+    new_key, old_key = _colliding_fernet_keys()
+    monkeypatch.delenv('AEAD_KEYS', raising=False)
+
+    def use_fernet_keys(keys):
+        monkeypatch.setattr(security, 'fernet_keys', keys)
+        aead_keys, active_key_id = security._load_aead_keys()
+        monkeypatch.setattr(security, 'aead_keys', aead_keys)
+        monkeypatch.setattr(security, 'aead_active_key_id', active_key_id)
+        return aead_keys, active_key_id
+
+    use_fernet_keys([old_key])
+    old_value = encrypt_data_v2('old')
+    keys, active_key_id = use_fernet_keys([new_key, old_key])
+    new_value = encrypt_data_v2('new')
+
+    assert len(keys[active_key_id]) == 2 and old_value[1] == new_value[1]
+    assert (decrypt_data(old_value), decrypt_data(new_value)) == ('old', 'new')
+    assert not is_current_ciphertext_v2(old_value)
+    assert is_current_ciphertext_v2(new_value)
+
+
+def test_tampered_v2_value_is_rejected(app_ctx):
+    encrypted = bytearray(encrypt_data_v2('x'))
+    encrypted[-1] ^= 1
+
+    with pytest.raises(RuntimeError):
+        decrypt_data(bytes(encrypted))
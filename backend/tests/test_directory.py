@@ -0,0 +1,45 @@
+from app import db
+from app import directory
+from app.directory import _version_key, get_snapshot, rebuild_directory, update_directory_entry
+from app.models import Hospital, User
+from app.security import generate_email_hash
+
+
+def _approved_hospital(user_id):
+    email = f"hospital{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x', name=f"H{user_id}"))
+    hospital = Hospital(user_id=user_id, status='approved', verified=True)
+    db.session.add(hospital)
+    db.session.commit()
+    return hospital
+
+
+def test_rebuild_keeps_update_that_lands_during_the_read(app_ctx, monkeypatch):
+    _approved_hospital(1)
+    read_entries = directory._read_entries
+    calls = []
+
+    def racing_read(model):
+        entries = read_entries(model)
+        if not calls:
+            # Approved after the rebuild read the table, before it swapped.
+            update_directory_entry('hospital', _approved_hospital(2))
+        calls.append(len(entries))
+        return entries
+
+    monkeypatch.setattr(directory, '_read_entries', racing_read)
+
+    assert rebuild_directory('hospital') == 2
+    assert calls == [1, 2]
+    assert [entry['id'] for entry in get_snapshot('hospital').entries] == [1, 2]
+
+
+def test_lost_version_does_not_restart_at_an_old_etag(app_ctx, redis_client):
+    _approved_hospital(1)
+    first = get_snapshot('hospital').version
+
+    redis_client.delete(_version_key('hospital'))
+    second = get_snapshot('hospital').version
+
+    assert second != first
+    assert int(second) > 1
@@ -0,0 +1,18 @@
+from sqlalchemy import select
+
+from app.encrypted_types import EncryptedBinary, EncryptedString, EncryptedText
+from app.models import Hospital, User
+
+
+def test_encrypted_types_are_cacheable():
+    # SQLAlchemy reads cache_ok from the TypeDecorator subclass itself.
+    for encrypted_type in (EncryptedText, EncryptedString, EncryptedBinary):
+        assert encrypted_type.__dict__.get('cache_ok') is True
+
+
+def test_statements_on_encrypted_columns_produce_a_cache_key(app_ctx):
+    statements = [
+        select(User).where(User.email_encrypted == 'token'),
+        select(Hospital.status_encrypted, Hospital.logo_encrypted),
+    ]
+    assert all(statement._generate_cache_key() is not None for statement in statements)
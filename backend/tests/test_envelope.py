@@ -0,0 +1,144 @@
+import threading
+
+import pytest
+from sqlalchemy import update
+
+from app import db
+from app import envelope
+from app.envelope import LocalKMS, rewrap_data_keys, seal_existing_rows
+from app.models import Hospital
+from app.security import encrypt_data
+
+
+@pytest.fixture
+def kms(tmp_path, monkeypatch):
+    kms = LocalKMS(str(tmp_path / 'kms.json'))
+    monkeypatch.setattr(envelope, '_kms', kms)
+    envelope.get_data_key_cache().clear()
+    return kms
+
+
+def _hospital(user_id=1, **fields):
+    hospital = Hospital(user_id=user_id, **fields)
+    db.session.add(hospital)
+    db.session.commit()
+    return hospital
+
+
+def _reload(hospital_id=1):
+    db.session.expunge_all()
+    envelope.get_data_key_cache().clear()
+    return db.session.get(Hospital, hospital_id)
+
+
+def test_seal_and_unseal(app_ctx, kms):
+    _hospital(type='general', status='pending', beds='120')
+
+    hospital = _reload()
+    assert hospital.sealed_fields is not None
+    assert hospital.type_encrypted is None and hospital.status_encrypted is None
+    assert (hospital.type, hospital.status, hospital.beds) == ('general', 'pending', '120')
+
+
+def test_rewrap_after_rotation(app_ctx, kms):
+    _hospital(type='general', status='pending')
+    old_key_id = _reload().data_key_id
+
+    new_key_id = kms.rotate()
+    assert rewrap_data_keys()['hospitals'] == 1
+
+    hospital = _reload()
+    assert new_key_id != old_key_id
+    assert hospital.data_key_id == new_key_id
+    assert hospital.status == 'pending'
+
+
+def test_other_process_unwraps_after_rotation(tmp_path):
+    path = str(tmp_path / 'kms.json')
+    worker = LocalKMS(path)
+    cli = LocalKMS(path)
+
+    new_key_id = cli.rotate()
+    key_id, wrapped = cli.wrap(b'k' * 32)
+
+    # The worker has never seen the new key; it reloads the file on demand.
+    assert key_id == new_key_id
+    assert worker.unwrap(key_id, wrapped) == b'k' * 32
+    with pytest.raises(KeyError):
+        worker.unwrap('mk-unknown', wrapped)
+
+
+def test_concurrent_startup_agrees_on_master_key(tmp_path):
+    path = str(tmp_path / 'kms.json')
+    barrier = threading.Barrier(8)
+    results = []
+
+    def start():
+        barrier.wait()
+        results.append(LocalKMS(path))
+
+    threads = [threading.Thread(target=start) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    key_id, wrapped = results[0].wrap(b'k' * 32)
+    assert {kms.active_key_id for kms in results} == {key_id}
+    assert all(kms.unwrap(key_id, wrapped) == b'k' * 32 for kms in results)
+
+
+def test_rotations_in_the_same_second_keep_every_key(tmp_path):
+    kms = LocalKMS(str(tmp_path / 'kms.json'))
+    first = kms.active_key_id
+    second, third = kms.rotate(), kms.rotate()
+
+    assert len({first, second, third}) == 3
+    assert set(LocalKMS(kms.path)._raw_keys) == {first, second, third}
+
+
+def test_first_write_to_legacy_row_seals_every_field(app_ctx, kms):
+    _hospital(type='general', status='pending')
+    # A row from before envelope encryption: per-column ciphertexts only.
+    db.session.execute(update(Hospital).values(
+        sealed_fields=None, data_key_id=None, data_key_wrapped=None,
+        type_encrypted=encrypt_data('general'), status_encrypted=encrypt_data('pending')
+    ))
+    db.session.commit()
+
+    hospital = _reload()
+    hospital.status = 'approved'
+    db.session.commit()
+
+    hospital = _reload()
+    assert hospital.type_encrypted is None and hospital.status_encrypted is None
+    assert (hospital.type, hospital.status) == ('general', 'approved')
+
+
+def test_seal_rows_picks_up_partially_sealed_rows(app_ctx, kms):
+    _hospital(user_id=1)
+    hospital = _reload()
+    # Left behind by single-field writes before the fix: the blob holds only
+    # `status`, `type` is still a per-column ciphertext.
+    db.session.execute(update(Hospital).values(
+        sealed_fields=envelope.seal_fields(hospital, {'status': 'approved'}),
+        type_encrypted=encrypt_data('general'), status_encrypted=None
+    ))
+    db.session.commit()
+
+    assert seal_existing_rows()['hospitals'] == 1
+
+    hospital = _reload()
+    assert hospital.type_encrypted is None
+    assert (hospital.type, hospital.status) == ('general', 'approved')
+
+
+def test_kms_and_key_cache_follow_the_app_config(app_ctx, tmp_path, monkeypatch):
+    monkeypatch.setattr(envelope, '_kms', None)
+    monkeypatch.setattr(envelope, '_data_key_cache', None)
+    monkeypatch.setitem(app_ctx.config, 'KMS_MASTER_KEY_FILE', str(tmp_path / 'configured.json'))
+    monkeypatch.setitem(app_ctx.config, 'DATA_KEY_CACHE_SIZE', 7)
+    monkeypatch.setitem(app_ctx.config, 'DATA_KEY_CACHE_TTL', 42)
+
+    assert envelope.get_kms().path == str(tmp_path / 'configured.json')
+    assert (envelope.get_data_key_cache().maxsize, envelope.get_data_key_cache().ttl) == (7, 42)
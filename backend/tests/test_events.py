@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from app import events
+
+
+@pytest.fixture
+def stream(client, admin_headers, app, monkeypatch):
+    # No Redis subscription thread: tests hand messages to _deliver() directly.
+    monkeypatch.setattr(events, '_ensure_listener', lambda app: None)
+    monkeypatch.setitem(app.config, 'EVENTS_HEARTBEAT', 1)
+    monkeypatch.setitem(app.config, 'EVENTS_BUFFER_SIZE', 2)
+    monkeypatch.setitem(app.config, 'EVENTS_MAX_SUBSCRIBERS', 2)
+    opened = []
+
+    def open_stream():
+        response = client.get('/api/admin/events', headers=admin_headers, buffered=False)
+        opened.append(response)
+        return response
+
+    yield open_stream
+    for response in opened:
+        response.close()
+    assert not events._subscribers
+
+
+def test_stream_sends_changes_heartbeats_and_resync(stream):
+    response = stream()
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    chunks = iter(response.response)
+    assert next(chunks) == b"retry: 1000\n\n"
+
+    events._deliver(json.dumps({'type': 'verification', 'role': 'doctor'}))
+    assert next(chunks) == b'event: change\ndata: {"type": "verification", "role": "doctor"}\n\n'
+    assert next(chunks) == b": ping\n\n"
+
+    for entity_id in range(3):
+        events._deliver(json.dumps({'type': 'submission', 'id': entity_id}))
+    assert next(chunks) == f"event: resync\ndata: {events.RESYNC}\n\n".encode()
+
+
+def test_streams_beyond_the_cap_get_503(stream):
+    first, second = stream(), stream()
+    assert (first.status_code, second.status_code) == (200, 200)
+
+    refused = stream()
+    assert refused.status_code == 503
+    assert refused.headers['Retry-After'] == '30'
+
+    # Never iterated: closing the response alone frees the slot.
+    second.close()
+    assert stream().status_code == 200
@@ -0,0 +1,101 @@
+import csv
+import gzip
+import io
+import json
+
+from app import db
+from app.models import Doctor, User, UserDirectory
+from app.security import encrypt_data, generate_email_hash
+
+
+def _user(user_id, role='doctor', **kwargs):
+    email = f"user{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x',
+                        role=role, name=f"User {user_id}", **kwargs))
+
+
+def _users():
+    _user(1, telephone='+15550101')
+    _user(2)
+    _user(3)
+    db.session.add_all([
+        UserDirectory(user_id=1, role='doctor', status='approved', verified=True),
+        UserDirectory(user_id=2, role='patient', status='approved', verified=True),
+        UserDirectory(user_id=3, role='doctor', status='pending', verified=False),
+    ])
+    db.session.commit()
+
+
+def _export(client, admin_headers, **params):
+    response = client.get('/api/admin/export', query_string=params, headers=admin_headers)
+    assert response.status_code == 200
+    return response
+
+
+def _ndjson(data):
+    return [json.loads(line) for line in data.decode().splitlines()]
+
+
+def test_ndjson_export_decrypts_user_fields(client, admin_headers):
+    _users()
+
+    response = _export(client, admin_headers)
+
+    assert response.mimetype == 'application/x-ndjson'
+    rows = _ndjson(response.data)
+    assert [row['id'] for row in rows] == [1, 2]
+    assert rows[0] == {
+        'id': 1, 'name': 'User 1', 'email': 'user1@example.com', 'phone': '+15550101',
+        'role': 'doctor', 'status': 'approved', 'verified': True, 'submitted_at': None
+    }
+
+
+def test_csv_export_selects_fields_and_filters(client, admin_headers):
+    _users()
+
+    response = _export(client, admin_headers, format='csv', fields='email,id', role='doctor', status='pending')
+
+    assert response.mimetype == 'text/csv'
+    assert list(csv.reader(io.StringIO(response.data.decode()))) == [['email', 'id'], ['user3@example.com', '3']]
+
+
+def test_gzip_export(client, admin_headers):
+    _users()
+
+    response = _export(client, admin_headers, gzip='true', fields='id')
+
+    assert response.mimetype == 'application/gzip'
+    assert response.headers['Content-Disposition'].endswith('.ndjson.gz"')
+    assert _ndjson(gzip.decompress(response.data)) == [{'id': 1}, {'id': 2}]
+
+
+def test_verification_export_reads_sealed_and_unsealed_rows(client, admin_headers, app):
+    _user(1)
+    _user(2)
+    db.session.add(Doctor(user_id=1, verified=False, status='pending', specialty='Cardiology'))
+    # Written before envelope encryption: per-column ciphertext, no sealed blob.
+    db.session.add(Doctor(user_id=2, verified=True, status_encrypted=encrypt_data('approved')))
+    db.session.commit()
+    assert db.session.get(Doctor, 1).sealed_fields and db.session.get(Doctor, 2).sealed_fields is None
+
+    app.config['EXPORT_CHUNK_SIZE'] = 1
+    try:
+        response = _export(client, admin_headers, dataset='verification', role='doctor',
+                           fields='id,email,status,specialty,verified')
+    finally:
+        app.config.pop('EXPORT_CHUNK_SIZE')
+
+    assert _ndjson(response.data) == [
+        {'id': 1, 'email': 'user1@example.com', 'status': 'pending', 'specialty': 'Cardiology', 'verified': False},
+        {'id': 2, 'email': 'user2@example.com', 'status': 'approved', 'specialty': None, 'verified': True},
+    ]
+
+
+def test_export_rejects_bad_parameters(client, admin_headers):
+    def status(**params):
+        return client.get('/api/admin/export', query_string=params, headers=admin_headers).status_code
+
+    assert status(fields='id,password') == 400
+    assert status(format='xml') == 400
+    assert status(dataset='verification') == 400
+    assert status(dataset='verification', role='wizard') == 400
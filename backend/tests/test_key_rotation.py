@@ -0,0 +1,41 @@
+from app import db
+from app import key_rotation
+from app.key_rotation import CHECKPOINT_KEY, DONE, rotate_table, target_fingerprint
+from app.models import User
+from app.security import generate_email_hash
+
+
+def _users(count):
+    for i in range(1, count + 1):
+        email = f"user{i}@example.com"
+        db.session.add(User(id=i, email=email, email_hash=generate_email_hash(email), password='x'))
+    db.session.commit()
+
+
+def test_completed_run_is_skipped_for_the_same_keys(app_ctx, redis_client):
+    _users(3)
+
+    assert rotate_table(User, batch_size=2)['rows'] == 3
+    assert redis_client.hget(CHECKPOINT_KEY.format(target_fingerprint()), 'users') == DONE
+    assert rotate_table(User, batch_size=2) is None
+
+
+def test_new_target_keys_start_from_scratch(app_ctx, redis_client, monkeypatch):
+    _users(3)
+    rotate_table(User, batch_size=2)
+
+    monkeypatch.setitem(app_ctx.config, 'TELEPHONE_PEPPER', 'ab' * 16)
+    assert rotate_table(User, batch_size=2)['rows'] == 3
+
+
+def test_interrupted_run_resumes_after_checkpoint(app_ctx, redis_client):
+    _users(5)
+    redis_client.hset(CHECKPOINT_KEY.format(target_fingerprint()), 'users', 3)
+
+    assert rotate_table(User, batch_size=2)['rows'] == 2
+
+
+def test_fingerprint_follows_the_active_fernet_key(app_ctx, monkeypatch):
+    before = target_fingerprint()
+    monkeypatch.setattr(key_rotation, 'fernet_keys', ['new-key'] + key_rotation.fernet_keys)
+    assert target_fingerprint() != before
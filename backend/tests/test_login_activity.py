@@ -0,0 +1,51 @@
+from datetime import datetime
+
+import pytest
+
+from app import db
+from app import login_activity
+from app.login_activity import flush, record_login
+from app.models import User
+from app.security import generate_email_hash
+
+
+@pytest.fixture
+def activity(app_ctx, monkeypatch):
+    monkeypatch.setattr(login_activity, '_ensure_flusher', lambda app: None)
+    monkeypatch.setattr(login_activity, '_buffer', {})
+    for i in (1, 2):
+        email = f"user{i}@example.com"
+        db.session.add(User(id=i, email=email, email_hash=generate_email_hash(email), password='x'))
+    db.session.commit()
+    return app_ctx
+
+
+def _user(user_id):
+    db.session.expire_all()
+    return db.session.get(User, user_id)
+
+
+def test_flush_writes_the_latest_login_per_user(activity):
+    record_login(1, '10.0.0.1')
+    record_login(1, '10.0.0.2')
+    record_login(2, '10.0.0.3')
+
+    assert _user(1).last_login_at is None
+    assert flush(activity) == 2
+    assert (_user(1).last_login_ip, _user(2).last_login_ip) == ('10.0.0.2', '10.0.0.3')
+    assert isinstance(_user(1).last_login_at, datetime)
+    assert flush(activity) == 0
+
+
+def test_failed_flush_keeps_rows_for_the_next_one(activity, monkeypatch):
+    record_login(1, '10.0.0.1')
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('database is down')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(db.session, 'execute', fail)
+        assert flush(activity) == 0
+
+    assert flush(activity) == 1
+    assert _user(1).last_login_ip == '10.0.0.1'
@@ -0,0 +1,69 @@
+import pytest
+import redis
+
+from app import login_throttle
+from app.login_throttle import clear_failed_logins, login_retry_after, record_failed_login
+
+EMAIL = 'user@example.com'
+
+
+@pytest.fixture
+def throttle(app_ctx, monkeypatch):
+    monkeypatch.setitem(app_ctx.config, 'ACCOUNT_LOCKOUT_THRESHOLD', 3)
+    monkeypatch.setitem(app_ctx.config, 'LOGIN_IP_LOCKOUT_THRESHOLD', 10)
+    monkeypatch.setitem(app_ctx.config, 'LOGIN_BACKOFF_BASE', 2)
+    login_throttle._local_counts.clear()
+    login_throttle._local_blocks.clear()
+    return app_ctx
+
+
+def test_backoff_doubles_after_the_threshold(throttle):
+    assert [record_failed_login(EMAIL, '10.0.0.1') for _ in range(5)] == [0, 0, 2, 4, 8]
+    assert 7 <= login_retry_after(EMAIL, '10.0.0.2') <= 8
+    assert login_retry_after('other@example.com', '10.0.0.2') == 0
+
+
+def test_ip_is_blocked_across_accounts(throttle):
+    for i in range(10):
+        record_failed_login(f"user{i}@example.com", '10.0.0.1')
+
+    assert login_retry_after('new@example.com', '10.0.0.1') > 0
+
+
+def test_clear_resets_the_account(throttle):
+    for _ in range(4):
+        record_failed_login(EMAIL, None)
+
+    clear_failed_logins(EMAIL)
+    assert login_retry_after(EMAIL, None) == 0
+    assert record_failed_login(EMAIL, None) == 0
+
+
+def test_local_fallback_while_redis_is_down(throttle, redis_client, monkeypatch):
+    def down(*args, **kwargs):
+        raise redis.exceptions.ConnectionError('down')
+
+    monkeypatch.setattr(redis_client, 'ttl', down)
+    monkeypatch.setattr(redis_client, 'pipeline', down)
+
+    assert [record_failed_login(EMAIL, None) for _ in range(4)] == [0, 0, 2, 4]
+    assert 3 <= login_retry_after(EMAIL, None) <= 4
+
+    monkeypatch.setitem(throttle.config, 'REDIS_DEGRADED_LOGIN_THROTTLE', 'open')
+    assert login_retry_after(EMAIL, None) == 0
+
+
+def test_failures_do_not_extend_the_window(throttle, redis_client):
+    key = login_throttle._attempts_key('account', login_throttle.generate_email_hash(EMAIL))
+    record_failed_login(EMAIL, None)
+    assert 0 < redis_client.ttl(key) <= 900
+
+    # Late in the window: further failures must not push its end out.
+    redis_client.expire(key, 5)
+    record_failed_login(EMAIL, None)
+    assert redis_client.ttl(key) <= 5
+    assert redis_client.get(key) == '2'
+
+    redis_client.delete(key)
+    assert record_failed_login(EMAIL, None) == 0
+    assert redis_client.get(key) == '1'
@@ -0,0 +1,101 @@
+import importlib.util
+import io
+import os
+
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+from flask import current_app
+from flask_migrate import upgrade
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app import MIGRATIONS_DIR, db
+
+
+def _migration(name):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(MIGRATIONS_DIR, 'versions', f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _postgres_sql(monkeypatch, module, columns):
+    """Runs `module.upgrade()` offline against PostgreSQL with the given live columns."""
+    output = io.StringIO()
+    context = MigrationContext.configure(dialect_name='postgresql', opts={'as_sql': True, 'output_buffer': output})
+
+    class Bind:
+        dialect = postgresql.dialect()
+
+    with Operations.context(context):
+        monkeypatch.setattr(module.op, 'get_bind', lambda: Bind)
+        monkeypatch.setattr(module, '_column_types', lambda table: columns.get(table, {}))
+        module.upgrade()
+    return output.getvalue()
+
+
+@pytest.fixture
+def database(app_ctx):
+    db.session.execute(sa.text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+    yield app_ctx
+    db.session.remove()
+    db.session.execute(sa.text('DROP TABLE IF EXISTS alembic_version'))
+    db.session.commit()
+
+
+def _head():
+    return ScriptDirectory.from_config(current_app.extensions['migrate'].migrate.get_config()).get_current_head()
+
+
+def test_upgrade_on_a_created_schema_only_records_the_revision(database):
+    upgrade()
+
+    assert db.session.execute(sa.text('SELECT version_num FROM alembic_version')).scalar() == _head()
+
+
+def test_document_columns_become_bytea_on_postgres(monkeypatch):
+    migration = _migration('0001_binary_document_columns')
+    sql = _postgres_sql(monkeypatch, migration, {'hospitals': {'logo_encrypted': sa.Text(), 'license_document_encrypted': sa.LargeBinary()}})
+
+    assert "ALTER COLUMN logo_encrypted TYPE BYTEA USING convert_to(logo_encrypted, 'UTF8')" in sql
+    assert 'license_document_encrypted' not in sql
+
+
+def _columns(table):
+    return {column['name'] for column in sa.inspect(db.engine).get_columns(table)}
+
+
+def _drop_columns(table, columns):
+    for column in columns:
+        db.session.execute(sa.text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+    db.session.commit()
+
+
+def test_envelope_columns_are_added_to_existing_role_tables(database):
+    envelope_columns = ['data_key_id', 'data_key_wrapped', 'sealed_fields']
+    _drop_columns('hospitals', envelope_columns)
+
+    upgrade()
+
+    assert set(envelope_columns) <= _columns('hospitals')
+
+
+def test_submitted_at_and_queue_index_are_added(database):
+    db.session.execute(sa.text('DROP INDEX ix_doctors_verified_submitted_at'))
+    _drop_columns('doctors', ['submitted_at'])
+
+    upgrade()
+
+    assert 'submitted_at' in _columns('doctors')
+    assert 'ix_doctors_verified_submitted_at' in {index['name'] for index in sa.inspect(db.engine).get_indexes('doctors')}
+
+
+def test_login_activity_columns_are_added_to_users(database):
+    _drop_columns('users', ['last_login_at', 'last_login_ip'])
+
+    upgrade()
+
+    assert {'last_login_at', 'last_login_ip'} <= _columns('users')
@@ -0,0 +1,69 @@
+import threading
+
+from app import name_index
+from app.name_index import MAX_PREFIX_LENGTH, MAX_RESULTS, PrefixTrie
+
+
+def _names(results):
+    return [result['name'] for result in results]
+
+
+def test_search_returns_names_in_order_from_every_word_start():
+    trie = PrefixTrie.build([(1, 'Zeta General Hospital'), (2, 'General Clinic'), (3, 'Alpha Pharmacy')])
+
+    assert _names(trie.search('gen', 10)) == ['General Clinic', 'Zeta General Hospital']
+    assert _names(trie.search('  GENERAL   hosp', 10)) == ['Zeta General Hospital']
+    assert trie.search('x', 10) == []
+
+
+def test_nodes_keep_only_the_first_results():
+    trie = PrefixTrie.build([(i, f"Clinic {i:03}") for i in range(MAX_RESULTS * 3)])
+
+    assert len(trie.root['c'][None]) == MAX_RESULTS
+    assert _names(trie.search('cl', 3)) == ['Clinic 000', 'Clinic 001', 'Clinic 002']
+
+
+def test_prefixes_longer_than_the_indexed_depth_are_filtered():
+    stem = 'a' * MAX_PREFIX_LENGTH
+    trie = PrefixTrie.build([(1, stem + 'b'), (2, stem + 'c')])
+
+    assert _names(trie.search(stem + 'c', 10)) == [stem + 'c']
+
+
+def test_invalidation_during_build_is_not_overwritten(app_ctx, monkeypatch):
+    monkeypatch.setattr(name_index, '_ensure_subscriber', lambda app: None)
+
+    def build(directory_type):
+        name_index.invalidate(directory_type)
+        return PrefixTrie.build([(1, 'Old Name')])
+
+    monkeypatch.setattr(name_index, '_build', build)
+    assert _names(name_index.autocomplete('hospital', 'old')) == ['Old Name']
+    assert 'hospital' not in name_index._indexes
+
+
+def test_subscriber_is_started_once(monkeypatch):
+    started = []
+
+    class FakeThread:
+        def __init__(self, target, daemon):
+            pass
+
+        def start(self):
+            started.append(self)
+
+    monkeypatch.setattr(name_index, 'Thread', FakeThread)
+    monkeypatch.setattr(name_index, '_subscriber', None)
+    barrier = threading.Barrier(8)
+
+    def ensure():
+        barrier.wait()
+        name_index._ensure_subscriber(None)
+
+    threads = [threading.Thread(target=ensure) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(started) == 1
@@ -0,0 +1,122 @@
+from threading import Event, Thread
+
+import pytest
+
+from app import db, password_hashing
+from app.mainRoutes import auth
+from app.models import User, UserDirectory
+from app.password_hashing import HashingBusy, get_engine, hash_password
+from app.security import generate_email_hash
+
+EMAIL = 'patient@example.com'
+PASSWORD = 'Correct-horse-1'
+
+
+@pytest.fixture
+def hashing(app_ctx, monkeypatch):
+    monkeypatch.setitem(app_ctx.config, 'PASSWORD_HASH_ALGORITHM', 'pbkdf2')
+    monkeypatch.setitem(app_ctx.config, 'PASSWORD_PBKDF2_ITERATIONS', 1000)
+    monkeypatch.setattr(password_hashing, '_engines', {})
+    return app_ctx
+
+
+def _patient(password_hash):
+    db.session.add(User(id=5, email=EMAIL, email_hash=generate_email_hash(EMAIL), password=password_hash,
+                        role='patient', account_verified=True, name='Patient'))
+    db.session.add(UserDirectory(user_id=5, role='patient', status='approved', verified=True))
+    db.session.commit()
+
+
+def test_saturated_pool_refuses_new_work(hashing, monkeypatch):
+    monkeypatch.setitem(hashing.config, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setitem(hashing.config, 'PASSWORD_HASH_MAX_QUEUE', 0)
+    started, release = Event(), Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+
+    def occupy():
+        with hashing.app_context():
+            password_hashing._run(slow)
+
+    worker = Thread(target=occupy)
+    worker.start()
+    try:
+        assert started.wait(5)
+        with pytest.raises(HashingBusy) as excinfo:
+            hash_password(PASSWORD)
+        assert excinfo.value.retry_after == hashing.config['PASSWORD_HASH_RETRY_AFTER']
+    finally:
+        release.set()
+        worker.join()
+
+    assert hash_password(PASSWORD).startswith('pbkdf2:sha256:1000$')
+
+
+def test_login_answers_503_while_hashing_is_saturated(hashing, login, monkeypatch):
+    _patient(get_engine().hash(PASSWORD))
+    monkeypatch.setattr(password_hashing, '_pending', 10 ** 6)
+
+    response = login(EMAIL, PASSWORD)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(hashing.config['PASSWORD_HASH_RETRY_AFTER'])
+
+
+def test_busy_rehash_does_not_fail_the_login(hashing, login, monkeypatch):
+    old_hash = password_hashing.Pbkdf2Engine(500).hash(PASSWORD)
+    _patient(old_hash)
+
+    def busy(password):
+        raise HashingBusy(5)
+
+    monkeypatch.setattr(auth, 'hash_password', busy)
+
+    assert login(EMAIL, PASSWORD).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, 5).password == old_hash
+
+
+ENGINE_CONFIGS = {
+    'pbkdf2': {'PASSWORD_PBKDF2_ITERATIONS': 1000},
+    'scrypt': {'PASSWORD_SCRYPT_N': 1024, 'PASSWORD_SCRYPT_R': 8, 'PASSWORD_SCRYPT_P': 1},
+    'argon2id': {'PASSWORD_ARGON2_TIME_COST': 2, 'PASSWORD_ARGON2_MEMORY_COST': 1024, 'PASSWORD_ARGON2_PARALLELISM': 1},
+}
+# Stored hashes below each target: an older algorithm, or the same one at a lower cost.
+OUTDATED_HASHES = {
+    'pbkdf2': lambda: password_hashing.Pbkdf2Engine(500).hash(PASSWORD),
+    'scrypt': lambda: password_hashing.Pbkdf2Engine(1000).hash(PASSWORD),
+    'argon2id': lambda: password_hashing.Argon2Engine(1, 1024, 1).hash(PASSWORD),
+}
+
+
+@pytest.mark.parametrize('algorithm', sorted(ENGINE_CONFIGS))
+def test_login_rehashes_to_the_configured_engine(hashing, login, monkeypatch, algorithm):
+    monkeypatch.setitem(hashing.config, 'PASSWORD_HASH_ALGORITHM', algorithm)
+    for key, value in ENGINE_CONFIGS[algorithm].items():
+        monkeypatch.setitem(hashing.config, key, value)
+    outdated = OUTDATED_HASHES[algorithm]()
+    _patient(outdated)
+    engine = get_engine()
+    assert engine.needs_rehash(outdated)
+
+    assert login(EMAIL, PASSWORD).status_code == 200
+    db.session.expire_all()
+    upgraded = db.session.get(User, 5).password
+    assert not engine.needs_rehash(upgraded)
+    assert password_hashing.verify_password(upgraded, PASSWORD)
+
+    # A current hash is left alone.
+    assert login(EMAIL, PASSWORD).status_code == 200
+    db.session.expire_all()
+    assert db.session.get(User, 5).password == upgraded
+
+
+def test_failed_login_does_not_rehash(hashing, login):
+    old_hash = password_hashing.Pbkdf2Engine(500).hash(PASSWORD)
+    _patient(old_hash)
+
+    assert login(EMAIL, 'Wrong-password-1').status_code == 401
+    db.session.expire_all()
+    assert db.session.get(User, 5).password == old_hash
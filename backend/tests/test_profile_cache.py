@@ -0,0 +1,79 @@
+from flask_jwt_extended import create_access_token
+import pytest
+import redis
+
+from app import db
+from app.models import Admin, User
+from app.profile_cache import _cache_key, get_profile, invalidate_profile
+from app.security import generate_email_hash
+
+
+def _user(user_id=5, role='patient', **kwargs):
+    email = f"user{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x',
+                        role=role, name='Jane Doe', telephone='+15550199', **kwargs))
+    db.session.commit()
+
+
+def test_profile_is_cached_encrypted(app_ctx, redis_client):
+    _user()
+
+    assert get_profile(5)['name'] == 'Jane Doe'
+    cached = redis_client.get(_cache_key(5))
+    assert cached and 'Jane Doe' not in cached and '+15550199' not in cached
+
+    db.session.query(User).filter_by(id=5).update({'role': 'doctor'})
+    db.session.commit()
+    assert get_profile(5)['role'] == 'patient'
+
+
+def test_invalidation_reloads_the_profile(app_ctx):
+    _user()
+    get_profile(5)
+
+    db.session.query(User).filter_by(id=5).update({'mfa_enabled': True})
+    db.session.commit()
+    invalidate_profile(5)
+
+    assert get_profile(5)['mfa_enabled'] is True
+    assert get_profile(404) is None
+
+
+def test_redis_errors_fall_back_to_the_database(app_ctx, redis_client, monkeypatch):
+    _user()
+
+    def down(*args, **kwargs):
+        raise redis.exceptions.ConnectionError('down')
+
+    for method in ('get', 'setex', 'delete'):
+        monkeypatch.setattr(redis_client, method, down)
+
+    assert get_profile(5)['email'] == 'user5@example.com'
+    invalidate_profile(5)
+
+
+@pytest.mark.parametrize('path, enabled', [('enable-mfa', True), ('disable-mfa', False)])
+def test_mfa_changes_invalidate_the_profile(client, path, enabled):
+    _user(mfa_enabled=not enabled)
+    assert get_profile(5)['mfa_enabled'] is not enabled
+
+    token = create_access_token(identity='5', additional_claims={'role': 'patient'})
+    response = client.post(f"/api/auth/{path}", headers={'Authorization': f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert get_profile(5)['mfa_enabled'] is enabled
+
+
+def test_admin_profile_endpoint_serves_the_cached_profile(client, admin_headers):
+    _user(user_id=1, role='admin')
+    db.session.add(Admin(user_id=1, verified=True, status='approved', security_level='high'))
+    db.session.commit()
+
+    first = client.get('/api/admin/profile', headers=admin_headers)
+    assert first.status_code == 200
+    assert first.get_json()['admin_profile']['security_level'] == 'high'
+
+    db.session.query(Admin).delete()
+    db.session.commit()
+    second = client.get('/api/admin/profile', headers=admin_headers)
+    assert second.get_json() == first.get_json()
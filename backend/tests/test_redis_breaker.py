@@ -0,0 +1,112 @@
+import socket
+import time
+
+import pytest
+import redis
+from flask_jwt_extended import create_access_token, get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import RevokedTokenError
+
+from app import redis_breaker, security
+from app.near_cache import create_redis_client
+from app.redis_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(redis_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def _fail():
+    raise redis.exceptions.ConnectionError('down')
+
+
+def _trip(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(redis.exceptions.ConnectionError):
+            breaker.call(_fail)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    _trip(breaker)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.call(lambda: pytest.fail('called while open'))
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    _trip(breaker)
+    clock.now += 10
+
+    breaker._before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.call(lambda: 'second probe')
+
+
+def test_probe_success_closes_and_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10)
+    _trip(breaker)
+    clock.now += 10
+    with pytest.raises(redis.exceptions.ConnectionError):
+        breaker.call(_fail)
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CLOSED
+
+
+def test_redis_answering_with_an_error_counts_as_success(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+
+    def error():
+        raise redis.exceptions.ResponseError('WRONGTYPE')
+
+    with pytest.raises(redis.exceptions.ResponseError):
+        breaker.call(error)
+    assert breaker.state == CLOSED
+
+
+def test_unreachable_redis_fails_fast_without_retries(monkeypatch):
+    monkeypatch.setattr(redis_breaker, '_breakers', {})
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    config = {'REDIS_SOCKET_TIMEOUT': 0.2, 'REDIS_BREAKER_FAILURES': 2, 'REDIS_BREAKER_RESET_TIMEOUT': 60}
+    client = create_redis_client(config, host='127.0.0.1', port=port)
+
+    for _ in range(2):
+        started = time.monotonic()
+        with pytest.raises(redis.exceptions.ConnectionError):
+            client.get('key')
+        assert time.monotonic() - started < 1
+
+    assert client.breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        client.get('key')
+
+
+def test_revoked_token_is_rejected_by_the_app(app_ctx):
+    token = create_access_token(identity='1')
+    headers = {'Authorization': f"Bearer {token}"}
+
+    with app_ctx.test_request_context(headers=headers):
+        verify_jwt_in_request()
+        security.revoke_token(get_jwt())
+
+    with app_ctx.test_request_context(headers=headers):
+        with pytest.raises(RevokedTokenError):
+            verify_jwt_in_request()
@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import event
+
+from app import db
+from app.models import Doctor, User
+from app.security import generate_email_hash
+from app.serializers import QUEUE_PLANS, InvalidFields
+
+
+def _doctor(user_id):
+    email = f"doctor{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x',
+                        role='doctor', name=f"Doctor {user_id}"))
+    db.session.add(Doctor(user_id=user_id, verified=False, status='pending', specialty='Neurology',
+                          degree='MD', license_document='license.pdf'))
+    db.session.commit()
+
+
+def test_select_keeps_plan_order_and_rejects_unknown_fields():
+    plan = QUEUE_PLANS['doctor']
+
+    assert plan.select(None) == plan.fields
+    assert plan.select(' specialty,id ,') == ('id', 'specialty')
+    with pytest.raises(InvalidFields) as excinfo:
+        plan.select('id,password,secret')
+    assert excinfo.value.unknown == ['password', 'secret']
+
+
+def test_queue_returns_only_requested_fields(client, admin_headers):
+    _doctor(7)
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/admin/unverified-doctor', query_string={'fields': 'specialty,name,documents'},
+                              headers=admin_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert response.get_json()['data'] == [
+        {'name': 'Doctor 7', 'specialty': 'Neurology', 'documents': [{'license': 'license.pdf'}]}
+    ]
+    loaded = ' '.join(statement for statement in statements if 'FROM doctors' in statement)
+    assert 'specialty_encrypted' in loaded and 'license_document_encrypted' in loaded
+    assert 'degree_encrypted' not in loaded and 'email_encrypted' not in loaded
+
+
+def test_queue_rejects_unknown_fields(client, admin_headers):
+    response = client.get('/api/admin/unverified-doctor', query_string={'fields': 'id,password'},
+                          headers=admin_headers)
+
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['message'] == 'Unknown fields: password'
+    assert body['fields'] == list(QUEUE_PLANS['doctor'].fields)
@@ -0,0 +1,21 @@
+from app import db
+from app.key_rotation import backfill_telephone_hashes
+from app.models import User
+from app.security import generate_email_hash
+from app.utils import telephone_hash_candidates
+
+
+def _find(telephone):
+    return User.query.filter(User.telephone_hash.in_(telephone_hash_candidates(telephone))).first()
+
+
+def test_backfill_makes_existing_users_findable_by_phone(app_ctx):
+    db.session.add(User(id=1, email='a@example.com', email_hash=generate_email_hash('a@example.com'),
+                        password='x', telephone='+90 555 111-22-33'))
+    db.session.add(User(id=2, email='b@example.com', email_hash=generate_email_hash('b@example.com'), password='x'))
+    db.session.commit()
+    assert _find('+905551112233') is None
+
+    assert backfill_telephone_hashes(batch_size=1) == 1
+    assert _find('+905551112233').id == 1
+    assert backfill_telephone_hashes() == 0
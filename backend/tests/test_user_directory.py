@@ -0,0 +1,64 @@
+from app import db
+from app.models import Doctor, Hospital, HospitalAdmin, User, UserDirectory
+from app.security import generate_email_hash
+from app.user_directory import rebuild_user_directory
+
+ROLES = {'hospital': Hospital, 'hospitalAdmin': HospitalAdmin, 'doctor': Doctor}
+
+
+def _member(user_id, role, status, verified=False):
+    email = f"user{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x', role=role))
+    db.session.add(ROLES[role](user_id=user_id, status=status, verified=verified))
+    db.session.commit()
+
+
+def _list(client, admin_headers, **params):
+    response = client.get('/api/admin/users', query_string=params, headers=admin_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def _members():
+    _member(1, 'hospital', 'Approved', verified=True)
+    _member(2, 'doctor', 'pending')
+    _member(3, 'hospitalAdmin', 'pending')
+    _member(4, 'doctor', 'rejected')
+    rebuild_user_directory()
+
+
+def test_rebuild_projects_every_role_row(app_ctx):
+    _members()
+
+    rows = {(row.user_id, row.role, row.status, row.verified) for row in UserDirectory.query}
+    assert rows == {
+        (1, 'hospital', 'approved', True),
+        (2, 'doctor', 'pending', False),
+        (3, 'hospital_admin', 'pending', False),
+        (4, 'doctor', 'rejected', False),
+    }
+
+
+def test_status_filter(client, admin_headers, app_ctx):
+    _members()
+
+    assert [user['id'] for user in _list(client, admin_headers)['data']] == [1]
+    pending = _list(client, admin_headers, status='Pending ')
+    assert [user['id'] for user in pending['data']] == [2, 3]
+    assert pending['pagination']['total'] == 2
+
+
+def test_role_filter_accepts_both_role_spellings(client, admin_headers, app_ctx):
+    _members()
+
+    for role in ('hospitalAdmin', 'hospital_admin'):
+        data = _list(client, admin_headers, status='pending', role=role)['data']
+        assert [(user['id'], user['role']) for user in data] == [(3, 'hospital_admin')]
+
+
+def test_pagination(client, admin_headers, app_ctx):
+    _members()
+
+    page = _list(client, admin_headers, status='pending', per_page=1, page=2)
+    assert [user['id'] for user in page['data']] == [3]
+    assert page['pagination']['pages'] == 2
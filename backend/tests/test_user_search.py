@@ -0,0 +1,65 @@
+import hashlib
+import hmac
+
+from flask_jwt_extended import create_access_token
+import pytest
+
+from app import db
+from app import security
+from app.models import User
+from app.security import generate_email_hash
+from app.utils import generate_telephone_hash
+
+OLD_PEPPER, NEW_PEPPER = '0a' * 16, '0b' * 16
+
+
+def _user(user_id, email, email_hash=None, telephone_hash=None):
+    db.session.add(User(id=user_id, email=email, email_hash=email_hash or generate_email_hash(email),
+                        password='x', telephone_hash=telephone_hash))
+    db.session.commit()
+
+
+def _search(client, admin_headers, query):
+    return client.get('/api/admin/users/search', query_string={'q': query}, headers=admin_headers)
+
+
+@pytest.fixture
+def peppers(app_ctx, monkeypatch):
+    monkeypatch.setitem(app_ctx.config, 'TELEPHONE_PEPPER', NEW_PEPPER)
+    monkeypatch.setitem(app_ctx.config, 'TELEPHONE_PEPPER_PREVIOUS', [OLD_PEPPER])
+
+
+@pytest.mark.parametrize('pepper', [NEW_PEPPER, OLD_PEPPER])
+def test_phone_search_matches_current_and_previous_pepper(client, admin_headers, peppers, pepper):
+    _user(1, 'a@example.com', telephone_hash=generate_telephone_hash('+905551112233', pepper))
+
+    response = _search(client, admin_headers, '+90 555 111-22-33')
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['id'] == 1
+
+
+def test_email_search_matches_previous_hmac_key(client, admin_headers, monkeypatch):
+    old_key = b'previous-hmac-key'
+    monkeypatch.setattr(security, 'hmac_keys', security.hmac_keys + [old_key])
+    old_hash = hmac.new(old_key, b'a@example.com', hashlib.sha256).hexdigest()
+    _user(1, 'a@example.com', email_hash=old_hash)
+
+    response = _search(client, admin_headers, 'A@Example.com')
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['id'] == 1
+
+
+def test_search_misses_and_rejects_bad_queries(client, admin_headers, peppers):
+    _user(1, 'a@example.com')
+
+    assert _search(client, admin_headers, 'b@example.com').status_code == 404
+    assert _search(client, admin_headers, 'not-a-phone').status_code == 400
+    assert _search(client, admin_headers, '').status_code == 400
+
+
+def test_search_requires_the_admin_role(client, app_ctx):
+    headers = {'Authorization': f"Bearer {create_access_token(identity='2', additional_claims={'role': 'doctor'})}"}
+
+    assert _search(client, headers, 'a@example.com').status_code == 403
@@ -0,0 +1,93 @@
+from sqlalchemy import event
+
+from app import db
+from app.mainRoutes.admin import BATCH_MAX_ITEMS
+from app.models import Admin, Doctor, User, UserDirectory
+from app.security import generate_email_hash
+
+
+def _user(user_id, role):
+    email = f"{role}{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x', role=role))
+
+
+def _setup(doctor_ids):
+    _user(1, 'admin')
+    db.session.add(Admin(user_id=1, verified=True, status='approved'))
+    for user_id in doctor_ids:
+        _user(user_id, 'doctor')
+        db.session.add(Doctor(user_id=user_id, verified=False, status='pending'))
+    db.session.commit()
+
+
+def _post(client, admin_headers, path, **data):
+    return client.post(f"/api/admin/{path}", json=data, headers=admin_headers)
+
+
+def test_approve_batch_reports_each_item(client, admin_headers):
+    _setup([10, 11])
+
+    response = _post(client, admin_headers, 'approve-batch', items=[
+        {'entity_type': 'doctor', 'entity_id': 10},
+        {'entity_type': 'doctor', 'entity_id': 99},
+        {'entity_type': 'wizard', 'entity_id': 11},
+        {'entity_type': 'doctor', 'entity_id': 'x'},
+        {'entity_type': 'doctor', 'entity_id': 11, 'status': 'approved'},
+    ])
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['succeeded'], body['failed']) == (2, 3)
+    assert [result['success'] for result in body['results']] == [True, False, False, False, True]
+    assert body['results'][1]['error'] == 'Entity not found'
+    assert body['results'][2]['error'] == 'Invalid entity_type or entity_id'
+    assert body['results'][3]['error'] == 'Invalid entity_type or entity_id'
+
+    db.session.expire_all()
+    for user_id in (10, 11):
+        doctor = db.session.get(Doctor, user_id)
+        assert doctor.verified and doctor.status == 'approved'
+    assert {row.status for row in UserDirectory.query.filter_by(role='doctor')} == {'approved'}
+
+
+def test_reject_batch_requires_status_and_description(client, admin_headers):
+    _setup([10, 11])
+
+    response = _post(client, admin_headers, 'reject-batch', description='expired license', items=[
+        {'entity_type': 'doctor', 'entity_id': 10},
+        {'entity_type': 'doctor', 'entity_id': 11, 'description': ''},
+    ])
+
+    assert [result['success'] for result in response.get_json()['results']] == [True, False]
+    db.session.expire_all()
+    assert db.session.get(Doctor, 10).description == 'expired license'
+    assert db.session.get(Doctor, 11).status == 'pending'
+
+
+def test_batch_writes_one_update_per_statement_kind(client, admin_headers):
+    _setup(range(10, 20))
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE doctors'):
+            statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = _post(client, admin_headers, 'approve-batch', items=[
+            {'entity_type': 'doctor', 'entity_id': user_id} for user_id in range(10, 20)
+        ])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert response.get_json()['succeeded'] == 10
+    assert len(statements) == 2
+
+
+def test_batch_rejects_oversized_and_empty_requests(client, admin_headers):
+    _setup([])
+    items = [{'entity_type': 'doctor', 'entity_id': 10}] * (BATCH_MAX_ITEMS + 1)
+
+    assert _post(client, admin_headers, 'approve-batch', items=items).status_code == 400
+    assert _post(client, admin_headers, 'approve-batch', items=[]).status_code == 400
+    assert _post(client, admin_headers, 'approve-batch', items=items[:BATCH_MAX_ITEMS]).status_code == 200
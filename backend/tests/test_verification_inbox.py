@@ -0,0 +1,81 @@
+from datetime import datetime
+import threading
+import time
+
+from app import db
+from app.mainRoutes import admin
+from app.models import Doctor, Hospital, User
+from app.security import generate_email_hash
+
+
+def _member(user_id, model, submitted_at, verified=False):
+    email = f"user{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x'))
+    db.session.add(model(user_id=user_id, verified=verified, submitted_at=submitted_at))
+    db.session.commit()
+
+
+def _inbox(client, admin_headers, **params):
+    response = client.get('/api/admin/verification-inbox', query_string=params, headers=admin_headers)
+    assert response.status_code == 200
+    return response.get_json()['data']
+
+
+def test_inbox_lists_each_queue_oldest_first(client, admin_headers):
+    _member(1, Doctor, datetime(2026, 3, 1))
+    _member(2, Doctor, datetime(2026, 1, 1))
+    _member(3, Doctor, datetime(2026, 2, 1))
+    _member(4, Doctor, datetime(2025, 1, 1), verified=True)
+    _member(5, Hospital, datetime(2026, 5, 1))
+
+    data = _inbox(client, admin_headers, limit=2)
+
+    assert data['doctor']['total'] == 3
+    assert [item['id'] for item in data['doctor']['items']] == [2, 3]
+    assert data['doctor']['items'][0]['submitted_at'] == '2026-01-01T00:00:00'
+    assert [item['id'] for item in data['hospital']['items']] == [5]
+    assert data['patient'] == {'total': 0, 'items': []}
+
+    newest = _inbox(client, admin_headers, order='newest', limit=1)
+    assert [item['id'] for item in newest['doctor']['items']] == [1]
+
+
+def test_failed_queue_is_reported_without_failing_the_inbox(client, admin_headers, monkeypatch):
+    inbox_queue = admin._inbox_queue
+
+    def failing_for_doctors(app, model, filters, limit):
+        if model is Doctor:
+            raise RuntimeError('statement timeout')
+        return inbox_queue(app, model, filters, limit)
+
+    monkeypatch.setattr(admin, '_inbox_queue', failing_for_doctors)
+    data = _inbox(client, admin_headers)
+
+    assert data['doctor'] == {'total': None, 'items': [], 'error': 'unavailable'}
+    assert data['hospital']['total'] == 0
+
+
+def test_concurrent_first_requests_create_one_executor(app_ctx, monkeypatch):
+    created = []
+
+    class Executor:
+        def __init__(self, **kwargs):
+            time.sleep(0.01)
+            created.append(self)
+
+    monkeypatch.setattr(admin, 'ThreadPoolExecutor', Executor)
+    monkeypatch.setattr(admin, '_inbox_executor', None)
+    barrier = threading.Barrier(8)
+
+    def first_request():
+        with app_ctx.app_context():
+            barrier.wait()
+            admin._get_inbox_executor()
+
+    threads = [threading.Thread(target=first_request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from app import db
+from app.models import Doctor, User
+from app.security import generate_email_hash
+from app.user_directory import backfill_submitted_at
+
+
+def _doctor(user_id, submitted_at=None, verified=False, submission_date=None):
+    email = f"doctor{user_id}@example.com"
+    db.session.add(User(id=user_id, email=email, email_hash=generate_email_hash(email), password='x', role='doctor'))
+    db.session.add(Doctor(user_id=user_id, verified=verified, submitted_at=submitted_at,
+                          submission_date=submission_date, status='pending'))
+    db.session.commit()
+
+
+def _queue(client, admin_headers, **params):
+    return client.get('/api/admin/unverified-doctor', query_string={'fields': 'id', **params}, headers=admin_headers)
+
+
+def _ids(response):
+    assert response.status_code == 200
+    return [item['id'] for item in response.get_json()['data']]
+
+
+def _doctors():
+    _doctor(1, datetime(2026, 3, 1))
+    _doctor(2, datetime(2026, 1, 1))
+    _doctor(3)
+    _doctor(4, datetime(2026, 2, 1))
+    _doctor(5, datetime(2025, 1, 1), verified=True)
+
+
+def test_queue_is_ordered_by_submitted_at_with_unknown_dates_last(client, admin_headers):
+    _doctors()
+
+    assert _ids(_queue(client, admin_headers)) == [2, 4, 1, 3]
+    assert _ids(_queue(client, admin_headers, order='newest')) == [1, 4, 2, 3]
+
+
+def test_queue_filters_by_submission_window(client, admin_headers):
+    _doctors()
+
+    response = _queue(client, admin_headers, submitted_after='2026-01-15', submitted_before='2026-03-01T00:00:00+00:00')
+    assert _ids(response) == [4]
+
+
+def test_queue_rejects_bad_filters(client, admin_headers):
+    assert _queue(client, admin_headers, order='random').status_code == 400
+    assert _queue(client, admin_headers, submitted_before='yesterday').status_code == 400
+
+
+def test_backfill_fills_submitted_at_from_the_encrypted_date(app_ctx):
+    _doctor(1, submission_date=str(datetime(2026, 4, 2, 9, 30)))
+    _doctor(2, submission_date='not a date')
+
+    assert backfill_submitted_at()['doctor'] == 1
+    db.session.expire_all()
+    assert db.session.get(Doctor, 1).submitted_at == datetime(2026, 4, 2, 9, 30)
+    assert db.session.get(Doctor, 2).submitted_at is None